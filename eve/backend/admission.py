@@ -0,0 +1,147 @@
+import asyncio
+import json
+import math
+import os
+import time
+from models import session_key
+import metrics
+
+MAX_CONCURRENT_READS = int(os.environ.get("EVE_MAX_CONCURRENT_READS", "16"))
+MAX_CONCURRENT_WRITES = int(os.environ.get("EVE_MAX_CONCURRENT_WRITES", "8"))
+ADMISSION_QUEUE_SIZE = int(os.environ.get("EVE_ADMISSION_QUEUE_SIZE", "64"))  # Waiting requests per class
+ADMISSION_TIMEOUT_MS = float(os.environ.get("EVE_ADMISSION_TIMEOUT_MS", "1000"))  # Longest wait for a slot
+WRITE_RATE = float(os.environ.get("EVE_WRITE_RATE", "5"))  # Writes per second per session
+WRITE_BURST = float(os.environ.get("EVE_WRITE_BURST", "20"))
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Never queued, so the server stays observable under load
+EXEMPT_PATHS = {"/api/metrics"}
+# Live streams stay open for minutes; the broker bounds them instead
+STREAM_SUFFIX = "/stream"
+
+class AdmissionLimiter:
+    """Bound the requests of one class running at once, with a bounded wait.
+
+    At most ``limit`` requests hold a slot; up to ``queue_size`` more wait
+    for one, each for at most ``timeout`` seconds. Anything beyond that is
+    shed immediately. Runs on the event loop, so plain counters suffice.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 timeout: float = ADMISSION_TIMEOUT_MS / 1000):
+        self.name = name
+        self._slots = asyncio.Semaphore(limit)
+        self._queue_size = queue_size
+        self._timeout = timeout
+        self._waiting = 0
+
+    async def acquire(self) -> bool:
+        """Take a slot; False if the request must be shed"""
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return True
+        if self._waiting >= self._queue_size:
+            metrics.inc(f"admission.{self.name}.shed")
+            return False
+        self._waiting += 1
+        metrics.set_gauge(f"admission.{self.name}.queued", self._waiting)
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self._timeout)
+            return True
+        except asyncio.TimeoutError:
+            metrics.inc(f"admission.{self.name}.timed_out")
+            return False
+        finally:
+            self._waiting -= 1
+            metrics.set_gauge(f"admission.{self.name}.queued", self._waiting)
+            metrics.observe(f"admission.{self.name}.wait_seconds", time.perf_counter() - started_at)
+
+    def release(self) -> None:
+        self._slots.release()
+
+class TokenBucket:
+    """Per-key token buckets: ``rate`` tokens a second, holding at most ``burst``"""
+
+    def __init__(self, rate: float = WRITE_RATE, burst: float = WRITE_BURST, clock=time.monotonic):
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._buckets = {}
+
+    def take(self, key) -> float:
+        """Spend a token for ``key``; returns 0, or the seconds until one is available"""
+        now = self._clock()
+        tokens, updated = self._buckets.get(key, (self._burst, now))
+        tokens = min(self._burst, tokens + (now - updated) * self._rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self._rate
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > 10000:
+            self._forget_full(now)
+        return 0.0
+
+    def _forget_full(self, now: float) -> None:
+        # A bucket that has refilled is the same as no bucket at all
+        refill = self._burst / self._rate
+        self._buckets = {
+            key: (tokens, updated) for key, (tokens, updated) in self._buckets.items()
+            if now - updated < refill
+        }
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AdmissionMiddleware:
+    """Admission control in front of the route threadpool.
+
+    Reads and writes get separate concurrency limits so a burst of one
+    cannot starve the other, and writes are rate limited per session.
+    Requests that cannot be admitted get ``503``/``429`` with ``Retry-After``
+    before they take a worker thread.
+    """
+
+    def __init__(self, app, max_reads: int = MAX_CONCURRENT_READS, max_writes: int = MAX_CONCURRENT_WRITES,
+                 queue_size: int = ADMISSION_QUEUE_SIZE, timeout: float = ADMISSION_TIMEOUT_MS / 1000,
+                 write_rate: TokenBucket = None):
+        self.app = app
+        self.reads = AdmissionLimiter("reads", max_reads, queue_size, timeout)
+        self.writes = AdmissionLimiter("writes", max_writes, queue_size, timeout)
+        self.write_rate = write_rate or TokenBucket()
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS
+                or scope["path"].endswith(STREAM_SUFFIX)):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in WRITE_METHODS:
+            limiter = self.writes
+            key = session_key(dict(scope["headers"]).get(b"authorization", b"").decode("latin-1"))
+            # Unauthenticated writes are rejected by the route anyway
+            wait = self.write_rate.take(key) if key is not None else 0.0
+            if wait:
+                metrics.inc("admission.rate_limited")
+                await _reject(send, 429, "Too many requests, please slow down", wait)
+                return
+        else:
+            limiter = self.reads
+
+        if not await limiter.acquire():
+            await _reject(send, 503, "Server is busy, please retry", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,34 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from database import run_write
+from use_cases import archive_use_cases
+from background import PeriodicWorker
+import metrics
+
+ARCHIVE_AFTER_DAYS = float(os.environ.get("EVE_ARCHIVE_AFTER_DAYS", "90"))  # Days after an event ends
+ARCHIVE_INTERVAL = float(os.environ.get("EVE_ARCHIVE_INTERVAL", "3600"))  # Seconds between archive runs
+ARCHIVE_BATCH_SIZE = int(os.environ.get("EVE_ARCHIVE_BATCH_SIZE", "200"))  # Events per write transaction
+ARCHIVE_PAUSE_MS = float(os.environ.get("EVE_ARCHIVE_PAUSE_MS", "50"))  # Pause between chunks
+
+def archive_ended_events(stop: threading.Event, submit=run_write,
+                         after: timedelta = timedelta(days=ARCHIVE_AFTER_DAYS),
+                         batch_size: int = ARCHIVE_BATCH_SIZE, pause: float = ARCHIVE_PAUSE_MS / 1000) -> int:
+    """Move events that ended more than ``after`` ago to the archive, one chunk per write job"""
+    ended_before = datetime.now(UTC).replace(tzinfo=None) - after
+    total = 0
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        moved = submit(archive_use_cases.archive_events, ended_before, batch_size)
+        metrics.observe("archive.chunk_seconds", time.perf_counter() - started_at)
+        metrics.inc("archive.events", moved["events"])
+        metrics.inc("archive.comments", moved["comments"])
+        total += moved["events"]
+        if moved["events"] < batch_size:
+            break
+        stop.wait(pause)
+    return total
+
+def create_archiver(interval: float = ARCHIVE_INTERVAL) -> PeriodicWorker:
+    return PeriodicWorker("archiver", interval, archive_ended_events)
@@ -0,0 +1,38 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class PeriodicWorker:
+    """Run ``fn(stop_event)`` every ``interval`` seconds on a daemon thread.
+
+    ``fn`` receives the stop event so long-running work can pause between
+    steps with ``stop_event.wait(...)`` and return early on shutdown.
+    """
+
+    def __init__(self, name: str, interval: float, fn):
+        self.name = name
+        self.interval = interval
+        self._fn = fn
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._fn(self._stop)
+            except Exception:
+                logger.exception("%s failed", self.name)
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+import copy
+import os
+import threading
+from typing import Callable, Hashable, Optional
+from fastapi import HTTPException
+from data_version import DataVersion, data_version
+import metrics
+
+# Serialized read responses kept per process; 0 disables the cache
+RESPONSE_CACHE_SIZE = int(os.environ.get("EVE_RESPONSE_CACHE_SIZE", "1024"))
+
+class SingleFlight:
+    """Share one in-flight computation among concurrent identical calls.
+
+    The first caller for a key runs ``fn``; callers arriving before it
+    finishes wait for its result instead of repeating the work. Nothing is
+    kept afterwards, so this only ever merges calls that overlap in time.
+    Each waiter gets its own copy of a failure, as exceptions are not
+    thread-safe to raise in several threads at once.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self._name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            metrics.inc(f"{self._name}.coalesced")
+            error = future.exception()
+            if error is not None:
+                raise self._copy(error) from error
+            return future.result()
+
+        metrics.inc(f"{self._name}.executed")
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    @staticmethod
+    def _copy(exc: BaseException) -> BaseException:
+        if isinstance(exc, HTTPException):
+            return HTTPException(exc.status_code, exc.detail, exc.headers)
+        try:
+            return copy.copy(exc)
+        except Exception:
+            # Not rebuildable from its args
+            return RuntimeError(f"coalesced read failed: {exc}")
+
+class ResponseCache:
+    """Least recently used cache of values, each valid for one data version"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, name: str = "response_cache"):
+        self._max_entries = max_entries
+        self._name = name
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def __bool__(self) -> bool:
+        return self._max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, version: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                metrics.inc(f"{self._name}.misses")
+                return None
+            self._entries.move_to_end(key)
+        metrics.inc(f"{self._name}.hits")
+        return entry[1]
+
+    def put(self, key: Hashable, version: int, value) -> None:
+        if not self:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+read_flight = SingleFlight("reads.singleflight")
+response_cache = ResponseCache()
+
+def coalesced_read(key: Hashable, compute: Callable, flight: SingleFlight = None,
+                   cache: Optional[ResponseCache] = None, version: DataVersion = None):
+    """``compute()`` at most once for concurrent identical reads of the current data.
+
+    The key is extended with the data version, so a read arriving after a
+    commit never joins (or hits a cached result of) one that started before.
+    """
+    flight = flight or read_flight
+    cache = response_cache if cache is None else cache
+    current = (version or data_version).current()
+    if cache:
+        value = cache.get(key, current)
+        if value is not None:
+            return value
+    value = flight.do((key, current), compute)
+    cache.put(key, current, value)
+    return value
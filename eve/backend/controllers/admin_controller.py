@@ -0,0 +1,41 @@
+from datetime import datetime, UTC
+from typing import Optional
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field, field_validator
+from controllers.dependencies import get_admin_user
+from retention import BULK_DELETE_BATCH_SIZE, bulk_delete_events
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+class BulkDeleteRequest(BaseModel):
+    ended_before: Optional[datetime] = None
+    author_email: Optional[str] = None
+    batch_size: int = Field(BULK_DELETE_BATCH_SIZE, ge=1, le=10000)
+    dry_run: bool = False
+
+    @field_validator('ended_before', mode='before')
+    def parse_datetime(cls, value):
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return value
+
+    @field_validator('ended_before')
+    def to_naive_utc(cls, value):
+        # Stored times are naive UTC
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(UTC).replace(tzinfo=None)
+        return value
+
+class BulkDeleteResponse(BaseModel):
+    dry_run: bool
+    events: int
+    comments: int
+    rows: int
+    chunks: int
+    seconds: float
+    rows_per_second: float
+
+@router.post("/events/bulk-delete", response_model=BulkDeleteResponse)
+def bulk_delete(request: BulkDeleteRequest,
+                current_user: str = Depends(get_admin_user)):
+    return bulk_delete_events(**request.model_dump())
@@ -0,0 +1,240 @@
+import os
+import re
+from typing import Any, List, Literal, Optional
+from urllib.parse import parse_qs, urlsplit
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy.orm import Session
+from database import get_read_db, run_write
+from controllers.dependencies import get_current_user, parse_ids, query_budget
+from deadlines import QueryDeadlineExceeded, query_deadline, remaining_budget
+from controllers.event_controller import (
+    EventCreate, EventLookupResponse, EventResponse, EventSummaryResponse,
+    include_related, lookup_events, parse_include
+)
+from controllers.comment_controller import (
+    COMMENTS_PAGE_SIZE, MAX_COMMENTS_PAGE_SIZE, MAX_PREVIEW_COMMENTS, PREVIEW_COMMENTS,
+    CommentCreate, CommentPreviews, CommentResponse, comments_page
+)
+from use_cases import comment_use_cases, event_use_cases
+import metrics
+
+MAX_BATCH_OPERATIONS = int(os.environ.get("EVE_MAX_BATCH_OPERATIONS", "20"))
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+class BatchOperation(BaseModel):
+    method: Literal["GET", "POST", "PUT", "DELETE"]
+    path: str  # An event or comment route, query string included
+    body: Optional[dict] = None
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=MAX_BATCH_OPERATIONS)
+    atomic: bool = False  # All writes commit together, or none do
+
+class BatchResult(BaseModel):
+    status: int
+    body: Any = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+
+def _flag(query: dict, name: str) -> bool:
+    return query.get(name, ["false"])[-1].lower() in ("1", "true", "yes", "on")
+
+def _dump(model, value):
+    # Like the routes' response_model_exclude_unset: includes only appear when asked for
+    if isinstance(value, list):
+        return [model.model_validate(item).model_dump(mode="json", exclude_unset=True) for item in value]
+    return model.model_validate(value).model_dump(mode="json", exclude_unset=True)
+
+def _include(db, query, events, include_archived=False):
+    return include_related(db, events, parse_include(query.get("include", [""])[-1]), include_archived)
+
+def _list_events(db, user, query, body):
+    include_archived = _flag(query, "include_archived")
+    if "ids" in query:
+        return _dump(EventLookupResponse, lookup_events(db, parse_ids(query["ids"][-1]), include_archived))
+    return _dump(EventSummaryResponse, _include(db, query, event_use_cases.get_events(db, include_archived),
+                                                include_archived))
+
+def _list_my_events(db, user, query, body):
+    include_archived = _flag(query, "include_archived")
+    return _dump(EventSummaryResponse, _include(db, query, event_use_cases.get_user_events(db, user, include_archived),
+                                                include_archived))
+
+def _list_upcoming_events(db, user, query, body):
+    return _dump(EventSummaryResponse, _include(db, query, event_use_cases.get_upcoming_events(db)))
+
+def _get_event(db, user, query, body, event_id):
+    include_archived = _flag(query, "include_archived")
+    event = event_use_cases.get_event(db, event_id, include_archived)
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _dump(EventResponse, _include(db, query, [event], include_archived)[0])
+
+def _create_event(db, user, query, body):
+    event = EventCreate.model_validate(body or {})
+    return _dump(EventResponse, event_use_cases.create_event(db, author_email=user, **event.model_dump()))
+
+def _update_event(db, user, query, body, event_id):
+    event = EventCreate.model_validate(body or {})
+    return _dump(EventResponse, event_use_cases.update_event(db, event_id=event_id, author_email=user,
+                                                             **event.model_dump()))
+
+def _delete_event(db, user, query, body, event_id):
+    event_use_cases.delete_event(db, event_id, user)
+    return {"message": "Event deleted successfully"}
+
+def _int_param(query: dict, name: str, default: int, maximum: int) -> int:
+    try:
+        value = int(query.get(name, [default])[-1])
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{name} must be an integer")
+    if not 1 <= value <= maximum:
+        raise HTTPException(status_code=422, detail=f"{name} must be between 1 and {maximum}")
+    return value
+
+def _list_comments(db, user, query, body, event_id):
+    # Always paged: a batch has no headers, so the cursor and count are in the body
+    limit = _int_param(query, "limit", COMMENTS_PAGE_SIZE, MAX_COMMENTS_PAGE_SIZE)
+    comments, next_cursor, total = comments_page(
+        db, event_id, query.get("sort", [None])[-1], limit, query.get("cursor", [None])[-1],
+        _flag(query, "include_archived")
+    )
+    return {"comments": _dump(CommentResponse, comments), "next_cursor": next_cursor, "total_count": total}
+
+def _list_comment_previews(db, user, query, body):
+    ids = parse_ids(query.get("event_ids", [""])[-1])
+    limit = _int_param(query, "limit", PREVIEW_COMMENTS, MAX_PREVIEW_COMMENTS)
+    previews = comment_use_cases.get_comment_previews(db, ids, limit, _flag(query, "include_archived"))
+    return _dump(CommentPreviews, [{"event_id": event_id, "comments": previews[event_id]} for event_id in ids])
+
+def _create_comment(db, user, query, body, event_id):
+    comment = CommentCreate.model_validate(body or {})
+    return _dump(CommentResponse, comment_use_cases.create_comment(
+        db, event_id=event_id, user_id=user, author_email=user, **comment.model_dump()
+    ))
+
+def _update_comment(db, user, query, body, event_id, comment_id):
+    comment = CommentCreate.model_validate(body or {})
+    return _dump(CommentResponse, comment_use_cases.update_comment(
+        db, comment_id=comment_id, author_email=user, **comment.model_dump()
+    ))
+
+def _delete_comment(db, user, query, body, event_id, comment_id):
+    comment_use_cases.delete_comment(db, comment_id, user)
+    return {"message": "Comment deleted successfully"}
+
+# (method, path pattern, handler); numeric path segments are passed as ints
+ROUTES = [
+    ("GET", r"/api/events", _list_events),
+    ("GET", r"/api/events/my", _list_my_events),
+    ("GET", r"/api/events/upcoming", _list_upcoming_events),
+    ("GET", r"/api/events/(\d+)", _get_event),
+    ("POST", r"/api/events", _create_event),
+    ("PUT", r"/api/events/(\d+)", _update_event),
+    ("DELETE", r"/api/events/(\d+)", _delete_event),
+    ("GET", r"/api/events/(\d+)/comments", _list_comments),
+    ("GET", r"/api/comments/previews", _list_comment_previews),
+    ("POST", r"/api/events/(\d+)/comments", _create_comment),
+    ("PUT", r"/api/events/(\d+)/comments/(\d+)", _update_comment),
+    ("DELETE", r"/api/events/(\d+)/comments/(\d+)", _delete_comment),
+]
+ROUTES = [(method, re.compile(pattern + "/?"), handler) for method, pattern, handler in ROUTES]
+
+def _execute(db: Session, operation: BatchOperation, user: str) -> dict:
+    """Run one operation, turning errors into the status its route would answer"""
+    url = urlsplit(operation.path)
+    matches = [(method, pattern.fullmatch(url.path), handler) for method, pattern, handler in ROUTES]
+    matches = [(method, match, handler) for method, match, handler in matches if match]
+    if not matches:
+        return {"status": 404, "body": {"detail": f"no batchable route for {url.path}"}}
+    for method, match, handler in matches:
+        if method == operation.method:
+            break
+    else:
+        return {"status": 405, "body": {"detail": f"{operation.method} is not allowed on {url.path}"}}
+
+    try:
+        args = [int(group) for group in match.groups()]
+        return {"status": 200, "body": handler(db, user, parse_qs(url.query), operation.body, *args)}
+    except HTTPException as e:
+        return {"status": e.status_code, "body": {"detail": e.detail}}
+    except ValidationError as e:
+        return {"status": 422, "body": {"detail": e.errors(include_url=False, include_context=False)}}
+    except ValueError as e:
+        status = 403 if "not authorized" in str(e) else 404 if "not found" in str(e) else 400
+        return {"status": status, "body": {"detail": str(e)}}
+    except QueryDeadlineExceeded:
+        return {"status": 504, "body": {"detail": "Request took too long, please narrow it down or retry"}}
+
+def execute_batch(db: Session, operations: List[BatchOperation], user: str, atomic: bool = False) -> List[dict]:
+    """Run ``operations`` in order on one session.
+
+    Without ``atomic`` every write commits on its own and a failure does not
+    stop the others. With it the operations share one transaction: each use
+    case's commit only releases a savepoint, and the first failure rolls
+    everything back, answering 424 for the other operations.
+    """
+    if not atomic:
+        return [_execute(db, operation, user) for operation in operations]
+
+    connection = db.connection()
+    # pysqlite only opens a transaction before DML; SAVEPOINTs need an explicit one
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+    operations_db = Session(bind=connection, join_transaction_mode="create_savepoint",
+                            autoflush=False, expire_on_commit=False)
+    results = []
+    try:
+        for index, operation in enumerate(operations):
+            result = _execute(operations_db, operation, user)
+            if result["status"] >= 400:
+                operations_db.close()
+                db.rollback()
+                skipped = {"status": 424, "body": {"detail": f"rolled back, operation {index} failed"}}
+                return [skipped] * index + [result] + [skipped] * (len(operations) - index - 1)
+            results.append(result)
+        operations_db.close()
+        db.commit()
+        return results
+    except BaseException:
+        operations_db.close()
+        db.rollback()
+        raise
+
+def execute_mixed_batch(db: Session, operations: List[BatchOperation], user: str, submit=run_write) -> List[dict]:
+    """Run a non-atomic batch with reads on ``db`` and each write as its own writer job.
+
+    Reads stay on the read pool under the request's deadline, so heavy
+    reads in a batch never hold the writer.
+    """
+    results = []
+    for operation in operations:
+        if operation.method == "GET":
+            results.append(_execute(db, operation, user))
+        else:
+            results.append(submit(_execute, operation, user))
+            # End the read snapshot, so later reads see this write
+            db.rollback()
+    return results
+
+def _execute_atomic(db: Session, operations: List[BatchOperation], user: str, budget: float | None) -> List[dict]:
+    # The writer thread does not share the request's context: carry its budget over
+    with query_deadline(budget):
+        return execute_batch(db, operations, user, atomic=True)
+
+@router.post("", response_model=BatchResponse, dependencies=[Depends(query_budget())])
+def run_batch(batch: BatchRequest,
+              db: Session = Depends(get_read_db),
+              current_user: str = Depends(get_current_user)):
+    metrics.observe("batch.operations", len(batch.operations))
+    if all(operation.method == "GET" for operation in batch.operations):
+        # Read-only batches stay on the read pool
+        results = execute_batch(db, batch.operations, current_user)
+    elif batch.atomic:
+        # Reads must see the batch's own writes, so everything runs on the writer
+        results = run_write(_execute_atomic, batch.operations, current_user, remaining_budget())
+    else:
+        results = execute_mixed_batch(db, batch.operations, current_user)
+    return {"results": results}
@@ -1,12 +1,32 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from database import get_db
-from use_cases import auth_use_cases, comment_use_cases
+from pydantic import BaseModel, TypeAdapter
+from database import (
+    COMMENT_GROUP_COMMIT, GROUP_COMMIT_MAX_BATCH, GROUP_COMMIT_WINDOW_MS,
+    GroupCommit, get_read_db, run_write
+)
+from coalescing import coalesced_read
+from controllers.dependencies import get_current_user, parse_ids, query_budget
+from deadlines import LIST_QUERY_BUDGET_MS
+from use_cases import comment_use_cases
+
+COMMENTS_PAGE_SIZE = int(os.environ.get("EVE_COMMENTS_PAGE_SIZE", "50"))  # Default limit of a paged listing
+MAX_COMMENTS_PAGE_SIZE = int(os.environ.get("EVE_MAX_COMMENTS_PAGE_SIZE", "200"))
+PREVIEW_COMMENTS = int(os.environ.get("EVE_PREVIEW_COMMENTS", "3"))  # Latest comments per event card
+MAX_PREVIEW_COMMENTS = int(os.environ.get("EVE_MAX_PREVIEW_COMMENTS", "20"))
 
 router = APIRouter(tags=["comments"])
 
+# Opt-in: coalesce concurrent comment inserts into shared transactions
+comment_group_commit = GroupCommit(
+    comment_use_cases.create_comments,
+    window=GROUP_COMMIT_WINDOW_MS / 1000,
+    max_batch=GROUP_COMMIT_MAX_BATCH,
+    name="db.comment_group_commit"
+) if COMMENT_GROUP_COMMIT else None
+
 class CommentBase(BaseModel):
     message: str
     rating: int = 0
@@ -23,43 +43,92 @@ class CommentResponse(CommentBase):
     class Config:
         from_attributes = True
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
-    session_id = request.headers.get("Authorization")
-    if not session_id:
-        raise HTTPException(status_code=401, detail="Authorization header required")
-    is_valid, email = auth_use_cases.validate_session(db, session_id)
-    if not is_valid:
-        raise HTTPException(status_code=401, detail="Invalid or expired session")
-    return email
+comment_list = TypeAdapter(List[CommentResponse])
+
+class CommentPreviews(BaseModel):
+    event_id: int
+    comments: List[CommentResponse]  # Newest first
 
-@router.get("/api/events/{event_id}/comments", response_model=List[CommentResponse])
+@router.get("/api/comments/previews", response_model=List[CommentPreviews],
+            dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
+def list_comment_previews(event_ids: str,
+                          limit: int = Query(PREVIEW_COMMENTS, ge=1, le=MAX_PREVIEW_COMMENTS),
+                          include_archived: bool = False,
+                          db: Session = Depends(get_read_db),
+                          current_user: str = Depends(get_current_user)):
+    """The latest ``limit`` comments of each of ``event_ids``, in one query"""
+    ids = parse_ids(event_ids)
+    previews = comment_use_cases.get_comment_previews(db, ids, limit, include_archived)
+    return [{"event_id": event_id, "comments": previews[event_id]} for event_id in ids]
+
+def comments_page(db: Session, event_id: int, sort: Optional[str] = None, limit: Optional[int] = None,
+                  cursor: Optional[str] = None, include_archived: bool = False):
+    """One page of an event's comments as ``(comments, next_cursor, total)``.
+
+    ``total`` is only counted on the first page (None after it); a single
+    page is its own count.
+    """
+    try:
+        comments, next_cursor = comment_use_cases.get_event_comments_page(
+            db, event_id, sort or "newest", limit or COMMENTS_PAGE_SIZE, cursor, include_archived
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = None
+    if cursor is None:
+        total = len(comments) if next_cursor is None else comment_use_cases.count_event_comments(
+            db, event_id, include_archived
+        )
+    return comments, next_cursor, total
+
+@router.get("/api/events/{event_id}/comments", response_model=List[CommentResponse],
+            dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
 def list_comments(event_id: int,
-                 db: Session = Depends(get_db),
+                 include_archived: bool = False,
+                 sort: Optional[str] = None,
+                 limit: Optional[int] = Query(None, ge=1, le=MAX_COMMENTS_PAGE_SIZE),
+                 cursor: Optional[str] = None,
+                 db: Session = Depends(get_read_db),
                  current_user: str = Depends(get_current_user)):
-    return comment_use_cases.get_event_comments(db, event_id)
+    def render():
+        headers = {}
+        if sort is None and limit is None and cursor is None:
+            # Unpaged listing, as before pagination
+            comments = comment_use_cases.get_event_comments(db, event_id, include_archived)
+        else:
+            comments, next_cursor, total = comments_page(db, event_id, sort, limit, cursor, include_archived)
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = next_cursor
+            if total is not None:
+                headers["X-Total-Count"] = str(total)
+        return comment_list.dump_json(comment_list.validate_python(comments)), headers
+
+    key = ("comments", event_id, include_archived, sort, limit, cursor)
+    body, headers = coalesced_read(key, render)
+    return Response(body, media_type="application/json", headers=headers)
 
 @router.post("/api/events/{event_id}/comments", response_model=CommentResponse)
 def create_comment(event_id: int,
                   comment: CommentCreate,
-                  db: Session = Depends(get_db),
                   current_user: str = Depends(get_current_user)):
-    return comment_use_cases.create_comment(
-        db=db,
+    data = dict(
         event_id=event_id,
         user_id=current_user,
         author_email=current_user,
         **comment.model_dump()
     )
+    if comment_group_commit is not None:
+        return comment_group_commit.submit(data)
+    return run_write(comment_use_cases.create_comment, **data)
 
 @router.put("/api/events/{event_id}/comments/{comment_id}", response_model=CommentResponse)
 def update_comment(event_id: int,
                   comment_id: int,
                   comment: CommentCreate,
-                  db: Session = Depends(get_db),
                   current_user: str = Depends(get_current_user)):
     try:
-        updated_comment = comment_use_cases.update_comment(
-            db=db,
+        updated_comment = run_write(
+            comment_use_cases.update_comment,
             comment_id=comment_id,
             author_email=current_user,
             **comment.model_dump()
@@ -75,10 +144,9 @@ def update_comment(event_id: int,
 @router.delete("/api/events/{event_id}/comments/{comment_id}")
 def delete_comment(event_id: int,
                   comment_id: int,
-                  db: Session = Depends(get_db),
                   current_user: str = Depends(get_current_user)):
     try:
-        comment_use_cases.delete_comment(db, comment_id, current_user)
+        run_write(comment_use_cases.delete_comment, comment_id, current_user)
         return {"message": "Comment deleted successfully"}
     except ValueError as e:
         if "not authorized" in str(e):
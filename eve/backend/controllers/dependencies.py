@@ -0,0 +1,55 @@
+import os
+from typing import List
+from fastapi import Depends, HTTPException, Request
+from database import ReadSessionLocal
+from deadlines import QUERY_BUDGET_MS, set_deadline
+from use_cases import auth_use_cases
+
+# Comma-separated emails allowed to use the admin API
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.environ.get("EVE_ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
+
+MAX_LOOKUP_IDS = int(os.environ.get("EVE_MAX_LOOKUP_IDS", "1000"))  # Ids per multi-get request
+
+def parse_ids(ids: str) -> List[int]:
+    """Parse the comma separated ``ids`` query parameter"""
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma separated list of integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="ids cannot be empty")
+    if len(parsed) > MAX_LOOKUP_IDS:
+        raise HTTPException(status_code=400, detail=f"too many ids (max {MAX_LOOKUP_IDS})")
+    return parsed
+
+def query_budget(milliseconds: float = QUERY_BUDGET_MS):
+    """Dependency giving the route's read queries ``milliseconds`` to finish.
+
+    Async so the deadline is set in the request's own context, which the
+    threadpool copies for the route and its read session.
+    """
+    async def start_deadline():
+        set_deadline(milliseconds / 1000)
+    return start_deadline
+
+def get_current_user(request: Request):
+    session_id = request.headers.get("Authorization")
+    if not session_id:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+    # Use a short-lived read session so the connection is back in the pool
+    # before the route runs (write routes may wait on the writer queue)
+    with ReadSessionLocal() as db:
+        is_valid, email = auth_use_cases.validate_session(db, session_id)
+    if not is_valid:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    return email
+
+
+def get_admin_user(current_user: str = Depends(get_current_user)):
+    if current_user.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="admin access required")
+    return current_user
@@ -1,19 +1,35 @@
-from datetime import datetime, UTC
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
+import os
+from typing import Dict, List, Optional, Set, Union
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, field_validator
-from database import get_db
-from use_cases import auth_use_cases, event_use_cases
+from pydantic import BaseModel, Field, field_validator
+from database import get_read_db, run_write
+from controllers.comment_controller import PREVIEW_COMMENTS, CommentResponse
+from coalescing import coalesced_read
+from controllers.dependencies import MAX_LOOKUP_IDS, get_current_user, parse_ids, query_budget
+from deadlines import LIST_QUERY_BUDGET_MS
+from use_cases import comment_use_cases, event_use_cases
+
+INCLUDE_COMMENTS_LIMIT = int(os.environ.get("EVE_INCLUDE_COMMENTS_LIMIT", "10"))  # Per event, for ?include=comments
+INCLUDE_OPTIONS = {"comments", "previews", "stats"}
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
-class EventBase(BaseModel):
+class EventSummary(BaseModel):
     title: str
     description: Optional[str] = None
     place: Optional[str] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
+
+    @field_validator('start_time', 'end_time', mode='before')
+    def parse_datetime(cls, value):
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return value
+
+class EventBase(EventSummary):
     food: Optional[str] = None
     drinks: Optional[str] = None
     program: Optional[str] = None
@@ -22,77 +38,164 @@ class EventBase(BaseModel):
     theme: Optional[str] = None
     age_restrictions: Optional[str] = None
 
-    @field_validator('start_time', 'end_time', mode='before')
-    def parse_datetime(cls, value):
-        if isinstance(value, str):
-            return datetime.fromisoformat(value.replace('Z', '+00:00'))
-        return value
-
 class EventCreate(EventBase):
     pass
 
+class RatingStats(BaseModel):
+    average_rating: float
+    total_ratings: int
+    rating_distribution: Dict[int, int]
+
+# Related data requested with ``?include=``, left out of responses otherwise. Read
+# from ``included_*`` attributes, never from the ``comments`` relationship, so
+# validating an event cannot lazy load all its comments.
+class EventSummaryResponse(EventSummary):
+    """List entry; the optional details are only returned by ``GET /{event_id}``"""
+    id: int
+    author_email: str
+    comments: Optional[List[CommentResponse]] = Field(None, validation_alias="included_comments")
+    previews: Optional[List[CommentResponse]] = Field(None, validation_alias="included_previews")
+    stats: Optional[RatingStats] = Field(None, validation_alias="included_stats")
+
+    class Config:
+        from_attributes = True
+
 class EventResponse(EventBase):
     id: int
     author_email: str
+    comments: Optional[List[CommentResponse]] = Field(None, validation_alias="included_comments")
+    previews: Optional[List[CommentResponse]] = Field(None, validation_alias="included_previews")
+    stats: Optional[RatingStats] = Field(None, validation_alias="included_stats")
 
     class Config:
         from_attributes = True
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
-    session_id = request.headers.get("Authorization")
-    if not session_id:
-        raise HTTPException(status_code=401, detail="Authorization header required")
-    is_valid, email = auth_use_cases.validate_session(db, session_id)
-    if not is_valid:
-        raise HTTPException(status_code=401, detail="Invalid or expired session")
-    return email
-
-@router.post("", response_model=EventResponse)
-def create_event(event: EventCreate, 
-                db: Session = Depends(get_db),
+class EventLookupRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_LOOKUP_IDS)
+    include_archived: bool = False
+
+class EventLookupResult(BaseModel):
+    id: int
+    found: bool
+    event: Optional[EventResponse] = None
+
+class EventLookupResponse(BaseModel):
+    results: List[EventLookupResult]  # In request order, one per requested id
+
+def parse_include(include: Optional[str]) -> Set[str]:
+    """Parse the comma separated ``include`` query parameter"""
+    if not include:
+        return set()
+    options = {value.strip() for value in include.split(",") if value.strip()}
+    unknown = options - INCLUDE_OPTIONS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown include option: {', '.join(sorted(unknown))}")
+    return options
+
+def include_related(db: Session, events: list, include: Set[str], include_archived: bool = False) -> list:
+    """Attach the related data named in ``include`` to ``events``.
+
+    Each option is one batched query for all the events (per id chunk), so
+    a page costs the same few queries whatever its size.
+    """
+    ids = [event.id for event in events]
+    if "comments" in include:
+        comments = comment_use_cases.get_comments_for_events(db, ids, INCLUDE_COMMENTS_LIMIT, include_archived)
+        for event in events:
+            event.included_comments = comments[event.id]
+    if "previews" in include:
+        previews = comment_use_cases.get_comment_previews(db, ids, PREVIEW_COMMENTS, include_archived)
+        for event in events:
+            event.included_previews = previews[event.id]
+    if "stats" in include:
+        stats = comment_use_cases.get_rating_stats_for_events(db, ids, include_archived)
+        for event in events:
+            event.included_stats = stats[event.id]
+    return events
+
+def lookup_events(db: Session, ids: List[int], include_archived: bool = False) -> dict:
+    events = event_use_cases.get_events_by_ids(db, ids, include_archived)
+    return {"results": [
+        {"id": event_id, "found": event is not None, "event": event}
+        for event_id, event in zip(ids, events)
+    ]}
+
+@router.post("", response_model=EventResponse, response_model_exclude_unset=True)
+def create_event(event: EventCreate,
                 current_user: str = Depends(get_current_user)):
-    return event_use_cases.create_event(
-        db=db,
+    return run_write(
+        event_use_cases.create_event,
         author_email=current_user,
         **event.model_dump()
     )
 
-@router.get("", response_model=List[EventResponse])
-def list_events(db: Session = Depends(get_db),
+@router.get("", response_model=Union[List[EventSummaryResponse], EventLookupResponse],
+            response_model_exclude_unset=True,
+            dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
+def list_events(include_archived: bool = False,
+                ids: Optional[str] = None,
+                include: Optional[str] = None,
+                db: Session = Depends(get_read_db),
                 current_user: str = Depends(get_current_user)):
-    return event_use_cases.get_events(db)
+    include = parse_include(include)
+    if ids is not None:
+        # Multi-get: full events for the given ids, in order, with not-found markers
+        return lookup_events(db, parse_ids(ids), include_archived)
+    return include_related(db, event_use_cases.get_events(db, include_archived), include, include_archived)
 
-@router.get("/my", response_model=List[EventResponse])
-def list_my_events(db: Session = Depends(get_db),
+@router.post("/lookup", response_model=EventLookupResponse, response_model_exclude_unset=True,
+             dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
+def lookup_events_by_body(lookup: EventLookupRequest,
+                          db: Session = Depends(get_read_db),
+                          current_user: str = Depends(get_current_user)):
+    """Multi-get for id lists too long for a query string"""
+    return lookup_events(db, lookup.ids, lookup.include_archived)
+
+@router.get("/my", response_model=List[EventSummaryResponse], response_model_exclude_unset=True,
+            dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
+def list_my_events(include_archived: bool = False,
+                  include: Optional[str] = None,
+                  db: Session = Depends(get_read_db),
                   current_user: str = Depends(get_current_user)):
-    all_events = event_use_cases.get_events(db)
-    return [event for event in all_events if event.author_email == current_user]
+    include = parse_include(include)
+    events = event_use_cases.get_user_events(db, current_user, include_archived)
+    return include_related(db, events, include, include_archived)
 
-@router.get("/upcoming", response_model=List[EventResponse])
-def list_upcoming_events(db: Session = Depends(get_db),
+@router.get("/upcoming", response_model=List[EventSummaryResponse], response_model_exclude_unset=True,
+            dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
+def list_upcoming_events(include: Optional[str] = None,
+                        db: Session = Depends(get_read_db),
                         current_user: str = Depends(get_current_user)):
-    all_events = event_use_cases.get_events(db)
-    # Compare naive UTC datetimes
-    now = datetime.now(UTC).replace(tzinfo=None)
-    return [event for event in all_events if event.start_time > now]
+    include = parse_include(include)
+    return include_related(db, event_use_cases.get_upcoming_events(db), include)
 
-@router.get("/{event_id}", response_model=EventResponse)
+@router.get("/{event_id}", response_model=EventResponse, response_model_exclude_unset=True,
+            dependencies=[Depends(query_budget())])
 def get_event(event_id: int,
-              db: Session = Depends(get_db),
+              include_archived: bool = False,
+              include: Optional[str] = None,
+              db: Session = Depends(get_read_db),
               current_user: str = Depends(get_current_user)):
-    event = event_use_cases.get_event(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    return event
+    include = parse_include(include)
+
+    def render():
+        event = event_use_cases.get_event(db, event_id, include_archived)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        event = include_related(db, [event], include, include_archived)[0]
+        return EventResponse.model_validate(event).model_dump_json(exclude_unset=True).encode()
+
+    # A popular event is read by many clients at once: they share one query and serialization
+    key = ("event", event_id, include_archived, tuple(sorted(include)))
+    return Response(coalesced_read(key, render), media_type="application/json")
 
-@router.put("/{event_id}", response_model=EventResponse)
+@router.put("/{event_id}", response_model=EventResponse, response_model_exclude_unset=True)
 def update_event(event_id: int,
                 event: EventCreate,
-                db: Session = Depends(get_db),
                 current_user: str = Depends(get_current_user)):
     try:
-        updated_event = event_use_cases.update_event(
-            db=db,
+        updated_event = run_write(
+            event_use_cases.update_event,
             event_id=event_id,
             author_email=current_user,
             **event.model_dump()
@@ -107,10 +210,9 @@ def update_event(event_id: int,
 
 @router.delete("/{event_id}")
 def delete_event(event_id: int,
-                db: Session = Depends(get_db),
                 current_user: str = Depends(get_current_user)):
     try:
-        event_use_cases.delete_event(db, event_id, current_user)
+        run_write(event_use_cases.delete_event, event_id, current_user)
         return {"message": "Event deleted successfully"}
     except ValueError as e:
         if "not authorized" in str(e):
@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+import metrics
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+@router.get("")
+def get_metrics():
+    return metrics.snapshot()
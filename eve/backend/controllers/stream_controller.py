@@ -0,0 +1,122 @@
+import json
+import os
+import time
+from typing import List, Tuple
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from database import ReadSessionLocal
+from controllers.comment_controller import CommentResponse
+from controllers.dependencies import get_current_user
+from controllers.event_controller import EventResponse
+from data_version import data_version
+from models import EventComment
+from pubsub import DROPPED, ChangeFeed, broker
+from use_cases import event_use_cases, sync_use_cases
+
+STREAM_KEEPALIVE_SECONDS = float(os.environ.get("EVE_STREAM_KEEPALIVE_SECONDS", "15"))
+# Streams end after this long; EventSource clients reconnect on their own
+STREAM_MAX_SECONDS = float(os.environ.get("EVE_STREAM_MAX_SECONDS", "300"))
+STREAM_READ_BATCH = 500  # Change log entries per read
+
+ALL_EVENTS = "events"
+
+router = APIRouter(tags=["stream"])
+
+def event_topic(event_id: int) -> str:
+    return f"event:{event_id}"
+
+def sse(kind: str, data, seq: int = None) -> bytes:
+    """One Server-Sent Events frame"""
+    frame = f"event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+    return (f"id: {seq}\n" + frame if seq is not None else frame).encode()
+
+def read_changes(since: int) -> Tuple[int, List[Tuple[List[str], bytes]]]:
+    """Every change after ``since`` as ready-to-send frames with their topics.
+
+    Each change is serialized once, however many subscribers receive it.
+    """
+    messages = []
+    with ReadSessionLocal() as db:
+        while True:
+            changes = sync_use_cases.get_sync(db, since, STREAM_READ_BATCH)
+            since = changes["seq"]
+            for item in changes["events"]:
+                data = EventResponse.model_validate(item).model_dump(mode="json", exclude_unset=True)
+                messages.append(([ALL_EVENTS, event_topic(item.id)], sse("event", data, since)))
+            for item in changes["comments"]:
+                data = CommentResponse.model_validate(item).model_dump(mode="json")
+                messages.append(([ALL_EVENTS, event_topic(item.event_id)], sse("comment", data, since)))
+            for event_id in changes["deleted"]["events"]:
+                messages.append(([ALL_EVENTS, event_topic(event_id)],
+                                 sse("event_deleted", {"id": event_id}, since)))
+            # Tombstoned comments keep their row until purged; archived ones are gone
+            deleted = changes["deleted"]["comments"]
+            owners = dict(db.execute(
+                select(EventComment.id, EventComment.event_id).where(EventComment.id.in_(deleted))
+            ).all()) if deleted else {}
+            for comment_id in deleted:
+                topics = [ALL_EVENTS] + ([event_topic(owners[comment_id])] if comment_id in owners else [])
+                messages.append((topics, sse("comment_deleted",
+                                             {"id": comment_id, "event_id": owners.get(comment_id)}, since)))
+            if not changes["more"]:
+                return since, messages
+
+def latest_seq() -> int:
+    with ReadSessionLocal() as db:
+        return sync_use_cases.latest_seq(db)
+
+change_feed = ChangeFeed(broker, read_changes, latest_seq)
+
+# Woken by every commit; the feed reads the change log itself, so a spurious wake-up is harmless
+data_version.add_listener(change_feed.notify)
+
+async def _stream(topics):
+    # Subscribed here, so the finally clause runs for every subscription
+    subscription = broker.subscribe(*topics)
+    if subscription is None:
+        yield sse("busy", {"detail": "Too many open streams, please retry"})
+        return
+    try:
+        yield sse("ready", {"seq": change_feed.seq}, change_feed.seq)
+        ends_at = time.monotonic() + STREAM_MAX_SECONDS
+        while time.monotonic() < ends_at:
+            message = await subscription.get(min(STREAM_KEEPALIVE_SECONDS, ends_at - time.monotonic()))
+            if message is None:
+                yield b": keepalive\n\n"
+            elif message is DROPPED:
+                # Too slow to keep up: the client reconnects and catches up with /api/sync
+                yield sse("dropped", {"seq": change_feed.seq})
+                return
+            else:
+                yield message
+    finally:
+        broker.unsubscribe(subscription)
+
+def _open_stream(*topics: str) -> StreamingResponse:
+    if broker.at_capacity():
+        raise HTTPException(status_code=503, detail="Too many open streams, please retry",
+                            headers={"Retry-After": "5"})
+    return StreamingResponse(
+        _stream(topics),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _event_exists(event_id: int) -> bool:
+    with ReadSessionLocal() as db:
+        return event_use_cases.get_event(db, event_id) is not None
+
+# Async routes: an open stream is a suspended generator on the event loop, not a thread
+@router.get("/api/stream")
+async def stream_all(current_user: str = Depends(get_current_user)):
+    """Every event and comment change, as Server-Sent Events"""
+    return _open_stream(ALL_EVENTS)
+
+@router.get("/api/events/{event_id}/stream")
+async def stream_event(event_id: int, current_user: str = Depends(get_current_user)):
+    """Changes to one event and its comments, as Server-Sent Events"""
+    if not await run_in_threadpool(_event_exists, event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _open_stream(event_topic(event_id))
@@ -0,0 +1,35 @@
+import os
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from database import get_read_db
+from controllers.comment_controller import CommentResponse
+from controllers.dependencies import get_current_user, query_budget
+from controllers.event_controller import EventResponse
+from deadlines import LIST_QUERY_BUDGET_MS
+from use_cases import sync_use_cases
+
+SYNC_PAGE_SIZE = int(os.environ.get("EVE_SYNC_PAGE_SIZE", "500"))  # Changes per response
+
+router = APIRouter(prefix="/api/sync", tags=["sync"])
+
+class Tombstones(BaseModel):
+    events: List[int]
+    comments: List[int]
+
+class SyncResponse(BaseModel):
+    seq: int  # Pass as ``since`` on the next call
+    more: bool  # Another page is waiting
+    reset: bool  # ``since`` is unknown: drop local data and sync from 0
+    events: List[EventResponse]
+    comments: List[CommentResponse]
+    deleted: Tombstones
+
+@router.get("", response_model=SyncResponse, response_model_exclude_unset=True,
+            dependencies=[Depends(query_budget(LIST_QUERY_BUDGET_MS))])
+def sync(since: int = Query(0, ge=0),
+         db: Session = Depends(get_read_db),
+         current_user: str = Depends(get_current_user)):
+    """Events and comments changed after ``since``, with tombstones for deletions"""
+    return sync_use_cases.get_sync(db, since, SYNC_PAGE_SIZE)
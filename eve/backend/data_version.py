@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, List
+from background import PeriodicWorker
+import metrics
+
+# How often each process checks the database for commits made by other processes
+DATA_VERSION_POLL_MS = float(os.environ.get("EVE_DATA_VERSION_POLL_MS", "5"))
+
+class DataVersion:
+    """A counter that moves on after every commit that may have changed data.
+
+    Caches key their entries by the version they were computed at, so a
+    bump invalidates them without tracking what changed. Listeners are
+    called after each bump, on the committing thread, and must not block.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def current(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            value = self._value
+        for listener in list(self._listeners):
+            listener()
+        return value
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+data_version = DataVersion()
+
+class DataVersionWatcher:
+    """Bump a ``DataVersion`` when other connections commit to a database.
+
+    SQLite changes ``PRAGMA data_version`` on a connection whenever another
+    connection, in this or any other process, commits to the same file. In
+    WAL mode reading it only looks at the shared-memory WAL index, so every
+    worker process can poll it every few milliseconds and drop its cached
+    reads right after a sibling's write, without any external service.
+    """
+
+    def __init__(self, path: str, version: DataVersion = data_version):
+        self._path = path
+        self._version = version
+        self._connection = None
+        self._seen = None
+
+    def check(self, stop: threading.Event = None) -> bool:
+        """Bump the version if the database changed since the last check"""
+        if self._connection is None:
+            self._connection = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True,
+                                               isolation_level=None, check_same_thread=False)
+        seen = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._seen is not None and seen != self._seen
+        self._seen = seen
+        if changed:
+            metrics.inc("data_version.changes_seen")
+            self._version.bump()
+        return changed
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+def create_data_version_watcher(path: str, interval: float = DATA_VERSION_POLL_MS / 1000,
+                                version: DataVersion = data_version) -> PeriodicWorker:
+    return PeriodicWorker("data-version-watcher", interval, DataVersionWatcher(path, version).check)
@@ -1,40 +1,309 @@
+from concurrent.futures import Future
 from datetime import datetime
-from sqlalchemy import create_engine
+import queue
+import sqlite3
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from models import Base
+from data_version import data_version
+from deadlines import install_query_deadlines
+import metrics
 
 import os
 
-DATABASE_URL = "sqlite:///./data/eve.db"  # Relative to working directory
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False, "detect_types": 3},  # PARSE_DECLTYPES | PARSE_COLNAMES
-    json_serializer=lambda obj: obj.isoformat() if isinstance(obj, datetime) else str(obj)
-)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DATABASE_PATH = os.environ.get("EVE_DATABASE", os.path.join(DATA_DIR, "eve.db"))
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ARCHIVE_DATABASE_PATH = os.environ.get("EVE_ARCHIVE_DB", os.path.join(DATA_DIR, "archive.db"))  # Attached as "archive"
+READ_POOL_SIZE = int(os.environ.get("EVE_READ_POOL_SIZE", "5"))
+WRITE_QUEUE_SIZE = int(os.environ.get("EVE_WRITE_QUEUE_SIZE", "0"))  # 0 means unbounded
+WRITE_QUEUE_TIMEOUT = float(os.environ.get("EVE_WRITE_QUEUE_TIMEOUT", "1.0"))  # Seconds to wait for a free slot
+COMMENT_GROUP_COMMIT = os.environ.get("EVE_COMMENT_GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("EVE_GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("EVE_GROUP_COMMIT_MAX_BATCH", "64"))
+BUSY_TIMEOUT_MS = 5000
+
+def _create_engine(url: str = DATABASE_URL, **kwargs):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False, "detect_types": 3},  # PARSE_DECLTYPES | PARSE_COLNAMES
+        json_serializer=lambda obj: obj.isoformat() if isinstance(obj, datetime) else str(obj),
+        **kwargs
+    )
+
+@event.listens_for(Engine, "connect")
+def enable_foreign_keys(dbapi_connection, connection_record):
+    """Enforce foreign keys (off by default in SQLite) so ON DELETE CASCADE works"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+def configure_connections(engine, read_only: bool = False, archive_path: str = None) -> None:
+    """Set per-connection SQLite pragmas on every new connection of an engine.
+
+    WAL lets the read pool keep serving while the writer commits, and
+    ``query_only`` guarantees read connections never take the write lock.
+    With ``archive_path`` the archive database is attached as ``archive``.
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        if archive_path:
+            # Attached first, so the pragmas below apply to it too
+            cursor.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        else:
+            cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.close()
+
+# General purpose engine, used for schema setup and scripts
+engine = _create_engine()
+configure_connections(engine, archive_path=ARCHIVE_DATABASE_PATH)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read-only connection pool used by GET routes
+read_engine = _create_engine(pool_size=READ_POOL_SIZE, max_overflow=0)
+configure_connections(read_engine, read_only=True, archive_path=ARCHIVE_DATABASE_PATH)
+install_query_deadlines(read_engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# The single connection all application writes go through
+write_engine = _create_engine(pool_size=1, max_overflow=0)
+configure_connections(write_engine, archive_path=ARCHIVE_DATABASE_PATH)
+# Only jobs that carry a request's budget over (atomic batches) have a deadline here
+install_query_deadlines(write_engine)
+WriteSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=write_engine,
+    # Results are handed to other threads, so keep their loaded state
+    expire_on_commit=False
+)
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(WriteSessionLocal, "after_commit")
+def bump_data_version(session):
+    # Read caches are keyed by the version, so this invalidates them all at
+    # once; commits of other processes are seen by the data version watcher
+    data_version.bump()
+
+class WriteQueueFull(Exception):
+    """Raised when a bounded write queue has no room for another job"""
+
+class WriteQueue:
+    """Serialize database writes through one dedicated writer thread.
+
+    Jobs are callables taking a session as their first argument. They run one
+    at a time, each on a fresh session bound to the writer connection, and
+    the job's result or exception is handed back to the submitting thread.
+    Queue depth and the time jobs spend waiting are exported as metrics.
+    """
+
+    def __init__(self, session_factory, maxsize: int = 0, put_timeout: float = WRITE_QUEUE_TIMEOUT,
+                 name: str = "db.write_queue"):
+        self._session_factory = session_factory
+        self._queue = queue.Queue(maxsize)
+        self._put_timeout = put_timeout
+        self._name = name
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn(session, *args, **kwargs)`` on the writer and return its result"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("cannot submit a write from inside a write job")
+        return self.enqueue(fn, *args, **kwargs).result()
+
+    def enqueue(self, fn, *args, **kwargs) -> Future:
+        """Queue a job without waiting for it; safe to call from a write job"""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put((fn, args, kwargs, future, time.perf_counter()), timeout=self._put_timeout)
+        except queue.Full:
+            metrics.inc(f"{self._name}.rejected")
+            raise WriteQueueFull("write queue is full")
+        metrics.set_gauge(f"{self._name}.depth", self._queue.qsize())
+        return future
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Finish queued jobs and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            # The sentinel may wait behind a full queue; jobs ahead of it still run
+            self._queue.put(None, timeout=timeout)
+            thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs, future, enqueued_at = item
+            metrics.set_gauge(f"{self._name}.depth", self._queue.qsize())
+            metrics.observe(f"{self._name}.wait_seconds", time.perf_counter() - enqueued_at)
+            if not future.set_running_or_notify_cancel():
+                continue
+            started_at = time.perf_counter()
+            session = self._session_factory()
+            try:
+                future.set_result(fn(session, *args, **kwargs))
+            except BaseException as exc:
+                session.rollback()
+                future.set_exception(exc)
+            finally:
+                session.close()
+                metrics.observe(f"{self._name}.run_seconds", time.perf_counter() - started_at)
+
+write_queue = WriteQueue(WriteSessionLocal, maxsize=WRITE_QUEUE_SIZE)
+
+class GroupCommit:
+    """Coalesce concurrent small writes into one transaction.
+
+    The first caller to arrive lingers for ``window`` seconds (or until
+    ``max_batch`` items are pending) and then queues a flush job; everyone
+    arriving meanwhile joins that batch. ``batch_fn(session, items)`` must
+    return one result per item, using an exception instance for items that
+    failed, so each caller still gets its own row or error back.
+    """
+
+    def __init__(self, batch_fn, writer: WriteQueue = None, window: float = 0.005,
+                 max_batch: int = 64, name: str = "db.group_commit"):
+        self._batch_fn = batch_fn
+        self._writer = writer or write_queue
+        self._window = window
+        self._max_batch = max_batch
+        self._name = name
+        self._cond = threading.Condition()
+        self._pending = []
+        self._scheduled = False
+
+    def submit(self, item):
+        """Add ``item`` to the next batch and wait for its own result"""
+        future = Future()
+        with self._cond:
+            self._pending.append((item, future))
+            leader = not self._scheduled
+            if leader:
+                self._scheduled = True
+                deadline = time.monotonic() + self._window
+                while len(self._pending) < self._max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            elif len(self._pending) >= self._max_batch:
+                self._cond.notify_all()
+        if leader:
+            try:
+                self._writer.enqueue(self._flush)
+            except WriteQueueFull as exc:
+                with self._cond:
+                    batch, self._pending = self._pending, []
+                    self._scheduled = False
+                self._fail(batch, exc)
+        return future.result()
+
+    def _flush(self, db) -> None:
+        # Items that arrive while a batch commits go out in the next round of
+        # this same job, so nothing has to be re-queued behind other writes
+        while True:
+            with self._cond:
+                batch = self._pending[:self._max_batch]
+                self._pending = self._pending[self._max_batch:]
+                if not batch:
+                    self._scheduled = False
+                    return
+            metrics.observe(f"{self._name}.batch_size", len(batch))
+            try:
+                results = self._batch_fn(db, [item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"group commit returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as exc:
+                db.rollback()
+                self._fail(batch, exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    @staticmethod
+    def _fail(batch, exc: BaseException) -> None:
+        """Fail every future in ``batch`` with its own copy of a shared error"""
+        for _, future in batch:
+            if future.done():
+                continue
+            if isinstance(exc, WriteQueueFull):
+                error = WriteQueueFull(str(exc))
+            else:
+                error = RuntimeError(f"group commit failed: {exc}")
+            error.__cause__ = exc
+            future.set_exception(error)
+
+def run_write(fn, *args, **kwargs):
+    """Run a write use case on the shared writer connection"""
+    return write_queue.submit(fn, *args, **kwargs)
+
 def init_db():
-    # Create parent directory if it doesn't exist
-    import os
-    # Keep the leading slash by splitting after ////
-    parts = DATABASE_URL.split('////')
-    if len(parts) == 2:
-        db_path = parts[1]  # This will keep the leading slash
-        db_dir = os.path.dirname(db_path)
-        if not os.path.exists(db_dir):
-            os.makedirs(db_dir, mode=0o777, exist_ok=True)
-        
-        # Create database file with proper permissions if it doesn't exist
-        if not os.path.exists(db_path):
-            with open(db_path, 'w') as f:
-                pass
-            os.chmod(db_path, 0o666)
-    
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    """Create the database if needed and bring it to the latest schema.
+
+    An explicit step (``python backend/main.py migrate``), run once per
+    deployment rather than by every worker.
+    """
+    db_dir = os.path.dirname(DATABASE_PATH)
+    if not os.path.exists(db_dir):
+        os.makedirs(db_dir, mode=0o777, exist_ok=True)
+
+    # Create database file with proper permissions if it doesn't exist
+    if not os.path.exists(DATABASE_PATH):
+        with open(DATABASE_PATH, 'w') as f:
+            pass
+        os.chmod(DATABASE_PATH, 0o666)
+
+    # Create all tables and upgrade existing ones
+    from migrations import migrate
+    migrate(engine)
+
+def check_schema() -> None:
+    """Fail fast when the database was not migrated to this code's schema"""
+    from migrations import LATEST_VERSION, get_version
+    with read_engine.connect() as conn:
+        version = get_version(conn)
+    if version != LATEST_VERSION:
+        raise RuntimeError(f"{DATABASE_PATH} has schema version {version}, expected {LATEST_VERSION}; "
+                           "run `python backend/main.py migrate` first")
 
 def get_db():
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
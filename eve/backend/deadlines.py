@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import sqlite3
+import time
+from sqlalchemy import event
+import metrics
+
+QUERY_BUDGET_MS = float(os.environ.get("EVE_QUERY_BUDGET_MS", "2000"))  # Default for read routes
+LIST_QUERY_BUDGET_MS = float(os.environ.get("EVE_LIST_QUERY_BUDGET_MS", "1000"))  # Unpaged list routes
+# SQLite VM instructions between deadline checks
+PROGRESS_HANDLER_STEPS = int(os.environ.get("EVE_PROGRESS_HANDLER_STEPS", "10000"))
+
+# time.monotonic() by which the current request's queries must finish; the
+# threadpool copies the request's context, so the value follows the route
+_deadline: ContextVar[float | None] = ContextVar("query_deadline", default=None)
+
+class QueryDeadlineExceeded(Exception):
+    """Raised when a query is interrupted for running past its request's budget"""
+
+def set_deadline(seconds: float | None) -> None:
+    """Give the queries of the current request (context) ``seconds`` to finish"""
+    _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+def remaining_budget() -> float | None:
+    """Seconds left before the current context's deadline, None without one"""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+def deadline_passed() -> bool:
+    deadline = _deadline.get()
+    return deadline is not None and time.monotonic() > deadline
+
+@contextmanager
+def query_deadline(seconds: float | None):
+    """Apply a deadline to the queries run inside the block"""
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def install_query_deadlines(engine, steps: int = PROGRESS_HANDLER_STEPS) -> None:
+    """Interrupt queries on ``engine`` that outlive their context's deadline.
+
+    SQLite calls the progress handler every ``steps`` VM instructions on the
+    thread running the query; a true result aborts the statement. The
+    resulting "interrupted" error is raised as ``QueryDeadlineExceeded``.
+    """
+    @event.listens_for(engine, "connect")
+    def set_progress_handler(dbapi_connection, connection_record):
+        dbapi_connection.set_progress_handler(deadline_passed, steps)
+
+    @event.listens_for(engine, "handle_error")
+    def raise_deadline_exceeded(context):
+        error = context.original_exception
+        if isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error) and deadline_passed():
+            metrics.inc("db.query_deadline_exceeded")
+            raise QueryDeadlineExceeded("query exceeded its time budget") from error
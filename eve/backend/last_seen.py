@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+from datetime import datetime
+from database import run_write
+from use_cases import session_use_cases
+from background import PeriodicWorker
+import metrics
+
+LAST_SEEN_FLUSH_INTERVAL = float(os.environ.get("EVE_LAST_SEEN_FLUSH_INTERVAL", "5"))  # Seconds between flushes
+
+class LastSeenBuffer:
+    """The sliding expiry earned by recent requests, per session key.
+
+    Validation records activity here instead of writing; the flusher hands
+    the accumulated expiries to one batched UPDATE, so the write rate
+    depends on the flush interval, not on the request rate.
+    """
+
+    def __init__(self):
+        self._expiries = {}
+        self._lock = threading.Lock()
+
+    def touch(self, key: bytes, expires_at: datetime) -> None:
+        with self._lock:
+            if expires_at > self._expiries.get(key, expires_at.min):
+                self._expiries[key] = expires_at
+
+    def get(self, key: bytes) -> datetime | None:
+        with self._lock:
+            return self._expiries.get(key)
+
+    def drain(self) -> dict:
+        """Take every pending expiry, leaving the buffer empty"""
+        with self._lock:
+            expiries, self._expiries = self._expiries, {}
+        return expiries
+
+last_seen = LastSeenBuffer()
+
+def flush_last_seen(stop: threading.Event, submit=run_write, buffer: LastSeenBuffer = last_seen) -> int:
+    """Write the buffered expiries back as one write job; returns the rows extended"""
+    expiries = buffer.drain()
+    if not expiries:
+        return 0
+    started_at = time.perf_counter()
+    try:
+        extended = submit(session_use_cases.extend_sessions, expiries)
+    except Exception:
+        # Keep the activity for the next round instead of dropping it
+        for key, expires_at in expiries.items():
+            buffer.touch(key, expires_at)
+        raise
+    metrics.observe("sessions.flush_seconds", time.perf_counter() - started_at)
+    metrics.observe("sessions.flush_rows", extended)
+    metrics.inc("sessions.extended", extended)
+    return extended
+
+def create_last_seen_flusher(interval: float = LAST_SEEN_FLUSH_INTERVAL) -> PeriodicWorker:
+    return PeriodicWorker("last-seen-flusher", interval, flush_last_seen)
@@ -1,48 +1,133 @@
 #!/usr/bin/env python3
-import os
+"""Eve Event Planner API.
+
+Importing this module has no side effects and stays cheap: ``create_app``
+imports the framework, routers and models and builds an application, and
+its lifespan starts the background work. The schema is set up by an
+explicit step, ``python backend/main.py migrate``; ``python backend/main.py``
+migrates and then serves. Workers can run ``uvicorn --factory main:create_app``.
+"""
 import sys
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
-from fastapi.middleware.cors import CORSMiddleware
-from controllers import auth_controller, event_controller, comment_controller
-from database import init_db
-
-# Ensure we're in the correct working directory
-os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-app = FastAPI(title="Eve Event Planner API")
-
-@app.exception_handler(ValueError)
-async def value_error_handler(request: Request, exc: ValueError):
-    status_code = 403 if "not authorized" in str(exc) else 400
-    return JSONResponse(
-        status_code=status_code,
-        content={"detail": str(exc)},
+from contextlib import asynccontextmanager
+from settings import Settings
+
+def create_app(settings: Settings = None):
+    settings = settings or Settings()
+
+    import asyncio
+    import threading
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+    from fastapi.middleware.cors import CORSMiddleware
+    from admission import AdmissionMiddleware
+    from controllers import (admin_controller, auth_controller, batch_controller, event_controller,
+                             comment_controller, metrics_controller, stream_controller, sync_controller)
+    from data_version import create_data_version_watcher
+    from database import DATABASE_PATH, ReadSessionLocal, WriteQueueFull, check_schema, init_db, write_queue
+    from deadlines import QueryDeadlineExceeded
+    from purger import create_purger
+    from archiver import create_archiver
+    from revocation import create_revocation_refresher, load_revocations
+    from last_seen import create_last_seen_flusher, flush_last_seen
+    from use_cases import auth_use_cases
+
+    if auth_use_cases.SESSION_MODE == "signed":
+        # A per-process key would log users out on every other worker and restart
+        auth_use_cases.check_token_secret()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if settings.migrate:
+            init_db()
+        check_schema()
+        # Logouts of signed tokens survive restarts
+        with ReadSessionLocal() as db:
+            load_revocations(db)
+        # Commits of other worker processes invalidate this one's cached reads
+        workers = [create_data_version_watcher(DATABASE_PATH), create_last_seen_flusher()]
+        if settings.background_jobs:
+            workers += [create_purger(), create_archiver()]
+        if auth_use_cases.SESSION_MODE == "signed":
+            workers.append(create_revocation_refresher(ReadSessionLocal))
+        for worker in workers:
+            worker.start()
+        change_feed = asyncio.create_task(stream_controller.change_feed.run())
+        yield
+        change_feed.cancel()
+        # Stop background jobs first so they cannot queue writes behind the stop sentinel
+        for worker in workers:
+            worker.stop()
+        # Keep the activity seen since the last flush
+        flush_last_seen(threading.Event())
+        # Let queued writes finish before the process exits
+        write_queue.stop()
+
+    app = FastAPI(title="Eve Event Planner API", lifespan=lifespan)
+
+    @app.exception_handler(ValueError)
+    async def value_error_handler(request: Request, exc: ValueError):
+        status_code = 403 if "not authorized" in str(exc) else 400
+        return JSONResponse(
+            status_code=status_code,
+            content={"detail": str(exc)},
+        )
+
+    @app.exception_handler(WriteQueueFull)
+    async def write_queue_full_handler(request: Request, exc: WriteQueueFull):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is busy, please retry"},
+            headers={"Retry-After": "1"},
+        )
+
+    @app.exception_handler(QueryDeadlineExceeded)
+    async def query_deadline_handler(request: Request, exc: QueryDeadlineExceeded):
+        return JSONResponse(
+            status_code=504,
+            content={"detail": "Request took too long, please narrow it down or retry"},
+        )
+
+    @app.options("/{path:path}")
+    async def options_handler():
+        return {"message": "OK"}
+
+    # Shed load before requests queue up for a worker thread; added before
+    # CORS so rejections still carry the CORS headers
+    app.add_middleware(AdmissionMiddleware)
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=3600  # Cache preflight requests for 1 hour
     )
 
-@app.options("/{path:path}")
-async def options_handler():
-    return {"message": "OK"}
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow any origin
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=3600  # Cache preflight requests for 1 hour
-)
-
-# Include routers
-app.include_router(auth_controller.router)
-app.include_router(event_controller.router)
-app.include_router(comment_controller.router)
-
-# Initialize database
-init_db()
+    # Include routers
+    app.include_router(auth_controller.router)
+    app.include_router(event_controller.router)
+    app.include_router(comment_controller.router)
+    app.include_router(metrics_controller.router)
+    app.include_router(admin_controller.router)
+    app.include_router(batch_controller.router)
+    app.include_router(sync_controller.router)
+    app.include_router(stream_controller.router)
+
+    return app
+
+def __getattr__(name: str):
+    # ``uvicorn main:app`` keeps working: the default app is built on first use
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=2021)
\ No newline at end of file
+    from database import init_db
+    init_db()
+    if sys.argv[1:] != ["migrate"]:
+        import uvicorn
+        uvicorn.run(create_app(), host="0.0.0.0", port=2021)
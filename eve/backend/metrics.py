@@ -0,0 +1,66 @@
+from collections import deque
+from typing import Dict
+import threading
+
+# Number of recent samples kept per timing for percentile estimates
+SAMPLE_WINDOW = 1024
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_timings: Dict[str, dict] = {}
+
+def inc(name: str, value: float = 1) -> None:
+    """Increment a monotonically increasing counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def set_gauge(name: str, value: float) -> None:
+    """Set a point-in-time value such as a queue depth"""
+    with _lock:
+        _gauges[name] = value
+
+def observe(name: str, value: float) -> None:
+    """Record one sample (usually seconds) of a timing"""
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = {"count": 0, "sum": 0.0, "max": 0.0, "samples": deque(maxlen=SAMPLE_WINDOW)}
+            _timings[name] = timing
+        timing["count"] += 1
+        timing["sum"] += value
+        timing["max"] = max(timing["max"], value)
+        timing["samples"].append(value)
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def snapshot() -> Dict:
+    """Get a JSON-serializable copy of all metrics"""
+    with _lock:
+        timings = {}
+        for name, timing in _timings.items():
+            ordered = sorted(timing["samples"])
+            timings[name] = {
+                "count": timing["count"],
+                "sum": timing["sum"],
+                "avg": timing["sum"] / timing["count"] if timing["count"] else 0.0,
+                "max": timing["max"],
+                "p50": _percentile(ordered, 0.50),
+                "p99": _percentile(ordered, 0.99),
+            }
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "timings": timings,
+        }
+
+def reset() -> None:
+    """Clear all metrics (used by tests and benchmarks)"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
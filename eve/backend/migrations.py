@@ -0,0 +1,237 @@
+"""Schema migrations for existing databases.
+
+The schema version is kept in ``PRAGMA user_version``, separately for the
+main database and the attached archive. A new database gets the current
+schema from ``create_all`` and is stamped with the latest version; an
+existing one runs every migration newer than its version. Migrations take
+the schema name ("main" or "archive") and return the names of tables that
+must be rebuilt; those are rebuilt from the current models once every
+pending migration has run. Together they must leave an existing database
+matching the models exactly. The change log triggers are created last.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateTable
+from models import CHANGE_LOG_TRIGGERS, DETAIL_FIELDS, Base, archive_metadata, session_key
+
+SCHEMAS = {"main": Base.metadata, "archive": archive_metadata}
+
+def _columns(conn, table: str, schema: str = "main") -> set:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA {schema}.table_info({table})")}
+
+def _add_column(conn, table: str, column: str, ddl: str, schema: str = "main") -> None:
+    if column not in _columns(conn, table, schema):
+        conn.exec_driver_sql(f"ALTER TABLE {schema}.{table} ADD COLUMN {column} {ddl}")
+
+def _model_table(schema: str, name: str):
+    metadata = SCHEMAS[schema]
+    return metadata.tables[name if metadata.schema is None else f"{metadata.schema}.{name}"]
+
+def _rebuild_table(conn, schema: str, name: str) -> None:
+    """Recreate a table from its model definition, keeping its rows.
+
+    SQLite cannot alter a primary key, column type or table options in
+    place, so this follows the documented create/copy/drop/rename procedure.
+    Columns the model no longer has are dropped. Foreign keys must be off
+    (see ``migrate``) or dropping the old table would cascade.
+    """
+    table = _model_table(schema, name)
+    qualified = f"{schema}.{name}"
+    ddl = str(CreateTable(table).compile(dialect=conn.dialect)).strip()
+    header = f"CREATE TABLE {qualified if table.schema else name} ("
+    if not ddl.startswith(header):
+        raise RuntimeError(f"unexpected DDL for {qualified}: {ddl}")
+    # Left over if an earlier run was interrupted; DDL is not transactional here
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {qualified}_new")
+    conn.exec_driver_sql(f"CREATE TABLE {qualified}_new (" + ddl[len(header):])
+    existing = _columns(conn, name, schema)
+    columns = ", ".join(column.name for column in table.columns if column.name in existing)
+    conn.exec_driver_sql(f"INSERT INTO {qualified}_new ({columns}) SELECT {columns} FROM {qualified}")
+    conn.exec_driver_sql(f"DROP TABLE {qualified}")
+    conn.exec_driver_sql(f"ALTER TABLE {qualified}_new RENAME TO {name}")
+    for index in table.indexes:
+        index.create(conn)
+
+def add_soft_delete(conn, schema: str) -> None:
+    """Tombstone columns for events and comments, plus the comment event_id index"""
+    _add_column(conn, "events", "deleted_at", "DATETIME", schema)
+    _add_column(conn, "event_comments", "deleted_at", "DATETIME", schema)
+    conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {schema}.ix_events_deleted_at ON events (deleted_at)")
+    conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {schema}.ix_event_comments_deleted_at ON event_comments (deleted_at)")
+    conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {schema}.ix_event_comments_event_id ON event_comments (event_id)")
+
+def use_autoincrement_ids(conn, schema: str) -> set:
+    """Stop SQLite from reusing the ids of deleted or archived events and comments"""
+    rebuild = set()
+    for name in ("events", "event_comments"):
+        sql = conn.exec_driver_sql(
+            f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).scalar()
+        if "AUTOINCREMENT" not in sql.upper():
+            rebuild.add(name)
+    return rebuild
+
+def _epoch_microseconds(column: str) -> str:
+    """SQL converting a stored DateTime ("YYYY-MM-DD HH:MM:SS[.ffffff]") to epoch microseconds"""
+    return (
+        f"CAST(strftime('%s', {column}) AS INTEGER) * 1000000"
+        f" + CAST(COALESCE(NULLIF(substr({column}, 21, 6), ''), '0') AS INTEGER)"
+    )
+
+def store_event_times_as_epochs(conn, schema: str) -> set:
+    """Event times as INTEGER epoch microseconds, with (deleted_at, time) indexes for range scans"""
+    for column in ("start_time", "end_time"):
+        conn.exec_driver_sql(
+            f"UPDATE {schema}.events SET {column} = {_epoch_microseconds(column)} "
+            f"WHERE typeof({column}) = 'text'"
+        )
+    # The rebuild declares the columns INTEGER and recreates the indexes
+    return {"events"}
+
+def intern_user_emails(conn, schema: str) -> set:
+    """Replace stored email strings with integer ids into the users table.
+
+    Archived rows refer to the ids of the main users table, so archive
+    emails are interned there and the rows copied to the archive's users.
+    Comments kept the email twice (``user_id`` and ``author_email``, always
+    equal); ``author_email`` is kept.
+    """
+    references = [("events", "author_email", "author_id"), ("event_comments", "author_email", "author_id")]
+    if schema == "main":
+        references.append(("sessions", "user_email", "user_id"))
+    references = [ref for ref in references if ref[1] in _columns(conn, ref[0], schema)]
+    if not references:
+        return set()
+
+    emails = " UNION ".join(f"SELECT {email} FROM {schema}.{table}" for table, email, _ in references)
+    conn.exec_driver_sql(f"INSERT OR IGNORE INTO main.users (email) {emails}")
+    if schema != "main":
+        conn.exec_driver_sql(
+            f"INSERT OR IGNORE INTO {schema}.users (id, email) "
+            f"SELECT id, email FROM main.users WHERE email IN ({emails})"
+        )
+    for table, email, key in references:
+        _add_column(conn, table, key, "INTEGER", schema)
+        conn.exec_driver_sql(
+            f"UPDATE {schema}.{table} SET {key} = (SELECT id FROM main.users WHERE email = {table}.{email})"
+        )
+    return {table for table, _, _ in references}
+
+def split_event_details(conn, schema: str) -> set:
+    """Move the optional descriptive columns of events into ``event_details``"""
+    if not set(DETAIL_FIELDS) <= _columns(conn, "events", schema):
+        return set()
+    columns = ", ".join(DETAIL_FIELDS)
+    conn.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {schema}.event_details (event_id, {columns}) "
+        f"SELECT id, {columns} FROM {schema}.events WHERE COALESCE({columns}) IS NOT NULL"
+    )
+    # The rebuild drops the moved columns
+    return {"events"}
+
+def hash_session_ids(conn, schema: str) -> set:
+    """Key sessions by the 16-byte hash of their token in a WITHOUT ROWID table"""
+    if schema != "main":
+        return set()
+    tokens = conn.exec_driver_sql("SELECT id FROM main.sessions WHERE typeof(id) = 'text'").scalars().all()
+    if tokens:
+        conn.exec_driver_sql(
+            "UPDATE main.sessions SET id = ? WHERE id = ?",
+            [(session_key(token), token) for token in tokens]
+        )
+    # The rebuild declares the BLOB key and drops the rowid
+    return {"sessions"}
+
+def add_comment_rating_index(conn, schema: str) -> None:
+    """Index for comment pages sorted by rating"""
+    conn.exec_driver_sql(
+        f"CREATE INDEX IF NOT EXISTS {schema}.ix_event_comments_event_id_rating ON event_comments (event_id, rating)"
+    )
+
+def backfill_change_log(conn, schema: str) -> None:
+    """Log every existing event and comment, so a sync from zero sees them all"""
+    if schema != "main":
+        return
+    for entity, table in (("event", "events"), ("comment", "event_comments")):
+        conn.exec_driver_sql(
+            f"INSERT INTO main.change_log (entity, entity_id, deleted) "
+            f"SELECT '{entity}', id, deleted_at IS NOT NULL FROM main.{table} "
+            f"WHERE id NOT IN (SELECT entity_id FROM main.change_log WHERE entity = '{entity}') ORDER BY id"
+        )
+
+def expire_change_log_tombstones(conn, schema: str) -> None:
+    """Time stamp change log entries, so old tombstones can be compacted"""
+    if schema != "main":
+        return
+    _add_column(conn, "change_log", "changed_at", "INTEGER NOT NULL DEFAULT 0", schema)
+    # Existing entries count from now, rather than expiring at once
+    conn.exec_driver_sql("UPDATE main.change_log SET changed_at = CAST(strftime('%s', 'now') AS INTEGER) * 1000000")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS main.ix_change_log_deleted_changed_at ON change_log (deleted, changed_at)"
+    )
+    # Recreated with the new definitions once the migrations are done
+    for name in CHANGE_LOG_TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS main.{name}")
+
+def create_change_log_triggers(conn) -> None:
+    for name, definition in CHANGE_LOG_TRIGGERS.items():
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS main.{name} {definition} END")
+
+# Ordered list of (version, migration); append new migrations at the end
+MIGRATIONS = [
+    (1, add_soft_delete),
+    (2, use_autoincrement_ids),
+    (3, store_event_times_as_epochs),
+    (4, intern_user_emails),
+    (5, split_event_details),
+    (6, hash_session_ids),
+    (7, add_comment_rating_index),
+    (8, backfill_change_log),
+    (9, expire_change_log_tombstones),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_version(conn, schema: str = "main") -> int:
+    return conn.exec_driver_sql(f"PRAGMA {schema}.user_version").scalar()
+
+def attached_schemas(conn) -> list:
+    """The schemas to migrate: main, plus the archive when it is attached"""
+    attached = {row[1] for row in conn.exec_driver_sql("PRAGMA database_list")}
+    return [schema for schema in SCHEMAS if schema in attached]
+
+def _migrate_schema(conn, schema: str) -> int:
+    fresh = not inspect(conn).has_table("events", schema=schema)
+    SCHEMAS[schema].create_all(bind=conn)
+    version = LATEST_VERSION if fresh else get_version(conn, schema)
+    rebuild = set()
+    for target, migration in MIGRATIONS:
+        if target > version:
+            rebuild |= migration(conn, schema) or set()
+            version = target
+    for name in sorted(rebuild):
+        _rebuild_table(conn, schema, name)
+    if schema == "main":
+        # Last, as they need the final columns and a rebuild drops a table's triggers
+        create_change_log_triggers(conn)
+    conn.exec_driver_sql(f"PRAGMA {schema}.user_version = {version}")
+    violations = conn.exec_driver_sql(f"PRAGMA {schema}.foreign_key_check").fetchall()
+    if violations:
+        raise RuntimeError(f"foreign key violations after migrating {schema}: {violations}")
+    return version
+
+def migrate(engine) -> int:
+    """Bring the database behind ``engine`` to the latest schema; returns the version"""
+    with engine.connect() as conn:
+        # Must be set outside a transaction; table rebuilds would cascade otherwise
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        conn.commit()
+        try:
+            versions = {}
+            for schema in attached_schemas(conn):
+                versions[schema] = _migrate_schema(conn, schema)
+                conn.commit()
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("PRAGMA foreign_keys = ON")
+            conn.commit()
+    return versions["main"]
@@ -1,18 +1,76 @@
-from datetime import datetime, UTC
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, create_engine
-from sqlalchemy.orm import declarative_base, relationship
+from datetime import datetime, timedelta, UTC
+import hashlib
+from sqlalchemy import (Boolean, Column, Index, Integer, LargeBinary, MetaData, String, DateTime, ForeignKey,
+                        UniqueConstraint, create_engine, select, text)
+from sqlalchemy.orm import column_property, declarative_base, relationship, synonym
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
 
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+class UTCEpoch(TypeDecorator):
+    """UTC datetime stored as INTEGER microseconds since the Unix epoch.
+
+    Accepts and returns naive UTC datetimes, like ``DateTime`` does, but
+    comparisons and index entries work on integers instead of ISO text.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(UTC).replace(tzinfo=None)
+        return (value - EPOCH) // MICROSECOND
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else EPOCH + value * MICROSECOND
+
+class User(Base):
+    """Interned user emails; other tables refer to users by integer id"""
+    __tablename__ = 'users'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = Column(Integer, primary_key=True)
+    email = Column(String, nullable=False, unique=True)
+
+def email_of(user_id_column, deferred: bool = False):
+    """Read-only email of the user a row refers to, as a correlated subquery.
+
+    Deferred properties are left out of ORM ``INSERT/UPDATE ... RETURNING``
+    (which cannot embed the subquery); queries load them with ``undefer`` and
+    writes fill them in with ``set_committed_value``.
+    """
+    return column_property(
+        select(User.email).where(User.id == user_id_column).correlate_except(User).scalar_subquery(),
+        deferred=deferred
+    )
+
+DETAIL_FIELDS = ['food', 'drinks', 'program', 'parking_info', 'music', 'theme', 'age_restrictions']
+
+def _detail(name: str):
+    """Read-only event attribute backed by its ``details`` row, None without one"""
+    return property(lambda self: getattr(self.details, name, None))
+
 class Event(Base):
     __tablename__ = 'events'
+    __table_args__ = (
+        # Every read filters on deleted_at IS NULL, so it leads the time indexes
+        Index('ix_events_deleted_at_start_time', 'deleted_at', 'start_time'),
+        Index('ix_events_deleted_at_end_time', 'deleted_at', 'end_time'),
+        # Never reuse ids, archived events keep theirs
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
     description = Column(String, nullable=True)
     place = Column(String, nullable=True)
-    start_time = Column(DateTime, nullable=True)  # Stored as UTC
-    end_time = Column(DateTime, nullable=True)  # Stored as UTC
+    start_time = Column(UTCEpoch, nullable=True)  # Stored as UTC
+    end_time = Column(UTCEpoch, nullable=True)  # Stored as UTC
 
     @property
     def start_time_utc(self):
@@ -21,6 +79,27 @@ class Event(Base):
     @property
     def end_time_utc(self):
         return self.end_time.replace(tzinfo=UTC) if self.end_time else None
+    food = _detail('food')
+    drinks = _detail('drinks')
+    program = _detail('program')
+    parking_info = _detail('parking_info')
+    music = _detail('music')
+    theme = _detail('theme')
+    age_restrictions = _detail('age_restrictions')
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    author_email = email_of(author_id, deferred=True)
+    deleted_at = Column(DateTime, nullable=True)  # Tombstone, purged in the background
+    
+    # Comments are removed by the database (ON DELETE CASCADE), never loaded for deletion
+    comments = relationship("EventComment", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
+    # Loaded by get_event and the writes; list responses never touch them
+    details = relationship("EventDetails", uselist=False, passive_deletes=True)
+
+class EventDetails(Base):
+    """Optional descriptive event fields, kept out of the rows list scans read"""
+    __tablename__ = 'event_details'
+
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
     food = Column(String)
     drinks = Column(String)
     program = Column(String)
@@ -28,27 +107,47 @@ class Event(Base):
     music = Column(String)
     theme = Column(String)
     age_restrictions = Column(String)
-    author_email = Column(String, nullable=False)
-    
-    comments = relationship("EventComment", back_populates="event", cascade="all, delete-orphan")
 
 class EventComment(Base):
     __tablename__ = 'event_comments'
+    __table_args__ = (
+        # Comment pages sorted by rating; index entries end with the rowid (id),
+        # so ix_event_comments_event_id already serves the newest/oldest orders
+        Index('ix_event_comments_event_id_rating', 'event_id', 'rating'),
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True)
-    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
-    user_id = Column(String, nullable=False)  # user's email
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), nullable=False, index=True)
     message = Column(String, nullable=False)
     rating = Column(Integer, default=0)
-    author_email = Column(String, nullable=False)
+    author_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    author_email = email_of(author_id, deferred=True)
+    user_id = synonym('author_email')  # The commenter's email, kept for the API
+    deleted_at = Column(DateTime, nullable=True, index=True)  # Tombstone, purged in the background
     
     event = relationship("Event", back_populates="comments")
 
+MAX_TOKEN_LENGTH = 512
+
+def session_key(session_id: str) -> bytes | None:
+    """The stored key of a session token: its SHA-256, truncated to 16 bytes.
+
+    Only the hash is stored, so the database never holds a usable token.
+    Returns None for values that cannot be a token.
+    """
+    if not session_id or len(session_id) > MAX_TOKEN_LENGTH:
+        return None
+    return hashlib.sha256(session_id.encode()).digest()[:16]
+
 class Session(Base):
     __tablename__ = 'sessions'
-    
-    id = Column(String, primary_key=True)  # UUID
-    user_email = Column(String, nullable=False)
+    # Looked up on every request; without a rowid the key is the only B-tree
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    id = Column(LargeBinary, primary_key=True)  # 16-byte hash of the token, see session_key
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_email = email_of(user_id)
     created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))  # Stored as UTC
     expires_at = Column(DateTime, nullable=False)  # Stored as UTC
 
@@ -58,4 +157,85 @@ class Session(Base):
 
     @property
     def expires_at_utc(self):
-        return self.expires_at.replace(tzinfo=UTC) if self.expires_at else None
\ No newline at end of file
+        return self.expires_at.replace(tzinfo=UTC) if self.expires_at else None
+
+class RevokedToken(Base):
+    """Signed session tokens logged out before they expired"""
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    id = Column(LargeBinary, primary_key=True)  # The token's signature
+    expires_at = Column(DateTime, nullable=False, index=True)  # Forgotten once the token has expired anyway
+
+class ChangeLog(Base):
+    """The latest change of each event and comment, for delta sync.
+
+    Written by triggers in the transaction of the change itself. Each entity
+    keeps a single row that gets a fresh ``seq`` whenever it changes again,
+    so the log grows with the number of entities, not with their history.
+    """
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        UniqueConstraint('entity', 'entity_id'),
+        # The purger finds expired tombstones by it
+        Index('ix_change_log_deleted_changed_at', 'deleted', 'changed_at'),
+        {'sqlite_autoincrement': True},
+    )
+
+    seq = Column(Integer, primary_key=True)  # Never reused, so it only grows
+    entity = Column(String, nullable=False)  # "event" or "comment"
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)  # Tombstone
+    changed_at = Column(UTCEpoch, nullable=False, server_default=text("0"))  # Set by the triggers
+
+class SyncHorizon(Base):
+    """The newest tombstone compacted out of the change log.
+
+    A client that synced before it may have missed deletions and must sync
+    again from zero. A single row, absent until the first compaction.
+    """
+    __tablename__ = 'sync_horizon'
+
+    id = Column(Integer, primary_key=True)
+    seq = Column(Integer, nullable=False)
+
+# Whole seconds are precise enough to expire tombstones by
+_NOW_MICROSECONDS = "CAST(strftime('%s', 'now') AS INTEGER) * 1000000"
+
+def _log_change(entity: str, row: str, deleted: str, only_if: str = None) -> str:
+    # Delete then insert: an OR IGNORE/REPLACE on the firing statement would
+    # override any conflict clause given here
+    insert = (f"INSERT INTO change_log (entity, entity_id, deleted, changed_at) "
+              f"SELECT '{entity}', {row}, {deleted}, {_NOW_MICROSECONDS}")
+    return (
+        f"DELETE FROM change_log WHERE entity = '{entity}' AND entity_id = {row}; "
+        f"{insert}{f' WHERE {only_if}' if only_if else ''};"
+    )
+
+# Trigger name -> definition; created by migrations.migrate once the tables are final
+CHANGE_LOG_TRIGGERS = {
+    "events_logged_insert": "AFTER INSERT ON events BEGIN " + _log_change("event", "NEW.id", "NEW.deleted_at IS NOT NULL"),
+    "events_logged_update": "AFTER UPDATE ON events BEGIN " + _log_change("event", "NEW.id", "NEW.deleted_at IS NOT NULL"),
+    # Purging a tombstoned row is not news; archiving a live one is
+    "events_logged_delete": "AFTER DELETE ON events WHEN OLD.deleted_at IS NULL BEGIN " + _log_change("event", "OLD.id", "1"),
+    "event_details_logged_insert": "AFTER INSERT ON event_details BEGIN " + _log_change("event", "NEW.event_id", "0"),
+    "event_details_logged_update": "AFTER UPDATE ON event_details BEGIN " + _log_change("event", "NEW.event_id", "0"),
+    "event_comments_logged_insert": "AFTER INSERT ON event_comments BEGIN "
+                                    + _log_change("comment", "NEW.id", "NEW.deleted_at IS NOT NULL"),
+    "event_comments_logged_update": "AFTER UPDATE ON event_comments BEGIN "
+                                    + _log_change("comment", "NEW.id", "NEW.deleted_at IS NOT NULL"),
+    # The tombstone of a deleted or removed event already implies its
+    # comments are gone: purging them only drops their entries
+    "event_comments_logged_delete": "AFTER DELETE ON event_comments WHEN OLD.deleted_at IS NULL BEGIN "
+                                    + _log_change("comment", "OLD.id", "1", only_if=(
+                                        "EXISTS (SELECT 1 FROM events WHERE id = OLD.event_id AND deleted_at IS NULL)"
+                                    )),
+}
+
+# Cold copies of ended events and their comments, kept in the database
+# attached as "archive" and only read when archived data is asked for
+archive_metadata = MetaData(schema='archive')
+archived_users = User.__table__.to_metadata(archive_metadata)  # Same ids as the main users table
+archived_events = Event.__table__.to_metadata(archive_metadata)
+archived_event_comments = EventComment.__table__.to_metadata(archive_metadata)
+archived_event_details = EventDetails.__table__.to_metadata(archive_metadata)
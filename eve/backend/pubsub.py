@@ -0,0 +1,164 @@
+import asyncio
+import os
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+import metrics
+
+STREAM_BUFFER_SIZE = int(os.environ.get("EVE_STREAM_BUFFER_SIZE", "100"))  # Messages a subscriber may lag behind
+MAX_STREAM_SUBSCRIBERS = int(os.environ.get("EVE_MAX_STREAM_SUBSCRIBERS", "5000"))
+# How often the change log is checked when no local commit wakes the feed
+STREAM_POLL_INTERVAL_MS = float(os.environ.get("EVE_STREAM_POLL_INTERVAL_MS", "1000"))
+
+# Queued in place of the backlog of a subscriber that fell too far behind
+DROPPED = object()
+
+class Subscription:
+    """One subscriber's bounded buffer of messages"""
+
+    def __init__(self, topics: Tuple[str, ...], buffer_size: int):
+        self.topics = topics
+        self.dropped = False
+        self._queue = asyncio.Queue(buffer_size)
+
+    def offer(self, message) -> bool:
+        """Queue ``message``; a full buffer drops the subscriber instead"""
+        if self.dropped:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(DROPPED)
+            return False
+
+    async def get(self, timeout: float):
+        """The next message, ``DROPPED``, or None if nothing arrived in ``timeout`` seconds"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+class Broker:
+    """In-process publish/subscribe for live streams.
+
+    Subscribers are plain objects with a bounded queue, not threads, so
+    thousands of idle streams cost a little memory each. A subscriber whose
+    buffer is full is dropped rather than slowing down the publisher or the
+    other subscribers; it gets ``DROPPED`` and should reconnect and catch up.
+    Runs on the event loop only.
+    """
+
+    def __init__(self, buffer_size: int = STREAM_BUFFER_SIZE, max_subscribers: int = MAX_STREAM_SUBSCRIBERS):
+        self._buffer_size = buffer_size
+        self._max_subscribers = max_subscribers
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+
+    def at_capacity(self) -> bool:
+        return self._count >= self._max_subscribers
+
+    def subscribe(self, *topics: str) -> Optional[Subscription]:
+        """Subscribe to ``topics``; None if the broker is at capacity"""
+        if self.at_capacity():
+            metrics.inc("stream.rejected")
+            return None
+        subscription = Subscription(topics, self._buffer_size)
+        for topic in topics:
+            self._topics.setdefault(topic, set()).add(subscription)
+        self._count += 1
+        metrics.set_gauge("stream.subscribers", self._count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        removed = False
+        for topic in subscription.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                removed = True
+                if not subscribers:
+                    del self._topics[topic]
+        if removed:
+            self._count -= 1
+            metrics.set_gauge("stream.subscribers", self._count)
+
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def publish(self, topics: List[str], message) -> int:
+        """Deliver ``message`` once to every subscriber of any of ``topics``; returns the count"""
+        subscribers = set()
+        for topic in topics:
+            subscribers |= self._topics.get(topic, set())
+        delivered = 0
+        for subscription in subscribers:
+            if subscription.offer(message):
+                delivered += 1
+            else:
+                metrics.inc("stream.dropped")
+                self.unsubscribe(subscription)
+        metrics.inc("stream.published")
+        return delivered
+
+broker = Broker()
+
+class ChangeFeed:
+    """Publish committed changes to a broker by tailing the change log.
+
+    ``read_changes(since)`` runs in the threadpool and returns the new
+    sequence number with ``(topics, message)`` pairs for every change after
+    ``since``. It only sees committed rows, so a rolled back write is never
+    announced. ``notify`` (safe from any thread, e.g. after a local commit)
+    wakes the feed at once; otherwise it checks every ``interval`` seconds,
+    which also picks up writes made by other processes.
+    """
+
+    def __init__(self, broker: Broker, read_changes: Callable, latest_seq: Callable,
+                 interval: float = STREAM_POLL_INTERVAL_MS / 1000):
+        self._broker = broker
+        self._read_changes = read_changes
+        self._latest_seq = latest_seq
+        self._interval = interval
+        self._loop = None
+        self._wake = None
+        self.seq = 0
+
+    def notify(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # The loop closed meanwhile
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self.seq = await run_in_threadpool(self._latest_seq)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    await self.poll()
+                except Exception:
+                    metrics.inc("stream.feed_errors")
+        finally:
+            self._loop = None
+
+    async def poll(self) -> None:
+        """Publish whatever was committed since the last poll"""
+        if not self._broker.subscriber_count():
+            # Nobody listens: skip loading the rows, just move past them
+            self.seq = await run_in_threadpool(self._latest_seq)
+            return
+        self.seq, messages = await run_in_threadpool(self._read_changes, self.seq)
+        for topics, message in messages:
+            self._broker.publish(topics, message)
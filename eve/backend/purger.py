@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from database import run_write
+from use_cases import purge_use_cases
+from background import PeriodicWorker
+import metrics
+
+PURGE_INTERVAL = float(os.environ.get("EVE_PURGE_INTERVAL", "30"))  # Seconds between purge runs
+PURGE_BATCH_SIZE = int(os.environ.get("EVE_PURGE_BATCH_SIZE", "500"))  # Rows per write transaction
+PURGE_PAUSE_MS = float(os.environ.get("EVE_PURGE_PAUSE_MS", "50"))  # Pause between chunks
+# How long deletions stay in the change log; clients that last synced
+# longer ago than this have to sync again from zero
+SYNC_HORIZON_DAYS = float(os.environ.get("EVE_SYNC_HORIZON_DAYS", "30"))
+
+def purge_tombstones(stop: threading.Event, submit=run_write,
+                     batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_PAUSE_MS / 1000) -> int:
+    """Remove all tombstoned rows, one small chunk per write job.
+
+    Each chunk is its own job on the writer queue, and the pause between
+    chunks lets other writes through, so the write lock is never held for
+    longer than one chunk.
+    """
+    total = 0
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        removed = submit(purge_use_cases.purge_deleted, batch_size)
+        metrics.observe("purge.chunk_seconds", time.perf_counter() - started_at)
+        metrics.inc("purge.rows", removed)
+        total += removed
+        if removed < batch_size:
+            break
+        stop.wait(pause)
+    return total
+
+def compact_change_log(stop: threading.Event, submit=run_write, batch_size: int = PURGE_BATCH_SIZE,
+                       pause: float = PURGE_PAUSE_MS / 1000, horizon_days: float = SYNC_HORIZON_DAYS) -> int:
+    """Remove the change log tombstones older than the sync horizon, chunked like the purge"""
+    older_than = datetime.now(UTC) - timedelta(days=horizon_days)
+    total = 0
+    while not stop.is_set():
+        removed = submit(purge_use_cases.compact_change_log, older_than, batch_size)
+        metrics.inc("purge.change_log_rows", removed)
+        total += removed
+        if removed < batch_size:
+            break
+        stop.wait(pause)
+    return total
+
+def purge(stop: threading.Event) -> None:
+    # Purging writes tombstones, so compact after it
+    purge_tombstones(stop)
+    compact_change_log(stop)
+
+def create_purger(interval: float = PURGE_INTERVAL) -> PeriodicWorker:
+    return PeriodicWorker("purger", interval, purge)
@@ -0,0 +1,49 @@
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from database import ReadSessionLocal, run_write
+from use_cases import retention_use_cases
+import metrics
+
+BULK_DELETE_BATCH_SIZE = int(os.environ.get("EVE_BULK_DELETE_BATCH_SIZE", "500"))  # Rows per write transaction
+
+def bulk_delete_events(ended_before: Optional[datetime] = None, author_email: Optional[str] = None,
+                       batch_size: int = BULK_DELETE_BATCH_SIZE, dry_run: bool = False,
+                       progress: Optional[Callable[[Dict], None]] = None,
+                       submit=run_write, read_session=ReadSessionLocal) -> Dict:
+    """Delete matching events and their comments, one chunk per write job.
+
+    Other writes queue up between chunks, so a large cleanup never holds the
+    write lock for long. ``progress`` is called with the running totals after
+    every chunk. A dry run only counts what would be removed.
+    """
+    started_at = time.perf_counter()
+    report = {"dry_run": dry_run, "events": 0, "comments": 0, "chunks": 0}
+    if dry_run:
+        with read_session() as db:
+            report.update(retention_use_cases.count_matching_events(db, ended_before, author_email))
+    else:
+        while True:
+            chunk_started_at = time.perf_counter()
+            removed = submit(
+                retention_use_cases.delete_matching_events,
+                batch_size,
+                ended_before=ended_before,
+                author_email=author_email
+            )
+            metrics.observe("retention.chunk_seconds", time.perf_counter() - chunk_started_at)
+            rows = removed["events"] + removed["comments"]
+            metrics.inc("retention.rows", rows)
+            report["events"] += removed["events"]
+            report["comments"] += removed["comments"]
+            report["chunks"] += 1
+            if progress is not None:
+                progress(dict(report))
+            if rows < batch_size:
+                break
+
+    report["rows"] = report["events"] + report["comments"]
+    report["seconds"] = time.perf_counter() - started_at
+    report["rows_per_second"] = report["rows"] / report["seconds"] if report["seconds"] > 0 else 0.0
+    return report
@@ -0,0 +1,80 @@
+import os
+import threading
+from datetime import datetime, UTC
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from background import PeriodicWorker
+from data_version import DataVersion, data_version
+from models import RevokedToken
+import metrics
+
+REVOCATION_REFRESH_INTERVAL = float(os.environ.get("EVE_REVOCATION_REFRESH_INTERVAL", "1"))  # Seconds
+BUCKET_SECONDS = 3600
+
+class RevocationSet:
+    """Signatures of revoked tokens, bucketed by the hour their token expires.
+
+    A revoked token only has to be remembered until it would have expired
+    anyway, so whole buckets are dropped once their hour has passed and the
+    set never holds more than one session lifetime's worth of logouts.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(expires_at: datetime) -> int:
+        return int(expires_at.replace(tzinfo=UTC).timestamp()) // BUCKET_SECONDS
+
+    def add(self, signature: bytes, expires_at: datetime) -> None:
+        with self._lock:
+            self._buckets.setdefault(self._bucket(expires_at), set()).add(signature)
+
+    def __contains__(self, signature: bytes) -> bool:
+        with self._lock:
+            return any(signature in bucket for bucket in self._buckets.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(bucket) for bucket in self._buckets.values())
+
+    def prune(self, now: datetime = None) -> None:
+        """Forget the buckets whose tokens have all expired"""
+        current = self._bucket(now or datetime.now(UTC).replace(tzinfo=None))
+        with self._lock:
+            for bucket in [bucket for bucket in self._buckets if bucket < current]:
+                del self._buckets[bucket]
+
+revoked_tokens = RevocationSet()
+
+def load_revocations(db: Session, revoked: RevocationSet = revoked_tokens) -> int:
+    """Add the persisted revocations of unexpired tokens; returns the set's size"""
+    now = datetime.now(UTC).replace(tzinfo=None)
+    for signature, expires_at in db.execute(
+        select(RevokedToken.id, RevokedToken.expires_at).where(RevokedToken.expires_at > now)
+    ):
+        revoked.add(signature, expires_at)
+    revoked.prune(now)
+    metrics.set_gauge("auth.revoked_tokens", len(revoked))
+    return len(revoked)
+
+def create_revocation_refresher(session_factory, interval: float = REVOCATION_REFRESH_INTERVAL,
+                                version: DataVersion = data_version) -> PeriodicWorker:
+    """Pick up logouts made by other processes sharing the database.
+
+    Nothing is read while the data version stands still, so a short
+    interval costs nothing on an idle database.
+    """
+    loaded_at = [None]
+
+    def refresh(stop: threading.Event) -> None:
+        # Read before loading: a commit during the load is picked up next time
+        current = version.current()
+        if current == loaded_at[0]:
+            return
+        with session_factory() as db:
+            load_revocations(db)
+        loaded_at[0] = current
+
+    return PeriodicWorker("revocation-refresher", interval, refresh)
@@ -0,0 +1,24 @@
+import os
+from typing import List
+
+def _flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() in ("1", "true", "yes", "on")
+
+class Settings:
+    """What ``create_app`` needs to know about the process it runs in.
+
+    Defaults come from the environment. Kept free of heavy imports, so
+    reading the settings costs nothing before an app is built.
+    """
+
+    def __init__(self,
+                 migrate: bool = None,
+                 background_jobs: bool = None,
+                 cors_origins: List[str] = None):
+        # Bring the schema up to date at startup instead of only checking it;
+        # off by default, as several workers should not all migrate at once
+        self.migrate = _flag("EVE_MIGRATE_ON_STARTUP", "0") if migrate is None else migrate
+        # The purger and archiver; with several workers, one of them is enough
+        self.background_jobs = _flag("EVE_BACKGROUND_JOBS", "1") if background_jobs is None else background_jobs
+        self.cors_origins = (os.environ.get("EVE_CORS_ORIGINS", "*").split(",")
+                             if cors_origins is None else cors_origins)
@@ -4,4 +4,6 @@ import sys
 # Add backend directory to Python path
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 project_root = os.path.dirname(backend_dir)
-sys.path.extend([backend_dir, project_root])
\ No newline at end of file
+sys.path.extend([backend_dir, project_root])
+# Signed-token tests sign with a random key unless EVE_TOKEN_SECRET is set
+os.environ.setdefault("EVE_INSECURE_RANDOM_TOKEN_SECRET", "1")
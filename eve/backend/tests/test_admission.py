@@ -0,0 +1,92 @@
+import asyncio
+import json
+from admission import AdmissionLimiter, AdmissionMiddleware, TokenBucket
+import metrics
+
+def make_scope(method="GET", path="/api/events", authorization=None):
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return {"type": "http", "method": method, "path": path, "query_string": b"", "headers": headers}
+
+async def call(app, scope):
+    """Run one request through an ASGI app; returns (status, headers, body)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+def slow_app(release: asyncio.Event):
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+def test_limiter_sheds_when_queue_is_full():
+    async def scenario():
+        limiter = AdmissionLimiter("test_full", limit=1, queue_size=1, timeout=5)
+        assert await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()  # Queue full: shed without waiting
+        limiter.release()
+        assert await waiter
+
+    asyncio.run(scenario())
+    assert metrics.snapshot()["counters"]["admission.test_full.shed"] >= 1
+
+def test_limiter_gives_up_after_deadline():
+    async def scenario():
+        limiter = AdmissionLimiter("test_deadline", limit=1, queue_size=10, timeout=0.01)
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+
+    asyncio.run(scenario())
+    assert metrics.snapshot()["counters"]["admission.test_deadline.timed_out"] >= 1
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, burst=2, clock=lambda: now[0])
+
+    assert bucket.take("a") == 0 and bucket.take("a") == 0
+    assert bucket.take("a") == 0.5
+    assert bucket.take("b") == 0  # Buckets are per key
+    now[0] += 0.5
+    assert bucket.take("a") == 0
+
+def test_middleware_returns_503_when_reads_are_saturated():
+    async def scenario():
+        release = asyncio.Event()
+        middleware = AdmissionMiddleware(slow_app(release), max_reads=1, max_writes=1, queue_size=0, timeout=1)
+        running = asyncio.create_task(call(middleware, make_scope()))
+        await asyncio.sleep(0)
+
+        status, headers, body = await call(middleware, make_scope())
+        assert (status, headers[b"retry-after"]) == (503, b"1")
+        assert json.loads(body) == {"detail": "Server is busy, please retry"}
+
+        # Writes have their own slots
+        release.set()
+        assert (await call(middleware, make_scope("POST", authorization="token")))[0] == 200
+        assert (await running)[0] == 200
+
+    asyncio.run(scenario())
+
+def test_middleware_rate_limits_writes_per_session():
+    async def scenario():
+        release = asyncio.Event()
+        release.set()
+        middleware = AdmissionMiddleware(slow_app(release), write_rate=TokenBucket(rate=1, burst=2))
+
+        statuses = [(await call(middleware, make_scope("POST", authorization="alice")))[0] for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        assert (await call(middleware, make_scope("POST", authorization="bob")))[0] == 200
+        assert (await call(middleware, make_scope("GET", authorization="alice")))[0] == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import pytest
+from settings import Settings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(code, tmp_path):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR,
+               EVE_DATABASE=str(tmp_path / "eve.db"), EVE_ARCHIVE_DB=str(tmp_path / "archive.db"))
+    return subprocess.run([sys.executable, "-c", code], env=env, cwd=tmp_path,
+                          capture_output=True, text=True)
+
+def test_importing_main_has_no_side_effects(tmp_path):
+    result = _run(
+        "import sys\n"
+        "import main\n"
+        "print(sorted(m for m in ('fastapi', 'sqlalchemy', 'database', 'models', 'controllers') if m in sys.modules))",
+        tmp_path
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["[]"]
+    assert os.listdir(tmp_path) == []
+
+def test_startup_requires_a_migrated_database(tmp_path):
+    boot = (
+        "import asyncio, main\n"
+        "from settings import Settings\n"
+        "app = main.create_app(Settings(migrate={migrate}, background_jobs=False))\n"
+        "async def boot():\n"
+        "    async with app.router.lifespan_context(app):\n"
+        "        pass\n"
+        "asyncio.run(boot())\n"
+    )
+    result = _run(boot.format(migrate=False), tmp_path)
+    assert result.returncode != 0
+    assert "backend/main.py migrate" in result.stderr
+
+    assert _run(boot.format(migrate=True), tmp_path).returncode == 0
+    # Migrated once, later workers only check the schema
+    result = _run(boot.format(migrate=False), tmp_path)
+    assert result.returncode == 0, result.stderr
+
+def test_create_app_applies_settings():
+    from main import create_app
+    app = create_app(Settings(cors_origins=["https://eve.example.com"]))
+    paths = {route.path for route in app.routes}
+    assert {"/api/events", "/api/events/{event_id}/comments", "/api/sync", "/api/stream"} <= paths
+    cors = next(middleware for middleware in app.user_middleware if middleware.cls.__name__ == "CORSMiddleware")
+    assert cors.kwargs["allow_origins"] == ["https://eve.example.com"]
+    # Every call builds a separate app
+    assert create_app(Settings()) is not app
+
+def test_signed_mode_refuses_to_start_without_a_secret(monkeypatch):
+    from main import create_app
+    from use_cases import auth_use_cases
+    monkeypatch.setattr(auth_use_cases, "SESSION_MODE", "signed")
+    monkeypatch.setattr(auth_use_cases, "RANDOM_TOKEN_SECRET", False)
+    monkeypatch.setattr(auth_use_cases, "TOKEN_SECRET", b"")
+    with pytest.raises(RuntimeError, match="EVE_TOKEN_SECRET"):
+        create_app(Settings())
@@ -0,0 +1,151 @@
+import os
+import pytest
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_connections
+from migrations import LATEST_VERSION, get_version, migrate
+from models import Event, EventComment, archive_metadata
+from use_cases import archive_use_cases, comment_use_cases, event_use_cases, retention_use_cases
+from use_cases.user_use_cases import intern_user
+from archiver import archive_ended_events
+import threading
+
+# Setup test database with an attached archive
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+TEST_ARCHIVE_PATH = "data/test_archive.db"
+engine = create_engine(TEST_DATABASE_URL)
+configure_connections(engine, archive_path=TEST_ARCHIVE_PATH)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+NOW = datetime.now(UTC).replace(tzinfo=None)
+
+@pytest.fixture
+def db_session():
+    migrate(engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        archive_metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA main.user_version = 0")
+            conn.exec_driver_sql("PRAGMA archive.user_version = 0")
+        engine.dispose()
+        os.remove(TEST_ARCHIVE_PATH)
+
+def add_event(db, ended_days_ago, comments=0, author_email="event@example.com"):
+    """Insert an event directly, since create_event rejects past times"""
+    end_time = NOW - timedelta(days=ended_days_ago)
+    event = Event(title=f"Ended {ended_days_ago} days ago", author_id=intern_user(db, author_email),
+                  start_time=end_time - timedelta(hours=2), end_time=end_time)
+    db.add(event)
+    db.flush()
+    for i in range(comments):
+        db.add(EventComment(event_id=event.id, message=f"Comment {i}", rating=3,
+                            author_id=intern_user(db, "user@example.com")))
+    db.commit()
+    return event
+
+def count(db, table):
+    return db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+def test_archive_moves_events_and_comments(db_session):
+    """Test that old events leave the hot tables with their comments, keeping their ids"""
+    old = add_event(db_session, ended_days_ago=100, comments=3)
+    recent = add_event(db_session, ended_days_ago=1, comments=1)
+
+    moved = archive_use_cases.archive_events(db_session, NOW - timedelta(days=90))
+
+    assert moved == {"events": 1, "comments": 3}
+    assert [e.id for e in event_use_cases.get_events(db_session)] == [recent.id]
+    assert count(db_session, "main.event_comments") == 1
+    assert db_session.execute(text("SELECT id FROM archive.events")).scalars().all() == [old.id]
+    assert count(db_session, "archive.event_comments") == 3
+
+def test_include_archived_unions_both_databases(db_session):
+    old = add_event(db_session, ended_days_ago=100, comments=2)
+    recent = add_event(db_session, ended_days_ago=1)
+    archive_use_cases.archive_events(db_session, NOW - timedelta(days=90))
+    db_session.expunge_all()
+
+    assert event_use_cases.get_event(db_session, old.id) is None
+    archived = event_use_cases.get_event(db_session, old.id, include_archived=True)
+    assert (archived.title, archived.author_email) == (old.title, "event@example.com")
+    assert [e.id for e in event_use_cases.get_events(db_session, include_archived=True)] == [old.id, recent.id]
+    assert [e.id for e in event_use_cases.get_past_events(db_session, include_archived=True)] == [recent.id, old.id]
+    assert comment_use_cases.get_event_comments(db_session, old.id) == []
+    comments = comment_use_cases.get_event_comments(db_session, old.id, include_archived=True)
+    assert [c.author_email for c in comments] == ["user@example.com"] * 2
+
+def test_archived_ids_are_not_reused(db_session):
+    """Test that a new event never takes the id of an archived one"""
+    old = add_event(db_session, ended_days_ago=100)
+    archive_use_cases.archive_events(db_session, NOW - timedelta(days=90))
+
+    new = event_use_cases.create_event(db_session, title="New", author_email="event@example.com")
+
+    assert new.id > old.id
+
+def test_archiver_runs_in_chunks(db_session):
+    for _ in range(5):
+        add_event(db_session, ended_days_ago=100)
+    chunks = []
+
+    def submit(fn, *args):
+        chunks.append(fn(db_session, *args))
+        return chunks[-1]
+
+    moved = archive_ended_events(threading.Event(), submit=submit, after=timedelta(days=90),
+                                 batch_size=2, pause=0)
+
+    assert moved == 5
+    assert [c["events"] for c in chunks] == [2, 2, 1]
+
+def test_bulk_delete_reaches_archived_events(db_session):
+    add_event(db_session, ended_days_ago=100, comments=2)
+    add_event(db_session, ended_days_ago=1, comments=1)
+    archive_use_cases.archive_events(db_session, NOW - timedelta(days=90))
+
+    assert retention_use_cases.count_matching_events(db_session, author_email="event@example.com") == {
+        "events": 2, "comments": 3
+    }
+    removed = retention_use_cases.delete_matching_events(db_session, author_email="event@example.com")
+
+    assert removed == {"events": 2, "comments": 3}
+    assert count(db_session, "archive.events") == 0
+
+def test_migrate_rebuilds_tables_with_autoincrement(db_session):
+    """Test that an old schema keeps its rows, including comments, when rebuilt"""
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE events (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR NOT NULL, description VARCHAR, "
+            "place VARCHAR, start_time DATETIME, end_time DATETIME, food VARCHAR, drinks VARCHAR, "
+            "program VARCHAR, parking_info VARCHAR, music VARCHAR, theme VARCHAR, age_restrictions VARCHAR, "
+            "author_email VARCHAR NOT NULL, deleted_at DATETIME)"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE event_comments (id INTEGER NOT NULL PRIMARY KEY, "
+            "event_id INTEGER NOT NULL REFERENCES events (id) ON DELETE CASCADE, user_id VARCHAR NOT NULL, "
+            "message VARCHAR NOT NULL, rating INTEGER, author_email VARCHAR NOT NULL, deleted_at DATETIME)"
+        )
+        conn.exec_driver_sql("INSERT INTO events (id, title, author_email) VALUES (7, 'Old', 'old@example.com')")
+        conn.exec_driver_sql(
+            "INSERT INTO event_comments (event_id, user_id, message, author_email) "
+            "VALUES (7, 'u@example.com', 'Kept', 'u@example.com')"
+        )
+        conn.exec_driver_sql("PRAGMA main.user_version = 1")
+
+    assert migrate(engine) == LATEST_VERSION
+
+    with engine.connect() as conn:
+        assert get_version(conn) == LATEST_VERSION
+        sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'events'").scalar()
+        assert "AUTOINCREMENT" in sql
+        assert conn.exec_driver_sql("SELECT message FROM event_comments").scalars().all() == ["Kept"]
+        indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(event_comments)")}
+        assert "ix_event_comments_event_id" in indexes
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
@@ -1,9 +1,14 @@
 import pytest
+import threading
 from datetime import datetime, timedelta, UTC
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from database import Base
-from models import Session as DbSession
+from migrations import LATEST_VERSION, migrate
+from models import RevokedToken, Session as DbSession
+from revocation import RevocationSet, load_revocations
+from last_seen import LastSeenBuffer, flush_last_seen
+from use_cases import session_use_cases
 from use_cases import auth_use_cases
 
 # Setup test database
@@ -26,7 +31,7 @@ def test_create_session(db_session):
     session_id = auth_use_cases.create_session(db_session, email)
     
     assert session_id is not None
-    db_session_obj = db_session.query(DbSession).filter(DbSession.id == session_id).first()
+    db_session_obj = db_session.query(DbSession).filter(DbSession.id == auth_use_cases.session_key(session_id)).first()
     assert db_session_obj is not None
     assert db_session_obj.user_email == email
     assert db_session_obj.expires_at_utc > datetime.now(UTC)
@@ -46,12 +51,12 @@ def test_validate_session(db_session):
     assert not is_valid
     assert user_email is None
     
-    # Test expired session
-    session = db_session.query(DbSession).filter(DbSession.id == session_id).first()
+    # Test expired session, with no recent activity
+    session = db_session.query(DbSession).filter(DbSession.id == auth_use_cases.session_key(session_id)).first()
     session.expires_at = (datetime.now(UTC) - timedelta(hours=1)).replace(tzinfo=None)
     db_session.commit()
     
-    is_valid, user_email = auth_use_cases.validate_session(db_session, session_id)
+    is_valid, user_email = auth_use_cases.validate_session(db_session, session_id, seen=LastSeenBuffer())
     assert not is_valid
     assert user_email is None
 
@@ -60,12 +65,150 @@ def test_logout(db_session):
     session_id = auth_use_cases.create_session(db_session, email)
     
     # Verify session exists
-    session = db_session.query(DbSession).filter(DbSession.id == session_id).first()
+    session = db_session.query(DbSession).filter(DbSession.id == auth_use_cases.session_key(session_id)).first()
     assert session is not None
     
     # Logout
     auth_use_cases.logout(db_session, session_id)
     
     # Verify session is deleted
-    session = db_session.query(DbSession).filter(DbSession.id == session_id).first()
-    assert session is None
\ No newline at end of file
+    session = db_session.query(DbSession).filter(DbSession.id == auth_use_cases.session_key(session_id)).first()
+    assert session is None
+
+def test_session_key_is_stored_instead_of_token(db_session):
+    session_id = auth_use_cases.create_session(db_session, "test@example.com")
+
+    stored = db_session.execute(text("SELECT id, typeof(id) FROM sessions")).one()
+    assert stored == (auth_use_cases.session_key(session_id), "blob")
+    assert len(stored[0]) == 16 and session_id.encode() not in stored[0]
+    sql = db_session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'sessions'")).scalar()
+    assert "WITHOUT ROWID" in sql
+
+def test_oversized_token_is_rejected_without_lookup(db_session):
+    assert auth_use_cases.session_key("x" * (auth_use_cases.MAX_TOKEN_LENGTH + 1)) is None
+    assert auth_use_cases.validate_session(db_session, "x" * 10000) == (False, None)
+    assert auth_use_cases.validate_session(db_session, "") == (False, None)
+
+def test_migrate_keeps_live_sessions(db_session):
+    """Test that text session ids become hashed keys and their tokens keep working"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    expires_at = (datetime.now(UTC) + timedelta(hours=1)).replace(tzinfo=None)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE sessions")
+        conn.exec_driver_sql(
+            "CREATE TABLE sessions (id VARCHAR NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL "
+            "REFERENCES users (id), created_at DATETIME NOT NULL, expires_at DATETIME NOT NULL)"
+        )
+        conn.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'test@example.com')")
+        conn.exec_driver_sql("INSERT INTO sessions VALUES ('legacy-token', 1, ?, ?)", (expires_at, expires_at))
+        conn.exec_driver_sql("PRAGMA user_version = 5")
+    try:
+        assert migrate(engine) == LATEST_VERSION
+        assert auth_use_cases.validate_session(db_session, "legacy-token") == (True, "test@example.com")
+        assert db_session.execute(text("SELECT typeof(id) FROM sessions")).scalar() == "blob"
+        sql = db_session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'sessions'")).scalar()
+        assert "WITHOUT ROWID" in sql
+    finally:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA user_version = 0")
+
+def test_signed_token_is_verified_without_database(db_session):
+    token = auth_use_cases.create_session(db_session, "test@example.com", signed=True)
+
+    assert db_session.query(DbSession).count() == 0
+    # No session at all: validation cannot reach the database
+    assert auth_use_cases.validate_session(None, token, RevocationSet()) == (True, "test@example.com")
+
+def test_tampered_or_expired_signed_token_is_rejected():
+    expires_at = (datetime.now(UTC) + timedelta(hours=1)).replace(tzinfo=None)
+    token = auth_use_cases.create_token("test@example.com", expires_at)
+    payload, signature = token[len(auth_use_cases.TOKEN_PREFIX):].split(".")
+    forged = auth_use_cases.create_token("admin@example.com", expires_at, secret=b"guessed")
+    expired = auth_use_cases.create_token("test@example.com", expires_at - timedelta(hours=2))
+
+    for bad in (forged, expired, f"{auth_use_cases.TOKEN_PREFIX}{payload}.", f"{auth_use_cases.TOKEN_PREFIX}!!.{signature}"):
+        assert auth_use_cases.validate_session(None, bad, RevocationSet()) == (False, None)
+
+def test_signed_tokens_need_a_long_enough_secret(monkeypatch):
+    monkeypatch.setattr(auth_use_cases, "RANDOM_TOKEN_SECRET", False)
+    expires_at = (datetime.now(UTC) + timedelta(hours=1)).replace(tzinfo=None)
+    for secret in (b"", b"too short"):
+        monkeypatch.setattr(auth_use_cases, "TOKEN_SECRET", secret)
+        with pytest.raises(RuntimeError, match="EVE_TOKEN_SECRET"):
+            auth_use_cases.create_token("test@example.com", expires_at)
+    # No secret in database mode: a signed-looking token is just invalid
+    monkeypatch.setattr(auth_use_cases, "TOKEN_SECRET", b"")
+    assert auth_use_cases.validate_session(None, "v1.abc.def", RevocationSet()) == (False, None)
+
+    # Resolved at call time, so a configured secret is picked up
+    secret = b"s" * auth_use_cases.MIN_TOKEN_SECRET_BYTES
+    monkeypatch.setattr(auth_use_cases, "TOKEN_SECRET", secret)
+    token = auth_use_cases.create_token("test@example.com", expires_at)
+    assert auth_use_cases.verify_token(token, secret)[1] == "test@example.com"
+
+def test_logout_revokes_signed_token_across_restarts(db_session):
+    revoked = RevocationSet()
+    token = auth_use_cases.create_session(db_session, "test@example.com", signed=True)
+
+    auth_use_cases.logout(db_session, token, revoked)
+
+    assert auth_use_cases.validate_session(None, token, revoked) == (False, None)
+    assert db_session.query(RevokedToken).count() == 1
+    # A fresh process loads the persisted revocation
+    restarted = RevocationSet()
+    assert load_revocations(db_session, restarted) == 1
+    assert auth_use_cases.validate_session(None, token, restarted) == (False, None)
+
+def test_revocations_are_forgotten_once_tokens_expire():
+    revoked = RevocationSet()
+    now = datetime.now(UTC).replace(tzinfo=None)
+    revoked.add(b"old", now - timedelta(hours=2))
+    revoked.add(b"live", now + timedelta(hours=2))
+
+    revoked.prune(now)
+
+    assert b"old" not in revoked and b"live" in revoked and len(revoked) == 1
+
+def test_activity_slides_expiry_in_one_batched_write(db_session):
+    seen = LastSeenBuffer()
+    session_ids = [auth_use_cases.create_session(db_session, f"user{i}@example.com") for i in range(3)]
+    stale = (datetime.now(UTC) + timedelta(minutes=5)).replace(tzinfo=None)
+    db_session.query(DbSession).update({DbSession.expires_at: stale})
+    db_session.commit()
+
+    # Many requests only touch memory
+    for _ in range(100):
+        for session_id in session_ids:
+            assert auth_use_cases.validate_session(db_session, session_id, seen=seen)[0]
+
+    writes = []
+    def submit(fn, *args):
+        writes.append(fn)
+        return fn(db_session, *args)
+
+    assert flush_last_seen(threading.Event(), submit=submit, buffer=seen) == 3
+    assert writes == [session_use_cases.extend_sessions]
+    db_session.expire_all()
+    for session in db_session.query(DbSession):
+        assert session.expires_at_utc > datetime.now(UTC) + timedelta(hours=7)
+    assert flush_last_seen(threading.Event(), submit=submit, buffer=seen) == 0
+    assert len(writes) == 1
+
+def test_unflushed_activity_keeps_session_alive(db_session):
+    seen = LastSeenBuffer()
+    session_id = auth_use_cases.create_session(db_session, "test@example.com")
+    assert auth_use_cases.validate_session(db_session, session_id, seen=seen)[0]
+
+    # The stored expiry passes before the flusher runs
+    db_session.query(DbSession).update({DbSession.expires_at: (datetime.now(UTC) - timedelta(seconds=1)).replace(tzinfo=None)})
+    db_session.commit()
+
+    assert auth_use_cases.validate_session(db_session, session_id, seen=seen) == (True, "test@example.com")
+
+def test_extend_sessions_never_shortens(db_session):
+    session_id = auth_use_cases.create_session(db_session, "test@example.com")
+    key = auth_use_cases.session_key(session_id)
+    earlier = datetime.now(UTC).replace(tzinfo=None)
+
+    assert session_use_cases.extend_sessions(db_session, {key: earlier}) == 0
@@ -0,0 +1,172 @@
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base, WriteQueue
+from controllers.batch_controller import BatchOperation, _execute_atomic, execute_batch, execute_mixed_batch
+from deadlines import install_query_deadlines, query_deadline
+from models import Event, EventComment
+from use_cases import event_use_cases
+
+# Setup test database with the writer's session settings
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+# Like the app's read and write engines, which both interrupt queries past their deadline
+deadline_engine = create_engine(TEST_DATABASE_URL)
+install_query_deadlines(deadline_engine, steps=1000)
+DeadlineSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=deadline_engine)
+
+SLOW_QUERY = text("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+                  "SELECT count(*) FROM n")
+
+def slow_get_events(db, include_archived=False):
+    db.execute(SLOW_QUERY)
+    return []
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def event(db_session):
+    return event_use_cases.create_event(db_session, title="Party", author_email="host@example.com", food="Cake")
+
+def operations(*items):
+    return [BatchOperation(method=method, path=path, body=body) for method, path, body in items]
+
+def test_batch_returns_every_result_in_order(db_session, event):
+    results = execute_batch(db_session, operations(
+        ("GET", f"/api/events/{event.id}", None),
+        ("POST", f"/api/events/{event.id}/comments", {"message": "Hi", "rating": 5}),
+        ("GET", f"/api/events/{event.id}/comments", None),
+        ("GET", "/api/events/my", None),
+    ), "guest@example.com")
+
+    assert [result["status"] for result in results] == [200, 200, 200, 200]
+    assert results[0]["body"]["food"] == "Cake"
+    assert results[2]["body"]["comments"][0]["message"] == "Hi"
+    assert results[3]["body"] == []
+
+def test_comment_listing_is_paged_like_the_route(db_session, event):
+    for message in ("First", "Second", "Third"):
+        execute_batch(db_session, operations(
+            ("POST", f"/api/events/{event.id}/comments", {"message": message}),
+        ), "guest@example.com")
+
+    first, = execute_batch(db_session, operations(
+        ("GET", f"/api/events/{event.id}/comments?limit=2", None),
+    ), "guest@example.com")
+    page = first["body"]
+    assert [comment["message"] for comment in page["comments"]] == ["Third", "Second"]
+    assert page["total_count"] == 3 and page["next_cursor"]
+
+    following, bad_sort, bad_limit = execute_batch(db_session, operations(
+        ("GET", f"/api/events/{event.id}/comments?limit=2&cursor={page['next_cursor']}", None),
+        ("GET", f"/api/events/{event.id}/comments?sort=bogus", None),
+        ("GET", f"/api/events/{event.id}/comments?limit=100000", None),
+    ), "guest@example.com")
+    assert [comment["message"] for comment in following["body"]["comments"]] == ["First"]
+    assert following["body"]["next_cursor"] is None and following["body"]["total_count"] is None
+    assert (bad_sort["status"], bad_limit["status"]) == (400, 422)
+
+def test_failures_map_to_route_statuses(db_session, event):
+    results = execute_batch(db_session, operations(
+        ("GET", "/api/events/999", None),
+        ("DELETE", f"/api/events/{event.id}", None),
+        ("POST", "/api/events", {"description": "no title"}),
+        ("PUT", "/api/events", None),
+        ("GET", "/api/auth/logout", None),
+    ), "guest@example.com")
+
+    assert [result["status"] for result in results] == [404, 403, 422, 405, 404]
+
+def test_non_atomic_batch_keeps_earlier_writes(db_session, event):
+    results = execute_batch(db_session, operations(
+        ("POST", f"/api/events/{event.id}/comments", {"message": "Kept"}),
+        ("DELETE", f"/api/events/{event.id}", None),
+    ), "guest@example.com")
+
+    assert [result["status"] for result in results] == [200, 403]
+    assert db_session.query(EventComment).count() == 1
+
+def test_atomic_batch_rolls_back_on_first_failure(db_session, event):
+    results = execute_batch(db_session, operations(
+        ("POST", "/api/events", {"title": "Second"}),
+        ("POST", f"/api/events/{event.id}/comments", {"message": "Lost"}),
+        ("PUT", f"/api/events/{event.id}", {"title": "Hijacked"}),
+        ("GET", "/api/events", None),
+    ), "guest@example.com", atomic=True)
+
+    assert [result["status"] for result in results] == [424, 424, 403, 424]
+    db_session.expire_all()
+    assert [e.title for e in db_session.query(Event)] == ["Party"]
+    assert db_session.query(EventComment).count() == 0
+
+def test_atomic_batch_commits_together(db_session, event):
+    start = (datetime.now(UTC) + timedelta(days=1)).replace(tzinfo=None)
+    results = execute_batch(db_session, operations(
+        ("POST", "/api/events", {"title": "Second", "start_time": start.isoformat(),
+                                 "end_time": (start + timedelta(hours=1)).isoformat()}),
+        ("POST", f"/api/events/{event.id}/comments", {"message": "Saved"}),
+    ), "guest@example.com", atomic=True)
+
+    assert [result["status"] for result in results] == [200, 200]
+    db_session.expire_all()
+    assert db_session.query(Event).count() == 2
+    assert db_session.query(EventComment).count() == 1
+
+def test_slow_read_in_mixed_batch_times_out_without_holding_the_writer(db_session, event, monkeypatch):
+    monkeypatch.setattr(event_use_cases, "get_events", slow_get_events)
+    writer = WriteQueue(TestingSessionLocal, name="test.batch_writer")
+    results = []
+
+    def batch():
+        with DeadlineSessionLocal() as read_db, query_deadline(0.5):
+            results.extend(execute_mixed_batch(read_db, operations(
+                ("GET", "/api/events", None),
+                ("POST", f"/api/events/{event.id}/comments", {"message": "After the read"}),
+                ("GET", f"/api/events/{event.id}/comments", None),
+            ), "guest@example.com", submit=writer.submit))
+
+    try:
+        thread = threading.Thread(target=batch)
+        thread.start()
+        time.sleep(0.1)
+        # The batch's read is running, yet a single write goes straight through
+        started = time.monotonic()
+        writer.submit(event_use_cases.create_event, title="Meanwhile", author_email="other@example.com")
+        assert time.monotonic() - started < 0.2
+        assert thread.is_alive()
+        thread.join(5)
+    finally:
+        writer.stop()
+
+    assert [result["status"] for result in results] == [504, 200, 200]
+    # The read after the write sees it
+    assert [comment["message"] for comment in results[2]["body"]["comments"]] == ["After the read"]
+    db_session.expire_all()
+    assert db_session.query(EventComment).count() == 1
+
+def test_atomic_batch_reads_keep_the_request_budget(db_session, event, monkeypatch):
+    monkeypatch.setattr(event_use_cases, "get_events", slow_get_events)
+    started = time.monotonic()
+    with DeadlineSessionLocal() as writer_db:
+        # As on the writer thread: no deadline of its own, only the carried-over budget
+        results = _execute_atomic(writer_db, operations(
+            ("POST", f"/api/events/{event.id}/comments", {"message": "Rolled back"}),
+            ("GET", "/api/events", None),
+        ), "guest@example.com", 0.2)
+
+    assert time.monotonic() - started < 2
+    assert [result["status"] for result in results] == [424, 504]
+    db_session.expire_all()
+    assert db_session.query(EventComment).count() == 0
@@ -0,0 +1,124 @@
+import threading
+import pytest
+from fastapi import HTTPException
+from coalescing import ResponseCache, SingleFlight, coalesced_read
+from data_version import DataVersion
+import metrics
+
+def test_concurrent_identical_calls_run_once():
+    metrics.reset()
+    flight = SingleFlight("test.flight")
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"body"
+
+    def read():
+        results.append(flight.do("event:1", compute))
+
+    leader = threading.Thread(target=read)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=read) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    while metrics.snapshot()["counters"].get("test.flight.coalesced", 0) < 5:
+        pass
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [b"body"] * 6
+    counters = metrics.snapshot()["counters"]
+    assert counters["test.flight.executed"] == 1
+    assert counters["test.flight.coalesced"] == 5
+    # Nothing is remembered once the call completed
+    assert flight.do("event:1", lambda: b"new") == b"new"
+
+def test_followers_get_their_own_copy_of_a_failure():
+    metrics.reset()
+    flight = SingleFlight("test.failing")
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        release.wait(5)
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    def read():
+        try:
+            flight.do("event:404", compute)
+        except HTTPException as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=read)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=read)
+    follower.start()
+    while not metrics.snapshot()["counters"].get("test.failing.coalesced"):
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert [e.status_code for e in errors] == [404, 404]
+    assert errors[0] is not errors[1]
+
+def test_cache_entries_expire_with_the_data_version():
+    version = DataVersion()
+    cache = ResponseCache(max_entries=10)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b"body"
+
+    assert coalesced_read("key", compute, cache=cache, version=version) == b"body"
+    assert coalesced_read("key", compute, cache=cache, version=version) == b"body"
+    assert len(calls) == 1
+    version.bump()
+    coalesced_read("key", compute, cache=cache, version=version)
+    assert len(calls) == 2
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1, b"a")
+    cache.put("b", 1, b"b")
+    assert cache.get("a", 1) == b"a"
+    cache.put("c", 1, b"c")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"a"
+    assert len(cache) == 2
+
+def test_disabled_cache_keeps_nothing():
+    cache = ResponseCache(max_entries=0)
+    calls = []
+    for _ in range(2):
+        coalesced_read("key", lambda: calls.append(1) or b"body", cache=cache, version=DataVersion())
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+def test_commits_bump_the_data_version():
+    from data_version import data_version
+    from database import WriteSessionLocal
+    seen = []
+
+    def listener():
+        seen.append(data_version.current())
+
+    data_version.add_listener(listener)
+    try:
+        before = data_version.current()
+        with WriteSessionLocal() as session:
+            session.commit()
+        assert data_version.current() == before + 1
+        assert seen == [before + 1]
+    finally:
+        data_version.remove_listener(listener)
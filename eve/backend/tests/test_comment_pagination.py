@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine, event as sqlalchemy_event
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from use_cases import comment_use_cases, event_use_cases
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+RATINGS = [3, 5, 1, 5, 3, 0, 4]
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def event(db_session):
+    event = event_use_cases.create_event(db_session, title="Popular", author_email="host@example.com")
+    for i, rating in enumerate(RATINGS):
+        comment_use_cases.create_comment(db_session, event.id, "guest@example.com", f"Comment {i}", rating=rating)
+    other = event_use_cases.create_event(db_session, title="Other", author_email="host@example.com")
+    comment_use_cases.create_comment(db_session, other.id, "guest@example.com", "Elsewhere", rating=5)
+    return event
+
+def all_pages(db, event_id, sort, limit):
+    pages, cursor = [], None
+    while True:
+        comments, cursor = comment_use_cases.get_event_comments_page(db, event_id, sort, limit, cursor)
+        pages.append([comment.message for comment in comments])
+        if cursor is None:
+            return pages
+
+def test_pages_follow_each_sort_order(db_session, event):
+    messages = [f"Comment {i}" for i in range(len(RATINGS))]
+
+    assert all_pages(db_session, event.id, "oldest", 3) == [messages[0:3], messages[3:6], messages[6:]]
+    assert sum(all_pages(db_session, event.id, "newest", 2), []) == messages[::-1]
+    by_rating = sorted(range(len(RATINGS)), key=lambda i: (RATINGS[i], i), reverse=True)
+    assert sum(all_pages(db_session, event.id, "rating", 2), []) == [messages[i] for i in by_rating]
+
+def test_deleted_comments_are_skipped_and_not_counted(db_session, event):
+    comments = comment_use_cases.get_event_comments(db_session, event.id)
+    comment_use_cases.delete_comment(db_session, comments[1].id, "guest@example.com")
+
+    page, cursor = comment_use_cases.get_event_comments_page(db_session, event.id, "oldest", 10)
+    assert [comment.message for comment in page] == [f"Comment {i}" for i in range(len(RATINGS)) if i != 1]
+    assert cursor is None
+    assert comment_use_cases.count_event_comments(db_session, event.id) == len(RATINGS) - 1
+
+def test_invalid_sort_or_cursor_is_rejected(db_session, event):
+    _, cursor = comment_use_cases.get_event_comments_page(db_session, event.id, "rating", 2)
+    with pytest.raises(ValueError, match="invalid sort"):
+        comment_use_cases.get_event_comments_page(db_session, event.id, "random", 2)
+    with pytest.raises(ValueError, match="invalid cursor"):
+        comment_use_cases.get_event_comments_page(db_session, event.id, "newest", 2, cursor)
+    with pytest.raises(ValueError, match="invalid cursor"):
+        comment_use_cases.get_event_comments_page(db_session, event.id, "rating", 2, "not-a-cursor")
+
+@pytest.mark.parametrize("sort", ["newest", "oldest", "rating"])
+def test_pages_are_index_range_scans(db_session, event, sort):
+    _, cursor = comment_use_cases.get_event_comments_page(db_session, event.id, sort, 2)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        comment_use_cases.get_event_comments_page(db_session, event.id, sort, 2, cursor)
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    statement, parameters = statements[0]
+    plan = " ".join(row[-1] for row in db_session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement,
+                                                                              parameters))
+    assert "INDEX ix_event_comments_event_id" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,67 @@
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from data_version import DataVersion, DataVersionWatcher, create_data_version_watcher
+import revocation
+
+def _database(path):
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+    return connection
+
+def test_commits_of_other_connections_bump_the_version(tmp_path):
+    path = str(tmp_path / "watched.db")
+    writer = _database(path)
+    version = DataVersion()
+    watcher = DataVersionWatcher(path, version)
+    try:
+        assert not watcher.check()
+        assert not watcher.check()
+        writer.execute("INSERT INTO t VALUES (1)")
+        assert watcher.check()
+        assert version.current() == 1
+        assert not watcher.check()
+    finally:
+        watcher.close()
+        writer.close()
+
+def test_sibling_process_write_is_seen_within_milliseconds(tmp_path):
+    path = str(tmp_path / "watched.db")
+    _database(path).close()
+    version = DataVersion()
+    seen = threading.Event()
+    version.add_listener(seen.set)
+    worker = create_data_version_watcher(path, interval=0.002, version=version)
+    worker.start()
+    try:
+        time.sleep(0.05)  # First check takes the baseline
+        subprocess.run([sys.executable, "-c",
+                        f"import sqlite3; c = sqlite3.connect({path!r}); c.execute('INSERT INTO t VALUES (1)'); c.commit()"],
+                       check=True)
+        committed_at = time.monotonic()
+        assert seen.wait(1)
+        assert time.monotonic() - committed_at < 0.1
+    finally:
+        worker.stop()
+
+def test_revocations_reload_only_after_a_change(monkeypatch):
+    monkeypatch.setattr(revocation, "load_revocations", lambda db: 0)
+    version = DataVersion()
+    loads = []
+
+    @contextmanager
+    def session_factory():
+        loads.append(1)
+        yield None
+
+    refresh = revocation.create_revocation_refresher(session_factory, version=version)._fn
+    refresh(threading.Event())
+    refresh(threading.Event())
+    assert len(loads) == 1
+    version.bump()
+    refresh(threading.Event())
+    assert len(loads) == 2
@@ -5,7 +5,7 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 from database import Base
 from models import Event, EventComment
-from use_cases import event_use_cases, comment_use_cases
+from use_cases import event_use_cases, comment_use_cases, purge_use_cases, user_use_cases
 
 # Setup test database
 TEST_DATABASE_URL = "sqlite:///data/test.db"
@@ -199,4 +199,48 @@ def test_database_connection_handling(db_session):
         end_time=(datetime.now(UTC) + timedelta(days=1, hours=2)).replace(tzinfo=None),
         author_email="test@example.com"
     )
-    assert event.id is not None
\ No newline at end of file
+    assert event.id is not None
+def test_delete_event_with_many_comments_is_single_statement(db_session, test_event):
+    """Test that deleting an event only tombstones it and the purge removes rows in chunks"""
+    user_ids = user_use_cases.intern_users(db_session, [f"user{i}@example.com" for i in range(5000)])
+    db_session.execute(
+        EventComment.__table__.insert(),
+        [
+            {
+                "event_id": test_event.id,
+                "message": f"Comment {i}",
+                "rating": i % 6,
+                "author_id": user_ids[f"user{i}@example.com"]
+            }
+            for i in range(5000)
+        ]
+    )
+    db_session.commit()
+    event_id, author_email = test_event.id, test_event.author_email
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        event_use_cases.delete_event(db_session, event_id, author_email)
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE events SET deleted_at")
+    assert event_use_cases.get_event(db_session, event_id) is None
+    assert comment_use_cases.get_event_comments(db_session, event_id) == []
+
+    chunks = []
+    while not chunks or chunks[-1] == 1000:
+        chunks.append(purge_use_cases.purge_deleted(db_session, batch_size=1000))
+    assert sum(chunks) == 5001
+    assert max(chunks) <= 1000
+    remaining = db_session.execute(
+        text("SELECT COUNT(*) FROM event_comments WHERE event_id = :id"), {"id": event_id}
+    ).scalar()
+    assert remaining == 0
+    assert db_session.execute(text("SELECT COUNT(*) FROM events")).scalar() == 0
@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from controllers.dependencies import query_budget
+from deadlines import QueryDeadlineExceeded, deadline_passed, install_query_deadlines, query_deadline
+
+# A dedicated engine, so the handler is only installed here
+engine = create_engine("sqlite:///data/test.db")
+install_query_deadlines(engine, steps=1000)
+
+# Counts to 100 million: runs for many seconds unless interrupted
+SLOW_QUERY = text(
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+    "SELECT count(*) FROM n"
+)
+
+def test_query_past_deadline_is_interrupted():
+    with engine.connect() as conn:
+        started = time.monotonic()
+        with query_deadline(0.05):
+            with pytest.raises(QueryDeadlineExceeded):
+                conn.execute(SLOW_QUERY)
+        assert time.monotonic() - started < 1
+        # The connection is still usable afterwards
+        conn.rollback()
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+def test_queries_without_deadline_are_untouched():
+    with engine.connect() as conn:
+        with query_deadline(None):
+            assert conn.execute(text("SELECT 42")).scalar() == 42
+        with query_deadline(5):
+            assert conn.execute(text("SELECT 42")).scalar() == 42
+
+def test_deadline_only_applies_to_its_own_context():
+    results = []
+
+    def other_request():
+        with engine.connect() as conn:
+            results.append(conn.execute(text(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) "
+                "SELECT count(*) FROM n"
+            )).scalar())
+
+    with query_deadline(0):
+        assert deadline_passed()
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        thread.join()
+    assert results == [200000]
+
+def test_route_budget_is_seen_by_the_threadpool():
+    async def request():
+        await query_budget(0)()
+        context = contextvars.copy_context()
+        # What run_in_threadpool does for the route and its dependencies
+        return await asyncio.get_running_loop().run_in_executor(None, context.run, deadline_passed)
+
+    assert asyncio.run(request())
+    assert not deadline_passed()
@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime, timedelta, timezone, UTC
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from migrations import LATEST_VERSION, migrate
+from models import Event
+from use_cases import event_use_cases
+from use_cases.user_use_cases import intern_user
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA user_version = 0")
+
+def test_times_round_trip_as_integers(db_session):
+    """Test that times are stored as epoch microseconds and read back unchanged"""
+    start = (datetime.now(UTC) + timedelta(days=1)).replace(tzinfo=None, microsecond=123456)
+    event = event_use_cases.create_event(
+        db_session, title="Event", author_email="test@example.com",
+        start_time=start, end_time=start + timedelta(hours=2)
+    )
+    db_session.expire_all()
+
+    row = db_session.execute(text("SELECT typeof(start_time), start_time FROM events")).one()
+    assert row[0] == "integer"
+    assert row[1] == int((start - datetime(1970, 1, 1)).total_seconds()) * 1000000 + 123456
+    assert event_use_cases.get_event(db_session, event.id).start_time == start
+
+def test_aware_values_are_stored_as_utc(db_session):
+    local = datetime(2030, 1, 1, 12, 0, tzinfo=timezone(timedelta(hours=2)))
+    db_session.add(Event(title="Event", author_id=intern_user(db_session, "test@example.com"), start_time=local))
+    db_session.commit()
+    db_session.expire_all()
+
+    assert db_session.query(Event).one().start_time == datetime(2030, 1, 1, 10, 0)
+
+def test_range_filters_use_time_indexes(db_session):
+    now = datetime.now(UTC).replace(tzinfo=None)
+    query = event_use_cases.live_events(db_session).filter(Event.start_time > now).order_by(Event.start_time)
+    statement = query.statement.compile(engine, compile_kwargs={"literal_binds": True})
+
+    plan = " ".join(row[3] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+
+    assert "ix_events_deleted_at_start_time" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_migrate_converts_stored_datetimes(db_session):
+    """Test that ISO text times from the DateTime schema become epoch integers"""
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE events (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, title VARCHAR NOT NULL, "
+            "description VARCHAR, place VARCHAR, start_time DATETIME, end_time DATETIME, food VARCHAR, "
+            "drinks VARCHAR, program VARCHAR, parking_info VARCHAR, music VARCHAR, theme VARCHAR, "
+            "age_restrictions VARCHAR, author_email VARCHAR NOT NULL, deleted_at DATETIME)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO events (title, author_email, start_time, end_time) VALUES "
+            "('Fraction', 'a@example.com', '2024-05-01 10:30:00.250000', '2024-05-01 12:00:00.000000'), "
+            "('Whole', 'a@example.com', '2024-05-02 08:00:00', NULL)"
+        )
+        conn.exec_driver_sql("PRAGMA user_version = 2")
+
+    assert migrate(engine) == LATEST_VERSION
+
+    events = {event.title: event for event in db_session.query(Event)}
+    assert events["Fraction"].start_time == datetime(2024, 5, 1, 10, 30, 0, 250000)
+    assert events["Fraction"].end_time == datetime(2024, 5, 1, 12, 0)
+    assert events["Whole"].start_time == datetime(2024, 5, 2, 8, 0)
+    assert events["Whole"].end_time is None
+    types = db_session.execute(text("SELECT DISTINCT typeof(start_time) FROM events")).scalars().all()
+    assert types == ["integer"]
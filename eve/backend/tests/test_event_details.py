@@ -0,0 +1,144 @@
+import os
+import pytest
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine, event as sqlalchemy_event, text
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_connections
+from migrations import LATEST_VERSION, migrate
+from models import Event, archive_metadata
+from use_cases import archive_use_cases, event_use_cases
+from use_cases.user_use_cases import intern_user
+
+# Setup test database with an attached archive
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+TEST_ARCHIVE_PATH = "data/test_archive.db"
+engine = create_engine(TEST_DATABASE_URL)
+configure_connections(engine, archive_path=TEST_ARCHIVE_PATH)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+NOW = datetime.now(UTC).replace(tzinfo=None)
+
+@pytest.fixture
+def db_session():
+    migrate(engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        archive_metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA main.user_version = 0")
+            conn.exec_driver_sql("PRAGMA archive.user_version = 0")
+        engine.dispose()
+        os.remove(TEST_ARCHIVE_PATH)
+
+def count(db, table):
+    return db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+def test_details_are_stored_apart(db_session):
+    """Test that only events with details get an event_details row"""
+    plain = event_use_cases.create_event(db_session, title="Plain", author_email="a@example.com")
+    rich = event_use_cases.create_event(db_session, title="Rich", author_email="a@example.com",
+                                        food="Cake", music="Jazz")
+
+    assert (plain.food, rich.food, rich.music, rich.theme) == (None, "Cake", "Jazz", None)
+    assert db_session.execute(text("SELECT event_id, food FROM event_details")).all() == [(rich.id, "Cake")]
+    columns = {row[1] for row in db_session.execute(text("PRAGMA table_info(events)"))}
+    assert "food" not in columns
+
+def test_lists_do_not_read_details(db_session):
+    event = event_use_cases.create_event(db_session, title="Rich", author_email="a@example.com", food="Cake")
+    db_session.expunge_all()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert [e.id for e in event_use_cases.get_events(db_session)] == [event.id]
+        assert not any("event_details" in statement for statement in statements)
+        assert event_use_cases.get_event(db_session, event.id).food == "Cake"
+        assert any("event_details" in statement for statement in statements)
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+def test_update_writes_both_parts(db_session):
+    event_id = event_use_cases.create_event(db_session, title="Plain", author_email="a@example.com").id
+
+    updated = event_use_cases.update_event(db_session, event_id, "a@example.com", title="Rich", drinks="Tea")
+    assert (updated.title, updated.drinks) == ("Rich", "Tea")
+    updated = event_use_cases.update_event(db_session, event_id, "a@example.com", drinks="Coffee")
+    assert (updated.title, updated.drinks) == ("Rich", "Coffee")
+    assert count(db_session, "event_details") == 1
+
+    # A failed ownership check leaves the details untouched
+    with pytest.raises(ValueError, match="not authorized"):
+        event_use_cases.update_event(db_session, event_id, "b@example.com", drinks="Water")
+    db_session.expunge_all()
+    assert event_use_cases.get_event(db_session, event_id).drinks == "Coffee"
+
+def test_clearing_details_leaves_no_empty_row(db_session):
+    plain = event_use_cases.create_event(db_session, title="Plain", author_email="a@example.com")
+    rich = event_use_cases.create_event(db_session, title="Rich", author_email="a@example.com",
+                                        food="Cake", music="Jazz")
+
+    assert event_use_cases.update_event(db_session, plain.id, "a@example.com", food=None, music=None).food is None
+    assert count(db_session, "event_details") == 1
+
+    updated = event_use_cases.update_event(db_session, rich.id, "a@example.com", food=None)
+    assert (updated.food, updated.music) == (None, "Jazz")
+    updated = event_use_cases.update_event(db_session, rich.id, "a@example.com", music=None)
+    assert (updated.food, updated.music) == (None, None)
+    assert count(db_session, "event_details") == 0
+    db_session.expunge_all()
+    assert event_use_cases.get_event(db_session, rich.id).details is None
+
+def test_details_follow_events_to_the_archive(db_session):
+    end_time = NOW - timedelta(days=100)
+    event = Event(title="Old", author_id=intern_user(db_session, "a@example.com"),
+                  start_time=end_time - timedelta(hours=2), end_time=end_time)
+    db_session.add(event)
+    db_session.flush()
+    db_session.execute(text("INSERT INTO event_details (event_id, theme) VALUES (:id, 'Retro')"), {"id": event.id})
+    db_session.commit()
+
+    archive_use_cases.archive_events(db_session, NOW - timedelta(days=90))
+    db_session.expunge_all()
+
+    assert count(db_session, "main.event_details") == 0
+    assert event_use_cases.get_event(db_session, event.id, include_archived=True).theme == "Retro"
+
+def test_migrate_moves_detail_columns(db_session):
+    """Test that filled detail columns of an existing events table land in event_details"""
+    Base.metadata.drop_all(bind=engine)
+    archive_metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        for schema in ("main", "archive"):
+            conn.exec_driver_sql(
+                f"CREATE TABLE {schema}.users (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+                "email VARCHAR NOT NULL UNIQUE)"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TABLE {schema}.events (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+                "title VARCHAR NOT NULL, description VARCHAR, place VARCHAR, start_time INTEGER, "
+                "end_time INTEGER, food VARCHAR, drinks VARCHAR, program VARCHAR, parking_info VARCHAR, "
+                "music VARCHAR, theme VARCHAR, age_restrictions VARCHAR, "
+                "author_id INTEGER NOT NULL REFERENCES users (id), deleted_at DATETIME)"
+            )
+            conn.exec_driver_sql(f"INSERT INTO {schema}.users (id, email) VALUES (1, 'a@example.com')")
+            conn.exec_driver_sql(f"PRAGMA {schema}.user_version = 4")
+        conn.exec_driver_sql("INSERT INTO events (id, title, author_id) VALUES (1, 'Plain', 1)")
+        conn.exec_driver_sql("INSERT INTO events (id, title, food, author_id) VALUES (2, 'Rich', 'Cake', 1)")
+        conn.exec_driver_sql("INSERT INTO archive.events (id, title, music, author_id) VALUES (3, 'Cold', 'Jazz', 1)")
+
+    assert migrate(engine) == LATEST_VERSION
+
+    assert db_session.execute(text("SELECT event_id, food FROM event_details")).all() == [(2, "Cake")]
+    assert event_use_cases.get_event(db_session, 2).food == "Cake"
+    assert event_use_cases.get_event(db_session, 3, include_archived=True).music == "Jazz"
+    for schema in ("main", "archive"):
+        columns = {row[1] for row in db_session.execute(text(f"PRAGMA {schema}.table_info(events)"))}
+        assert "food" not in columns and "title" in columns
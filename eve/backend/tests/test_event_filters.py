@@ -107,6 +107,19 @@ def test_upcoming_events_filter(db_session, sample_events):
     for i in range(1, len(upcoming)):
         assert upcoming[i-1].start_time <= upcoming[i].start_time
 
+def test_upcoming_route_skips_events_without_times(db_session, sample_events):
+    """The /upcoming route uses the indexed range query and copes with unscheduled events"""
+    from controllers.event_controller import list_upcoming_events
+    event_use_cases.create_event(db_session, title="Unscheduled", author_email="user1@example.com")
+
+    upcoming = list_upcoming_events(include=None, db=db_session, current_user="user1@example.com")
+
+    assert [event.title for event in upcoming] == [
+        event.title for event in event_use_cases.get_upcoming_events(db_session)
+    ]
+    assert "Unscheduled" not in [event.title for event in upcoming]
+    assert upcoming
+
 def test_my_events_filter(db_session, sample_events):
     """Test filtering events by author"""
     # Get user1's events
@@ -0,0 +1,123 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event as sqlalchemy_event
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from controllers import event_controller
+from controllers.event_controller import EventResponse, EventSummaryResponse, include_related, parse_include
+from use_cases import comment_use_cases, event_use_cases
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def events(db_session):
+    events = [event_use_cases.create_event(db_session, title=f"Event {i}", author_email="host@example.com")
+              for i in range(3)]
+    for i, event in enumerate(events):
+        for rating in range(1, 2 + 2 * i):
+            comment_use_cases.create_comment(db_session, event.id, "guest@example.com", f"Comment {rating}",
+                                             rating=min(rating, 5))
+    db_session.expunge_all()
+    return events
+
+def test_comments_are_capped_per_event(db_session, events):
+    comments = comment_use_cases.get_comments_for_events(db_session, [event.id for event in events] + [999], 2)
+
+    assert [len(comments[event.id]) for event in events] == [1, 2, 2]
+    assert [comment.message for comment in comments[events[2].id]] == ["Comment 1", "Comment 2"]
+    assert comments[events[2].id][0].user_id == "guest@example.com"
+    assert comments[999] == []
+
+def test_stats_match_the_single_event_stats(db_session, events):
+    stats = comment_use_cases.get_rating_stats_for_events(db_session, [event.id for event in events])
+
+    assert stats[events[2].id] == {
+        "average_rating": 3.0,
+        "total_ratings": 5,
+        "rating_distribution": {1: 1, 2: 1, 3: 1, 4: 1, 5: 1}
+    }
+    assert comment_use_cases.get_event_rating_stats(db_session, events[1].id) == stats[events[1].id]
+    assert comment_use_cases.get_event_rating_stats(db_session, 999)["total_ratings"] == 0
+
+def test_a_page_with_includes_costs_three_queries(db_session, events, monkeypatch):
+    monkeypatch.setattr(event_controller, "INCLUDE_COMMENTS_LIMIT", 2)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        page = include_related(db_session, event_use_cases.get_events(db_session), {"comments", "stats"})
+        response = [EventSummaryResponse.model_validate(event).model_dump(exclude_unset=True) for event in page]
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert len(statements) == 3
+    assert [len(item["comments"]) for item in response] == [1, 2, 2]
+    assert [item["stats"]["total_ratings"] for item in response] == [1, 3, 5]
+
+def test_includes_are_left_out_unless_requested(db_session, events):
+    event = event_use_cases.get_event(db_session, events[0].id)
+
+    plain = EventResponse.model_validate(event).model_dump(exclude_unset=True)
+    assert "comments" not in plain and "stats" not in plain
+    assert "description" in plain
+
+    included = EventResponse.model_validate(include_related(db_session, [event], {"stats"})[0])
+    assert included.model_dump(exclude_unset=True)["stats"]["average_rating"] == 1.0
+
+def test_parse_include():
+    assert parse_include(None) == set()
+    assert parse_include("comments, stats") == {"comments", "stats"}
+    with pytest.raises(HTTPException) as error:
+        parse_include("comments,author")
+    assert error.value.status_code == 400
+
+def test_previews_are_the_latest_comments_per_event(db_session, events):
+    previews = comment_use_cases.get_comment_previews(db_session, [event.id for event in events], 2)
+
+    assert [[comment.message for comment in previews[event.id]] for event in events] == [
+        ["Comment 1"], ["Comment 3", "Comment 2"], ["Comment 5", "Comment 4"]
+    ]
+
+def test_top_comments_by_rating(db_session, events):
+    top = comment_use_cases.get_comments_for_events(db_session, [events[2].id], 3, sort="rating")[events[2].id]
+
+    assert [comment.rating for comment in top] == [5, 4, 3]
+    with pytest.raises(ValueError):
+        comment_use_cases.get_comments_for_events(db_session, [events[2].id], 3, sort="random")
+
+def test_previews_include_in_one_query(db_session, events, monkeypatch):
+    monkeypatch.setattr(event_controller, "PREVIEW_COMMENTS", 1)
+    page = event_use_cases.get_events(db_session)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        include_related(db_session, page, {"previews"})
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert len(statements) == 1 and "row_number()" in statements[0].lower()
+    response = [EventSummaryResponse.model_validate(event).model_dump(exclude_unset=True) for event in page]
+    assert [[comment["message"] for comment in item["previews"]] for item in response] == [
+        ["Comment 1"], ["Comment 3"], ["Comment 5"]
+    ]
+    assert "comments" not in response[0]
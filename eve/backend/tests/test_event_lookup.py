@@ -0,0 +1,72 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event as sqlalchemy_event
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from controllers.dependencies import parse_ids
+from controllers.event_controller import EventLookupResponse, lookup_events
+from use_cases import event_use_cases
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+def test_events_come_back_in_request_order(db_session):
+    first = event_use_cases.create_event(db_session, title="First", author_email="a@example.com", food="Cake")
+    second = event_use_cases.create_event(db_session, title="Second", author_email="b@example.com")
+    deleted = event_use_cases.create_event(db_session, title="Gone", author_email="a@example.com")
+    event_use_cases.delete_event(db_session, deleted.id, "a@example.com")
+    db_session.expunge_all()
+
+    events = event_use_cases.get_events_by_ids(db_session, [second.id, 999, first.id, deleted.id, second.id])
+
+    assert [event and event.title for event in events] == ["Second", None, "First", None, "Second"]
+    assert events[2].food == "Cake" and events[0].food is None
+    assert events[0].author_email == "b@example.com"
+
+def test_ids_are_fetched_in_chunks(db_session, monkeypatch):
+    ids = [event_use_cases.create_event(db_session, title=f"Event {i}", author_email="a@example.com").id
+           for i in range(5)]
+    db_session.expunge_all()
+    monkeypatch.setattr(event_use_cases, "MAX_IDS_PER_QUERY", 2)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        events = event_use_cases.get_events_by_ids(db_session, list(reversed(ids)))
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert [event.id for event in events] == list(reversed(ids))
+    # Events and details for each of the three chunks
+    assert len(statements) == 6
+
+def test_lookup_marks_missing_ids(db_session):
+    event = event_use_cases.create_event(db_session, title="Party", author_email="a@example.com", music="Jazz")
+
+    response = EventLookupResponse.model_validate(lookup_events(db_session, [event.id, 42]))
+
+    assert [(result.id, result.found) for result in response.results] == [(event.id, True), (42, False)]
+    assert response.results[0].event.music == "Jazz"
+    assert response.results[1].event is None
+
+def test_parse_ids():
+    assert parse_ids("3,1, 2,") == [3, 1, 2]
+    for bad in ("", "1,x", ",".join(["1"] * 1001)):
+        with pytest.raises(HTTPException) as error:
+            parse_ids(bad)
+        assert error.value.status_code == 400
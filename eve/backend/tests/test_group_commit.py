@@ -0,0 +1,130 @@
+import pytest
+from datetime import datetime, timedelta, UTC
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import Base, GroupCommit, WriteQueue, configure_connections
+from models import EventComment
+from use_cases import comment_use_cases, event_use_cases
+import metrics
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+configure_connections(engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The writer gets its own single-connection engine, like database.write_engine
+write_engine = create_engine(TEST_DATABASE_URL, pool_size=1, max_overflow=0)
+configure_connections(write_engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        write_engine.dispose()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def write_queue(db_session):
+    queue = WriteQueue(WriteSessionLocal, name="test.write_queue")
+    try:
+        yield queue
+    finally:
+        queue.stop()
+
+@pytest.fixture
+def test_event(db_session):
+    return event_use_cases.create_event(
+        db_session,
+        title="Test Event",
+        start_time=(datetime.now(UTC) + timedelta(days=1)).replace(tzinfo=None),
+        end_time=(datetime.now(UTC) + timedelta(days=1, hours=2)).replace(tzinfo=None),
+        author_email="event@example.com"
+    )
+
+def comment_data(event_id, index, **overrides):
+    data = {
+        "event_id": event_id,
+        "user_id": f"user{index}@example.com",
+        "message": f"Comment {index}",
+        "rating": 5,
+        "author_email": f"user{index}@example.com"
+    }
+    data.update(overrides)
+    return data
+
+def test_create_comments_reports_errors_per_item(db_session, test_event):
+    """Test that invalid items fail alone while the rest are committed"""
+    results = comment_use_cases.create_comments(db_session, [
+        comment_data(test_event.id, 1),
+        comment_data(test_event.id, 2, message=""),
+        comment_data(99999, 3),
+        comment_data(test_event.id, 4, rating=9),
+        comment_data(test_event.id, 5),
+    ])
+
+    assert isinstance(results[0], EventComment) and results[0].id is not None
+    assert isinstance(results[1], ValueError) and "empty" in str(results[1])
+    assert isinstance(results[2], ValueError) and "event not found" in str(results[2])
+    assert isinstance(results[3], ValueError) and "rating" in str(results[3])
+    assert isinstance(results[4], EventComment) and results[4].id is not None
+
+    comments = comment_use_cases.get_event_comments(db_session, test_event.id)
+    assert sorted(c.message for c in comments) == ["Comment 1", "Comment 5"]
+
+def test_group_commit_coalesces_concurrent_inserts(write_queue, test_event):
+    """Test that concurrent submitters share transactions but get their own rows"""
+    metrics.reset()
+    group_commit = GroupCommit(
+        comment_use_cases.create_comments,
+        writer=write_queue,
+        window=0.05,
+        max_batch=8,
+        name="test.group_commit"
+    )
+
+    def submit(index):
+        return group_commit.submit(comment_data(test_event.id, index))
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        comments = list(pool.map(submit, range(32)))
+
+    assert len({c.id for c in comments}) == 32
+    assert [c.message for c in comments] == [f"Comment {i}" for i in range(32)]
+    batches = metrics.snapshot()["timings"]["test.group_commit.batch_size"]
+    assert batches["sum"] == 32
+    assert batches["count"] < 32
+    assert batches["max"] <= 8
+
+def test_group_commit_raises_caller_error(write_queue, test_event):
+    """Test that a failing item raises only in its own caller"""
+    group_commit = GroupCommit(comment_use_cases.create_comments, writer=write_queue, window=0.05)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        good = pool.submit(group_commit.submit, comment_data(test_event.id, 1))
+        bad = pool.submit(group_commit.submit, comment_data(test_event.id, 2, message=" "))
+
+        assert good.result().id is not None
+        with pytest.raises(ValueError, match="message cannot be empty"):
+            bad.result()
+
+def test_group_commit_fails_short_results(write_queue):
+    """Test that callers are failed, not left waiting, when results go missing"""
+    group_commit = GroupCommit(lambda db, items: [], writer=write_queue, window=0.05)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(group_commit.submit, {"index": i}) for i in range(2)]
+        errors = []
+        for future in futures:
+            with pytest.raises(RuntimeError, match="group commit failed") as exc_info:
+                future.result(timeout=5)
+            errors.append(exc_info.value)
+
+    # Each caller gets its own exception instance
+    assert errors[0] is not errors[1]
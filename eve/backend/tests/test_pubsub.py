@@ -0,0 +1,88 @@
+import asyncio
+from pubsub import DROPPED, Broker, ChangeFeed
+from controllers import stream_controller
+import metrics
+
+def test_messages_reach_each_subscriber_once():
+    async def scenario():
+        broker = Broker(buffer_size=10)
+        everything = broker.subscribe("events")
+        one_event = broker.subscribe("event:1")
+        other_event = broker.subscribe("event:2")
+
+        assert broker.publish(["events", "event:1"], b"comment") == 2
+        assert await everything.get(0.1) == b"comment"
+        assert await everything.get(0.01) is None  # Not twice for two matching topics
+        assert await one_event.get(0.1) == b"comment"
+        assert await other_event.get(0.01) is None
+
+        broker.unsubscribe(one_event)
+        broker.unsubscribe(one_event)
+        assert broker.subscriber_count() == 2
+
+    asyncio.run(scenario())
+
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        broker = Broker(buffer_size=2)
+        slow = broker.subscribe("events")
+        fast = broker.subscribe("events")
+        for i in range(3):
+            broker.publish(["events"], i)
+            assert await fast.get(0.1) == i
+
+        assert slow.dropped and await slow.get(0.1) is DROPPED
+        assert broker.subscriber_count() == 1
+        broker.publish(["events"], 3)
+        assert await fast.get(0.1) == 3
+
+    asyncio.run(scenario())
+    assert metrics.snapshot()["counters"]["stream.dropped"] >= 1
+
+def test_broker_rejects_subscribers_beyond_capacity():
+    broker = Broker(max_subscribers=1)
+    assert broker.subscribe("events") is not None
+    assert broker.at_capacity() and broker.subscribe("events") is None
+
+def test_feed_publishes_committed_changes_when_notified():
+    log = []
+
+    def read_changes(since):
+        new = [entry for entry in log if entry[0] > since]
+        return (new[-1][0] if new else since), [(["events"], message) for _, message in new]
+
+    def latest_seq():
+        return log[-1][0] if log else 0
+
+    async def scenario():
+        broker = Broker()
+        feed = ChangeFeed(broker, read_changes, latest_seq, interval=60)
+        task = asyncio.create_task(feed.run())
+        await asyncio.sleep(0.05)
+        subscription = broker.subscribe("events")
+
+        log.append((1, b"first"))
+        # From another thread, as the writer's after_commit hook does
+        await asyncio.to_thread(feed.notify)
+        assert await subscription.get(1) == b"first"
+        assert feed.seq == 1
+        task.cancel()
+
+    asyncio.run(scenario())
+
+def test_stream_sends_ready_messages_and_keepalives(monkeypatch):
+    monkeypatch.setattr(stream_controller, "STREAM_KEEPALIVE_SECONDS", 0.01)
+    monkeypatch.setattr(stream_controller, "STREAM_MAX_SECONDS", 0.2)
+    broker = Broker()
+    monkeypatch.setattr(stream_controller, "broker", broker)
+
+    async def scenario():
+        stream = stream_controller._stream(("event:1",))
+        assert (await anext(stream)).startswith(b"id: ")
+        broker.publish(["event:1"], stream_controller.sse("comment", {"id": 5}, 7))
+        assert await anext(stream) == b'id: 7\nevent: comment\ndata: {"id":5}\n\n'
+        assert await anext(stream) == b": keepalive\n\n"
+        await stream.aclose()
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,113 @@
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, UTC
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import Event, EventComment
+from use_cases import retention_use_cases
+from use_cases.user_use_cases import intern_user
+from retention import bulk_delete_events
+from controllers import dependencies
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+NOW = datetime.now(UTC).replace(tzinfo=None)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+def add_event(db, author_email, ended_days_ago, comments=0):
+    """Insert an event directly, since create_event rejects past times"""
+    end_time = NOW - timedelta(days=ended_days_ago)
+    event = Event(title="Event", author_id=intern_user(db, author_email),
+                  start_time=end_time - timedelta(hours=2), end_time=end_time)
+    db.add(event)
+    db.flush()
+    for i in range(comments):
+        db.add(EventComment(event_id=event.id, message=f"Comment {i}", rating=3,
+                            author_id=intern_user(db, "user@example.com")))
+    db.commit()
+    return event
+
+def inline_submit(db):
+    """Run write jobs on the test session instead of the writer queue"""
+    return lambda fn, *args, **kwargs: fn(db, *args, **kwargs)
+
+@contextmanager
+def session_factory(db):
+    yield db
+
+def count(db, table):
+    return db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+def test_criteria_are_required(db_session):
+    with pytest.raises(ValueError, match="at least one"):
+        retention_use_cases.delete_matching_events(db_session)
+
+def test_delete_ended_before_in_chunks(db_session):
+    """Test that old events and their comments go and chunks stay within the batch size"""
+    add_event(db_session, "a@example.com", ended_days_ago=30, comments=7)
+    add_event(db_session, "b@example.com", ended_days_ago=40, comments=2)
+    recent = add_event(db_session, "a@example.com", ended_days_ago=1, comments=3)
+    chunks = []
+
+    report = bulk_delete_events(
+        ended_before=NOW - timedelta(days=7),
+        batch_size=4,
+        progress=chunks.append,
+        submit=inline_submit(db_session)
+    )
+
+    assert (report["events"], report["comments"], report["rows"]) == (2, 9, 11)
+    assert report["chunks"] == 3 and len(chunks) == 3
+    assert [c["comments"] for c in chunks] == [4, 8, 9]
+    assert report["rows_per_second"] > 0
+    assert [e.id for e in db_session.query(Event)] == [recent.id]
+    assert count(db_session, "event_comments") == 3
+
+def test_delete_by_author_and_date(db_session):
+    """Test that all criteria must match"""
+    add_event(db_session, "a@example.com", ended_days_ago=30, comments=1)
+    kept = add_event(db_session, "b@example.com", ended_days_ago=30, comments=1)
+
+    report = bulk_delete_events(
+        ended_before=NOW, author_email="a@example.com", submit=inline_submit(db_session)
+    )
+
+    assert (report["events"], report["comments"]) == (1, 1)
+    assert [e.id for e in db_session.query(Event)] == [kept.id]
+
+def test_dry_run_only_counts(db_session):
+    add_event(db_session, "a@example.com", ended_days_ago=30, comments=5)
+
+    report = bulk_delete_events(
+        author_email="a@example.com",
+        dry_run=True,
+        submit=None,
+        read_session=lambda: session_factory(db_session)
+    )
+
+    assert report["dry_run"]
+    assert (report["events"], report["comments"], report["chunks"]) == (1, 5, 0)
+    assert count(db_session, "events") == 1
+    assert count(db_session, "event_comments") == 5
+
+def test_admin_user_required(monkeypatch):
+    monkeypatch.setattr(dependencies, "ADMIN_EMAILS", {"admin@example.com"})
+
+    assert dependencies.get_admin_user("Admin@Example.com") == "Admin@Example.com"
+    with pytest.raises(HTTPException) as exc_info:
+        dependencies.get_admin_user("user@example.com")
+    assert exc_info.value.status_code == 403
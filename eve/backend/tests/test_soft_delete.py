@@ -0,0 +1,113 @@
+import pytest
+import threading
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from migrations import LATEST_VERSION, get_version, migrate
+from models import EventComment
+from use_cases import comment_use_cases, event_use_cases, purge_use_cases
+from purger import purge_tombstones
+import metrics
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA user_version = 0")
+
+@pytest.fixture
+def test_event(db_session):
+    return event_use_cases.create_event(db_session, title="Event", author_email="event@example.com")
+
+def add_comments(db, event_id, count):
+    return [
+        comment_use_cases.create_comment(
+            db, event_id=event_id, user_id="user@example.com", message=f"Comment {i}", rating=3
+        )
+        for i in range(count)
+    ]
+
+def count(db, table):
+    return db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+def test_deleted_comment_is_hidden_until_purged(db_session, test_event):
+    """Test that a deleted comment stays in the table but disappears from reads"""
+    comment, kept = add_comments(db_session, test_event.id, 2)
+    comment_use_cases.delete_comment(db_session, comment.id, "user@example.com")
+
+    assert comment_use_cases.get_comment(db_session, comment.id) is None
+    assert [c.id for c in comment_use_cases.get_event_comments(db_session, test_event.id)] == [kept.id]
+    assert comment_use_cases.get_event_rating_stats(db_session, test_event.id)["total_ratings"] == 1
+    assert count(db_session, "event_comments") == 2
+
+    assert purge_use_cases.purge_deleted(db_session) == 1
+    assert count(db_session, "event_comments") == 1
+
+def test_deleted_event_cannot_be_deleted_or_commented_again(db_session, test_event):
+    """Test that a tombstoned event behaves as missing for writes"""
+    event_use_cases.delete_event(db_session, test_event.id, "event@example.com")
+
+    with pytest.raises(ValueError, match="not found"):
+        event_use_cases.delete_event(db_session, test_event.id, "event@example.com")
+    with pytest.raises(ValueError, match="not found"):
+        add_comments(db_session, test_event.id, 1)
+
+def test_purge_deletes_event_after_its_comments(db_session, test_event):
+    """Test that chunks never exceed the batch size and events go last"""
+    add_comments(db_session, test_event.id, 5)
+    event_use_cases.delete_event(db_session, test_event.id, "event@example.com")
+
+    assert purge_use_cases.purge_deleted(db_session, batch_size=3) == 3
+    assert count(db_session, "events") == 1
+    assert purge_use_cases.purge_deleted(db_session, batch_size=3) == 3
+    assert count(db_session, "events") == 0
+    assert count(db_session, "event_comments") == 0
+    assert purge_use_cases.purge_deleted(db_session, batch_size=3) == 0
+
+def test_purge_tombstones_submits_one_job_per_chunk(db_session, test_event):
+    """Test that the purger loops in chunks until a short chunk signals it is done"""
+    metrics.reset()
+    add_comments(db_session, test_event.id, 4)
+    event_use_cases.delete_event(db_session, test_event.id, "event@example.com")
+    jobs = []
+
+    def submit(fn, *args):
+        jobs.append(args)
+        return fn(db_session, *args)
+
+    assert purge_tombstones(threading.Event(), submit=submit, batch_size=2, pause=0) == 5
+    assert jobs == [(2,), (2,), (2,)]
+    assert metrics.snapshot()["counters"]["purge.rows"] == 5
+
+def test_migrate_adds_soft_delete_columns(db_session):
+    """Test that a pre-migration database is upgraded in place"""
+    # Roll the schema back to what it was before soft delete
+    with engine.begin() as conn:
+        for index in ("ix_events_deleted_at_start_time", "ix_events_deleted_at_end_time",
+                      "ix_event_comments_deleted_at", "ix_event_comments_event_id"):
+            conn.exec_driver_sql(f"DROP INDEX {index}")
+        conn.exec_driver_sql("ALTER TABLE events DROP COLUMN deleted_at")
+        conn.exec_driver_sql("ALTER TABLE event_comments DROP COLUMN deleted_at")
+        conn.exec_driver_sql("INSERT INTO users (id, email) VALUES (1, 'old@example.com')")
+        conn.exec_driver_sql("INSERT INTO events (title, author_id) VALUES ('Old', 1)")
+
+    assert migrate(engine) == LATEST_VERSION
+
+    with engine.connect() as conn:
+        assert get_version(conn) == LATEST_VERSION
+        columns = {c["name"] for c in inspect(conn).get_columns("event_comments")}
+        assert "deleted_at" in columns
+        indexes = {i["name"] for i in inspect(conn).get_indexes("event_comments")}
+        assert "ix_event_comments_event_id" in indexes
+    assert [e.title for e in event_use_cases.get_events(db_session)] == ["Old"]
@@ -0,0 +1,144 @@
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_connections
+from migrations import LATEST_VERSION, migrate
+from models import archive_metadata
+from use_cases import archive_use_cases, comment_use_cases, event_use_cases, purge_use_cases, sync_use_cases
+from datetime import datetime, timedelta, UTC
+
+# Setup test database with an attached archive; migrate creates the change log triggers
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+TEST_ARCHIVE_PATH = "data/test_archive.db"
+engine = create_engine(TEST_DATABASE_URL)
+configure_connections(engine, archive_path=TEST_ARCHIVE_PATH)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    migrate(engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        archive_metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA main.user_version = 0")
+            conn.exec_driver_sql("PRAGMA archive.user_version = 0")
+        engine.dispose()
+        os.remove(TEST_ARCHIVE_PATH)
+
+def sync(db, since, limit=100):
+    db.rollback()  # A fresh read snapshot, as each request gets
+    return sync_use_cases.get_sync(db, since, limit)
+
+def test_sync_returns_only_what_changed(db_session):
+    first = event_use_cases.create_event(db_session, title="First", author_email="a@example.com")
+    second = event_use_cases.create_event(db_session, title="Second", author_email="a@example.com", food="Cake")
+    comment = comment_use_cases.create_comment(db_session, first.id, "b@example.com", "Hi", rating=4)
+
+    everything = sync(db_session, 0)
+    assert [event.title for event in everything["events"]] == ["First", "Second"]
+    assert everything["events"][1].food == "Cake"
+    assert [c.message for c in everything["comments"]] == ["Hi"]
+    assert everything["deleted"] == {"events": [], "comments": []}
+    assert not everything["more"] and not everything["reset"]
+
+    assert sync(db_session, everything["seq"])["events"] == []
+
+    event_use_cases.update_event(db_session, second.id, "a@example.com", music="Jazz")
+    comment_use_cases.delete_comment(db_session, comment.id, "b@example.com")
+    delta = sync(db_session, everything["seq"])
+    assert [(event.id, event.music) for event in delta["events"]] == [(second.id, "Jazz")]
+    assert delta["comments"] == []
+    assert delta["deleted"] == {"events": [], "comments": [comment.id]}
+    assert delta["seq"] > everything["seq"]
+
+def test_log_keeps_one_row_per_entity(db_session):
+    event = event_use_cases.create_event(db_session, title="Event", author_email="a@example.com")
+    for title in ("One", "Two", "Three"):
+        event_use_cases.update_event(db_session, event.id, "a@example.com", title=title)
+    event_use_cases.delete_event(db_session, event.id, "a@example.com")
+
+    rows = db_session.execute(text("SELECT entity, entity_id, deleted FROM change_log")).all()
+    assert rows == [("event", event.id, 1)]
+    assert sync(db_session, 0)["deleted"]["events"] == [event.id]
+
+def test_sync_pages_through_changes(db_session):
+    ids = [event_use_cases.create_event(db_session, title=f"Event {i}", author_email="a@example.com").id
+           for i in range(5)]
+
+    seen, since, pages = [], 0, 0
+    while True:
+        page = sync(db_session, since, limit=2)
+        seen += [event.id for event in page["events"]]
+        since, pages = page["seq"], pages + 1
+        if not page["more"]:
+            break
+    assert seen == ids and pages == 3
+
+def test_archived_and_batched_writes_are_logged(db_session):
+    ended = event_use_cases.create_event(db_session, title="Ended", author_email="a@example.com")
+    db_session.execute(text("UPDATE events SET end_time = 0 WHERE id = :id"), {"id": ended.id})
+    db_session.commit()
+    since = sync(db_session, 0)["seq"]
+
+    comment_use_cases.create_comments(db_session, [
+        dict(event_id=ended.id, user_id="b@example.com", message="One"),
+        dict(event_id=ended.id, user_id="b@example.com", message="Two"),
+    ])
+    archive_use_cases.archive_events(db_session, datetime.now(UTC).replace(tzinfo=None) - timedelta(days=1))
+
+    delta = sync(db_session, since)
+    assert delta["events"] == [] and delta["comments"] == []
+    # The event's tombstone implies its comments are gone
+    assert delta["deleted"] == {"events": [ended.id], "comments": []}
+
+def test_migration_backfills_existing_rows(db_session):
+    event = event_use_cases.create_event(db_session, title="Old", author_email="a@example.com")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM change_log")
+        conn.exec_driver_sql("PRAGMA main.user_version = 7")
+
+    assert migrate(engine) == LATEST_VERSION
+    assert [e.id for e in sync(db_session, 0)["events"]] == [event.id]
+
+def test_cursor_ahead_of_the_log_asks_for_reset(db_session):
+    event_use_cases.create_event(db_session, title="Event", author_email="a@example.com")
+    assert sync(db_session, 1000)["reset"]
+
+def test_purging_a_deleted_event_logs_no_comment_tombstones(db_session):
+    event_id = event_use_cases.create_event(db_session, title="Event", author_email="a@example.com").id
+    comment_use_cases.create_comments(db_session, [
+        dict(event_id=event_id, user_id="b@example.com", message=f"Comment {i}") for i in range(3)
+    ])
+    since = sync(db_session, 0)["seq"]
+    event_use_cases.delete_event(db_session, event_id, "a@example.com")
+    while purge_use_cases.purge_deleted(db_session, batch_size=2):
+        pass
+
+    rows = db_session.execute(text("SELECT entity, entity_id, deleted FROM change_log")).all()
+    assert rows == [("event", event_id, 1)]
+    assert sync(db_session, since)["deleted"] == {"events": [event_id], "comments": []}
+
+def test_compaction_resets_clients_behind_the_horizon(db_session):
+    kept = event_use_cases.create_event(db_session, title="Kept", author_email="a@example.com")
+    gone = event_use_cases.create_event(db_session, title="Gone", author_email="a@example.com")
+    stale = sync(db_session, 0)["seq"]
+    event_use_cases.delete_event(db_session, gone.id, "a@example.com")
+    current = sync(db_session, stale)["seq"]
+
+    # Nothing is old enough yet
+    assert purge_use_cases.compact_change_log(db_session, datetime.now(UTC) - timedelta(days=1)) == 0
+    assert not sync(db_session, stale)["reset"]
+
+    assert purge_use_cases.compact_change_log(db_session, datetime.now(UTC) + timedelta(seconds=1)) == 1
+    rows = db_session.execute(text("SELECT entity, entity_id, deleted FROM change_log")).all()
+    assert rows == [("event", kept.id, 0)]
+    behind = sync(db_session, stale)
+    assert behind["reset"] and behind["seq"] == 0 and behind["events"] == []
+    assert not sync(db_session, current)["reset"]
+    assert [event.id for event in sync(db_session, 0)["events"]] == [kept.id]
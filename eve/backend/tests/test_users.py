@@ -0,0 +1,134 @@
+import os
+import pytest
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine, event as sqlalchemy_event, text
+from sqlalchemy.orm import sessionmaker
+from database import Base, configure_connections
+from migrations import LATEST_VERSION, migrate
+from models import Event, EventComment, User, archive_metadata
+from use_cases import auth_use_cases, comment_use_cases, event_use_cases, user_use_cases
+
+# Setup test database with an attached archive
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+TEST_ARCHIVE_PATH = "data/test_archive.db"
+engine = create_engine(TEST_DATABASE_URL)
+configure_connections(engine, archive_path=TEST_ARCHIVE_PATH)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    migrate(engine)
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        archive_metadata.drop_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA main.user_version = 0")
+            conn.exec_driver_sql("PRAGMA archive.user_version = 0")
+        engine.dispose()
+        os.remove(TEST_ARCHIVE_PATH)
+
+def test_emails_are_interned_once(db_session):
+    """Test that sessions, events and comments share one users row per email"""
+    auth_use_cases.create_session(db_session, "a@example.com")
+    event = event_use_cases.create_event(db_session, title="Event", author_email="a@example.com")
+    comment_use_cases.create_comment(db_session, event_id=event.id, user_id="a@example.com", message="Hi")
+
+    assert db_session.query(User.email).all() == [("a@example.com",)]
+    assert db_session.execute(text("SELECT typeof(author_id) FROM events")).scalar() == "integer"
+
+def test_api_attributes_still_expose_emails(db_session):
+    session_id = auth_use_cases.create_session(db_session, "a@example.com")
+    event = event_use_cases.create_event(db_session, title="Event", author_email="a@example.com")
+    comment = comment_use_cases.create_comment(db_session, event_id=event.id, user_id="b@example.com", message="Hi")
+    db_session.expunge_all()
+
+    assert auth_use_cases.validate_session(db_session, session_id) == (True, "a@example.com")
+    assert event_use_cases.get_event(db_session, event.id).author_email == "a@example.com"
+    stored = comment_use_cases.get_comment(db_session, comment.id)
+    assert (stored.user_id, stored.author_email) == ("b@example.com", "b@example.com")
+
+def test_interned_ids_are_looked_up_in_chunks(db_session, monkeypatch):
+    monkeypatch.setattr(event_use_cases, "MAX_IDS_PER_QUERY", 2)
+    emails = [f"user{i}@example.com" for i in range(5)]
+    lookups = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            lookups.append(len(parameters))
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        user_ids = user_use_cases.intern_users(db_session, emails + emails[:2])
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert sorted(user_ids) == emails and len(set(user_ids.values())) == 5
+    assert lookups == [2, 2, 1]
+
+def test_author_filters_compare_integer_ids(db_session):
+    user_use_cases.intern_users(db_session, ["a@example.com", "b@example.com"])
+    mine = event_use_cases.create_event(db_session, title="Mine", author_email="a@example.com")
+    event_use_cases.create_event(db_session, title="Theirs", author_email="b@example.com")
+
+    query = event_use_cases.live_events(db_session).filter(Event.author_id == user_use_cases.user_id_of("a@example.com"))
+    plan = " ".join(
+        row[3] for row in db_session.execute(
+            text(f"EXPLAIN QUERY PLAN {query.statement.compile(engine, compile_kwargs={'literal_binds': True})}")
+        )
+    )
+
+    assert [e.id for e in event_use_cases.get_user_events(db_session, "a@example.com")] == [mine.id]
+    assert event_use_cases.get_user_events(db_session, "nobody@example.com") == []
+    assert "ix_events_author_id" in plan
+
+def test_migrate_interns_stored_emails(db_session):
+    """Test that email strings in main and archive rows become users ids"""
+    Base.metadata.drop_all(bind=engine)
+    archive_metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        for schema in ("main", "archive"):
+            conn.exec_driver_sql(
+                f"CREATE TABLE {schema}.events (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+                "title VARCHAR NOT NULL, description VARCHAR, place VARCHAR, start_time INTEGER, "
+                "end_time INTEGER, food VARCHAR, drinks VARCHAR, program VARCHAR, parking_info VARCHAR, "
+                "music VARCHAR, theme VARCHAR, age_restrictions VARCHAR, author_email VARCHAR NOT NULL, "
+                "deleted_at DATETIME)"
+            )
+            conn.exec_driver_sql(
+                f"CREATE TABLE {schema}.event_comments (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+                "event_id INTEGER NOT NULL REFERENCES events (id) ON DELETE CASCADE, user_id VARCHAR NOT NULL, "
+                "message VARCHAR NOT NULL, rating INTEGER, author_email VARCHAR NOT NULL, deleted_at DATETIME)"
+            )
+            conn.exec_driver_sql(f"PRAGMA {schema}.user_version = 3")
+        conn.exec_driver_sql(
+            "CREATE TABLE sessions (id VARCHAR NOT NULL PRIMARY KEY, user_email VARCHAR NOT NULL, "
+            "created_at DATETIME NOT NULL, expires_at DATETIME NOT NULL)"
+        )
+        expires_at = (datetime.now(UTC) + timedelta(hours=1)).replace(tzinfo=None)
+        conn.exec_driver_sql(
+            "INSERT INTO sessions VALUES ('s1', 'a@example.com', ?, ?)", (expires_at, expires_at)
+        )
+        conn.exec_driver_sql("INSERT INTO events (id, title, author_email) VALUES (1, 'Hot', 'a@example.com')")
+        conn.exec_driver_sql(
+            "INSERT INTO event_comments (event_id, user_id, message, author_email) "
+            "VALUES (1, 'b@example.com', 'Hi', 'b@example.com')"
+        )
+        conn.exec_driver_sql("INSERT INTO archive.events (id, title, author_email) VALUES (2, 'Cold', 'c@example.com')")
+
+    assert migrate(engine) == LATEST_VERSION
+
+    emails = dict(db_session.execute(text("SELECT email, id FROM users")).all())
+    assert set(emails) == {"a@example.com", "b@example.com", "c@example.com"}
+    assert db_session.execute(text("SELECT id, email FROM archive.users")).all() == [
+        (emails["c@example.com"], "c@example.com")
+    ]
+    assert auth_use_cases.validate_session(db_session, "s1") == (True, "a@example.com")
+    events = event_use_cases.get_events(db_session, include_archived=True)
+    assert [(e.title, e.author_email) for e in events] == [("Hot", "a@example.com"), ("Cold", "c@example.com")]
+    assert comment_use_cases.get_event_comments(db_session, 1)[0].author_email == "b@example.com"
+    columns = {row[1] for row in db_session.execute(text("PRAGMA table_info(event_comments)"))}
+    assert "user_id" not in columns and "author_email" not in columns
@@ -0,0 +1,110 @@
+import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from database import Base, WriteQueue, WriteQueueFull, configure_connections
+from models import Event
+from use_cases import event_use_cases
+import metrics
+
+# Setup test database
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL, pool_size=1, max_overflow=0)
+configure_connections(engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+read_engine = create_engine(TEST_DATABASE_URL)
+configure_connections(read_engine, read_only=True)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+@pytest.fixture
+def write_queue():
+    Base.metadata.create_all(bind=engine)
+    metrics.reset()
+    queue = WriteQueue(WriteSessionLocal, name="test.write_queue")
+    try:
+        yield queue
+    finally:
+        queue.stop()
+        read_engine.dispose()
+        engine.dispose()
+        Base.metadata.drop_all(bind=engine)
+
+def test_concurrent_writes_are_serialized(write_queue):
+    """Test that concurrent submitters all succeed on the single writer thread"""
+    writer_threads = set()
+
+    def create(db, index):
+        writer_threads.add(threading.current_thread().name)
+        return event_use_cases.create_event(db, title=f"Event {index}", author_email="test@example.com")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        events = list(pool.map(lambda i: write_queue.submit(create, i), range(40)))
+
+    assert len({event.id for event in events}) == 40
+    assert writer_threads == {"test.write_queue"}
+    # Returned objects are detached but keep their loaded state
+    assert sorted(event.title for event in events) == sorted(f"Event {i}" for i in range(40))
+
+def test_job_errors_are_raised_to_submitter(write_queue):
+    """Test that a failing job raises in the caller and does not stop the writer"""
+    with pytest.raises(ValueError, match="title cannot be empty"):
+        write_queue.submit(event_use_cases.create_event, title="", author_email="test@example.com")
+
+    event = write_queue.submit(event_use_cases.create_event, title="After Error", author_email="test@example.com")
+    assert event.id is not None
+
+def test_nested_submit_is_rejected(write_queue):
+    """Test that a job cannot deadlock by submitting to its own queue"""
+    with pytest.raises(RuntimeError):
+        write_queue.submit(lambda db: write_queue.submit(lambda inner: None))
+
+def test_queue_metrics_exported(write_queue):
+    """Test that queue depth and wait time are recorded"""
+    for i in range(3):
+        write_queue.submit(event_use_cases.create_event, title=f"Event {i}", author_email="test@example.com")
+
+    snapshot = metrics.snapshot()
+    assert "test.write_queue.depth" in snapshot["gauges"]
+    assert snapshot["timings"]["test.write_queue.wait_seconds"]["count"] == 3
+    assert snapshot["timings"]["test.write_queue.run_seconds"]["count"] == 3
+
+def test_read_connections_are_read_only(write_queue):
+    """Test that read sessions see committed writes but cannot write"""
+    write_queue.submit(event_use_cases.create_event, title="Visible", author_email="test@example.com")
+
+    db = ReadSessionLocal()
+    try:
+        assert [e.title for e in event_use_cases.get_events(db)] == ["Visible"]
+        with pytest.raises(OperationalError):
+            db.execute(text("DELETE FROM events"))
+    finally:
+        db.close()
+
+def test_full_queue_rejects_writes(write_queue):
+    """Test that a bounded queue rejects jobs instead of blocking forever"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def block(db):
+        started.set()
+        release.wait(5)
+
+    bounded = WriteQueue(WriteSessionLocal, maxsize=1, put_timeout=0.05, name="test.bounded_queue")
+    try:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            running = pool.submit(bounded.submit, block)
+            started.wait(5)
+            queued = pool.submit(bounded.submit, lambda db: "queued")
+            while bounded.depth() == 0:
+                pass
+            with pytest.raises(WriteQueueFull):
+                bounded.submit(lambda db: None)
+            release.set()
+            assert queued.result() == "queued"
+            running.result()
+        assert metrics.snapshot()["counters"]["test.bounded_queue.rejected"] == 1
+    finally:
+        release.set()
+        bounded.stop()
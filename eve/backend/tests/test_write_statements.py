@@ -0,0 +1,133 @@
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import create_engine, event as sqlalchemy_event
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from use_cases import comment_use_cases, event_use_cases, user_use_cases
+
+# Setup test database with the writer's session settings
+TEST_DATABASE_URL = "sqlite:///data/test.db"
+engine = create_engine(TEST_DATABASE_URL)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+@pytest.fixture
+def db_session():
+    Base.metadata.create_all(bind=engine)
+    session = WriteSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@contextmanager
+def count_statements():
+    """Collect the SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy_event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        sqlalchemy_event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture
+def test_event(db_session):
+    return event_use_cases.create_event(
+        db_session,
+        title="Test Event",
+        start_time=(datetime.now(UTC) + timedelta(days=1)).replace(tzinfo=None),
+        end_time=(datetime.now(UTC) + timedelta(days=1, hours=2)).replace(tzinfo=None),
+        author_email="event@example.com"
+    )
+
+@pytest.fixture
+def test_comment(db_session, test_event):
+    return comment_use_cases.create_comment(
+        db_session,
+        event_id=test_event.id,
+        user_id="user@example.com",
+        message="Comment",
+        rating=4,
+        author_email="user@example.com"
+    )
+
+def test_create_event_is_one_statement(db_session):
+    # Users are interned at login; the INSERT resolves the id by subquery
+    user_use_cases.intern_user(db_session, "test@example.com")
+    with count_statements() as statements:
+        event = event_use_cases.create_event(db_session, title="Event", author_email="test@example.com")
+    assert len(statements) == 1
+    assert "RETURNING" in statements[0]
+    assert event.id is not None and event.title == "Event"
+
+def test_first_write_by_unknown_email_interns_user(db_session):
+    with count_statements() as statements:
+        event = event_use_cases.create_event(db_session, title="Event", author_email="new@example.com")
+    assert len(statements) == 3
+    assert "users" in statements[1]
+    assert event.author_email == "new@example.com"
+
+def test_update_event_statements(db_session, test_event):
+    # The returned event carries its details, read by primary key
+    with count_statements() as statements:
+        event = event_use_cases.update_event(
+            db_session, test_event.id, "event@example.com",
+            title="Renamed",
+            start_time=test_event.start_time,
+            end_time=test_event.end_time
+        )
+    assert len(statements) == 2
+    assert statements[0].startswith("UPDATE")
+    assert event.title == "Renamed" and event.food is None
+
+    # Changed details are upserted instead
+    with count_statements() as statements:
+        event = event_use_cases.update_event(db_session, test_event.id, "event@example.com", title="Again", food="Cake")
+    assert len(statements) == 2
+    assert "ON CONFLICT" in statements[1]
+    assert event.title == "Again" and event.food == "Cake"
+
+def test_rejected_update_checks_existence_only(db_session, test_event):
+    with count_statements() as statements:
+        with pytest.raises(ValueError, match="not authorized"):
+            event_use_cases.update_event(db_session, test_event.id, "other@example.com", title="Renamed")
+    assert len(statements) == 2
+    assert "EXISTS" in statements[1]
+
+def test_create_comment_is_two_statements(db_session, test_event):
+    user_use_cases.intern_user(db_session, "user@example.com")
+    with count_statements() as statements:
+        comment = comment_use_cases.create_comment(
+            db_session,
+            event_id=test_event.id,
+            user_id="user@example.com",
+            message="Hello",
+            rating=5
+        )
+    assert len(statements) == 2
+    assert "EXISTS" in statements[0]
+    assert "RETURNING" in statements[1]
+    assert comment.id is not None and comment.author_email == "user@example.com"
+
+def test_update_and_delete_comment_are_one_statement(db_session, test_comment):
+    with count_statements() as statements:
+        comment = comment_use_cases.update_comment(
+            db_session, test_comment.id, "user@example.com", message="Edited", rating=3
+        )
+    assert len(statements) == 1
+    assert comment.message == "Edited" and comment.rating == 3
+
+    with count_statements() as statements:
+        comment_use_cases.delete_comment(db_session, test_comment.id, "user@example.com")
+    assert len(statements) == 1
+
+def test_delete_event_statements(db_session, test_event, test_comment):
+    with count_statements() as statements:
+        event_use_cases.delete_event(db_session, test_event.id, "event@example.com")
+    assert len(statements) == 1
+    assert comment_use_cases.get_comment(db_session, test_comment.id) is None
@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import delete, insert, select, text, union
+from sqlalchemy.orm import Session
+from models import (Event, EventComment, EventDetails, User, archived_events, archived_event_comments,
+                    archived_event_details, archived_users)
+
+def archive_attached(db: Session) -> bool:
+    return any(row[1] == "archive" for row in db.execute(text("PRAGMA database_list")))
+
+def _copy(db: Session, source, target, *criteria, conflict: str = "REPLACE") -> int:
+    """Copy matching rows, ids included; a rerun overwrites instead of failing"""
+    columns = [column.name for column in source.columns]
+    statement = insert(target).prefix_with(f"OR {conflict}").from_select(columns, select(source).where(*criteria))
+    return db.execute(statement).rowcount
+
+def archive_events(db: Session, ended_before: datetime, batch_size: int = 200) -> Dict[str, int]:
+    """Move up to ``batch_size`` events that ended before ``ended_before`` to the archive.
+
+    Their details and comments go with them. Copy and delete share one transaction, but
+    in WAL mode SQLite only commits each database file atomically, so a crash
+    can leave a row in both; the next run copies it again and removes it.
+    Deleted events and comments are not archived; the purger removes them.
+    """
+    event_ids = db.scalars(
+        select(Event.id)
+        .where(Event.end_time < ended_before, Event.deleted_at.is_(None))
+        .order_by(Event.end_time)
+        .limit(batch_size)
+    ).all()
+    if not event_ids:
+        return {"events": 0, "comments": 0}
+
+    # Archived rows refer to users by the ids of the main users table
+    authors = union(
+        select(Event.author_id).where(Event.id.in_(event_ids)),
+        select(EventComment.author_id).where(EventComment.event_id.in_(event_ids))
+    )
+    _copy(db, User.__table__, archived_users, User.id.in_(authors), conflict="IGNORE")
+    events = _copy(db, Event.__table__, archived_events, Event.id.in_(event_ids))
+    _copy(db, EventDetails.__table__, archived_event_details, EventDetails.event_id.in_(event_ids))
+    comments = _copy(
+        db, EventComment.__table__, archived_event_comments,
+        EventComment.event_id.in_(event_ids), EventComment.deleted_at.is_(None)
+    )
+    # Events first: their change log tombstones imply the comments, which
+    # the cascade then removes without logging a tombstone each
+    db.execute(
+        delete(Event).where(Event.id.in_(event_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.execute(
+        delete(EventComment).where(EventComment.event_id.in_(event_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.execute(
+        delete(EventDetails).where(EventDetails.event_id.in_(event_ids)),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return {"events": events, "comments": comments}
@@ -1,39 +1,156 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
 from datetime import datetime, timedelta, UTC
+import hashlib
+import hmac
+import os
+import secrets
+import struct
 import uuid
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
-from models import Session as DbSession
+from last_seen import LastSeenBuffer, last_seen
+from models import MAX_TOKEN_LENGTH, RevokedToken, Session as DbSession, session_key
+from revocation import RevocationSet, revoked_tokens
+from use_cases.user_use_cases import intern_user
 
-def create_session(db: Session, email: str) -> str:
-    session_id = str(uuid.uuid4())
+# Database sessions expire this long after their last request; signed
+# tokens cannot be extended and expire this long after login
+SESSION_LIFETIME = timedelta(hours=8)
+# "database" keeps sessions in the sessions table, "signed" issues HMAC
+# tokens that are verified without touching the database
+SESSION_MODE = os.environ.get("EVE_SESSION_MODE", "database")
+# Required in signed mode, and shared by every process serving the API
+TOKEN_SECRET = os.environ.get("EVE_TOKEN_SECRET", "").encode()
+MIN_TOKEN_SECRET_BYTES = 32
+# For tests only: sign with a random per-process key when no secret is set;
+# tokens then fail on other processes and do not survive a restart
+RANDOM_TOKEN_SECRET = os.environ.get("EVE_INSECURE_RANDOM_TOKEN_SECRET", "0") == "1"
+_random_token_secret = secrets.token_bytes(MIN_TOKEN_SECRET_BYTES)
+TOKEN_PREFIX = "v1."
+SIGNATURE_BYTES = 16
+
+def _b64encode(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(data: str) -> bytes:
+    return urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def check_token_secret() -> None:
+    """Refuse to sign tokens with a missing or short ``EVE_TOKEN_SECRET``"""
+    if RANDOM_TOKEN_SECRET and not TOKEN_SECRET:
+        return
+    if len(TOKEN_SECRET) < MIN_TOKEN_SECRET_BYTES:
+        raise RuntimeError(f"EVE_SESSION_MODE=signed needs EVE_TOKEN_SECRET of at least "
+                           f"{MIN_TOKEN_SECRET_BYTES} bytes, shared by every worker process")
+
+def token_secret() -> bytes:
+    """The key tokens are signed with, resolved at call time"""
+    check_token_secret()
+    return TOKEN_SECRET or _random_token_secret
+
+def _sign(payload: bytes, secret: bytes) -> bytes:
+    return hmac.new(secret, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def create_token(email: str, expires_at: datetime, secret: bytes = None) -> str:
+    """Sign ``email`` and the expiry (naive UTC) into a self-contained session token"""
+    secret = secret or token_secret()
+    expires = int(expires_at.replace(tzinfo=UTC).timestamp())
+    payload = struct.pack(">q", expires) + email.encode()
+    return f"{TOKEN_PREFIX}{_b64encode(payload)}.{_b64encode(_sign(payload, secret))}"
+
+def verify_token(token: str, secret: bytes = None) -> tuple[bytes, str, datetime] | None:
+    """Return (signature, email, expiry) of an authentic token, None otherwise.
+
+    Expiry is not checked here; callers compare it with the current time.
+    """
+    if len(token) > MAX_TOKEN_LENGTH or not token.startswith(TOKEN_PREFIX):
+        return None
+    if secret is None:
+        if not (TOKEN_SECRET or RANDOM_TOKEN_SECRET):
+            return None  # Nothing was signed without a secret
+        secret = token_secret()
+    try:
+        payload, signature = (_b64decode(part) for part in token[len(TOKEN_PREFIX):].split("."))
+    except (ValueError, Base64Error):
+        return None
+    if len(payload) <= 8 or not hmac.compare_digest(signature, _sign(payload, secret)):
+        return None
+    expires = struct.unpack(">q", payload[:8])[0]
+    expires_at = datetime.fromtimestamp(expires, UTC).replace(tzinfo=None)
+    return signature, payload[8:].decode(), expires_at
+
+def create_session(db: Session, email: str, signed: bool = SESSION_MODE == "signed") -> str:
     # Store naive UTC datetime in database
-    expires_at = (datetime.now(UTC) + timedelta(hours=8)).replace(tzinfo=None)
-    
+    now = datetime.now(UTC).replace(tzinfo=None)
+    expires_at = now + SESSION_LIFETIME
+    user_id = intern_user(db, email)
+    if signed:
+        db.commit()
+        return create_token(email, expires_at)
+
+    session_id = str(uuid.uuid4())
+    # Expired sessions are purged here since validation runs on read-only connections
+    db.query(DbSession).filter(DbSession.expires_at < now).delete(synchronize_session=False)
+
     db_session = DbSession(
-        id=session_id,
-        user_email=email,
-        created_at=datetime.now(UTC).replace(tzinfo=None),
+        id=session_key(session_id),
+        user_id=user_id,
+        created_at=now,
         expires_at=expires_at
     )
-    
+
     db.add(db_session)
     db.commit()
     return session_id
 
-def validate_session(db: Session, session_id: str) -> tuple[bool, str | None]:
-    session = db.query(DbSession).filter(DbSession.id == session_id).first()
+def _validate_token(token: str, revoked: RevocationSet) -> tuple[bool, str | None]:
+    claims = verify_token(token)
+    if claims is None:
+        return False, None
+    signature, email, expires_at = claims
+    if expires_at < datetime.now(UTC).replace(tzinfo=None) or signature in revoked:
+        return False, None
+    return True, email
+
+def validate_session(db: Session, session_id: str, revoked: RevocationSet = revoked_tokens,
+                     seen: LastSeenBuffer = last_seen) -> tuple[bool, str | None]:
+    # Signed tokens are checked in memory; ``db`` is not used for them
+    if session_id and session_id.startswith(TOKEN_PREFIX):
+        return _validate_token(session_id, revoked)
+    key = session_key(session_id)
+    if key is None:
+        return False, None
+    session = db.query(DbSession).filter(DbSession.id == key).first()
     if not session:
         return False, None
-    
-    # Compare naive UTC datetimes
-    if session.expires_at < datetime.now(UTC).replace(tzinfo=None):
-        db.delete(session)
-        db.commit()
+
+    # Compare naive UTC datetimes; activity not flushed yet counts too
+    now = datetime.now(UTC).replace(tzinfo=None)
+    if max(session.expires_at, seen.get(key) or session.expires_at) < now:
         return False, None
-    
+
+    # Sliding expiry, written back in batches by the last-seen flusher
+    seen.touch(key, now + SESSION_LIFETIME)
     return True, session.user_email
 
-def logout(db: Session, session_id: str):
-    session = db.query(DbSession).filter(DbSession.id == session_id).first()
-    if session:
-        db.delete(session)
-        db.commit()
\ No newline at end of file
+def logout(db: Session, session_id: str, revoked: RevocationSet = revoked_tokens):
+    if session_id and session_id.startswith(TOKEN_PREFIX):
+        claims = verify_token(session_id)
+        if claims is None:
+            return
+        signature, _, expires_at = claims
+        now = datetime.now(UTC).replace(tzinfo=None)
+        # Persisted so restarted and other processes reject the token too
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at < now))
+        db.execute(
+            insert(RevokedToken).values(id=signature, expires_at=expires_at).on_conflict_do_nothing()
+        )
+        db.commit()
+        revoked.add(signature, expires_at)
+        return
+    key = session_key(session_id)
+    if key is not None:
+        db.execute(delete(DbSession).where(DbSession.id == key))
+        db.commit()
@@ -1,8 +1,14 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Union
 from datetime import datetime, UTC
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import EventComment, Event
+import base64
+import json
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, exists, func, insert, select, tuple_, union, update
+from models import EventComment, Event, archived_event_comments
+from use_cases.event_use_cases import chunked
+from use_cases.user_use_cases import insert_returning, intern_users, user_id_of
 import re
 
 def validate_comment(
@@ -14,14 +20,20 @@ def validate_comment(
     check_existing: bool = True
 ) -> None:
     """Validate comment data"""
-    # Check event exists
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
+    # Check event exists without loading it
+    if not db.scalar(select(exists().where(Event.id == event_id, Event.deleted_at.is_(None)))):
         raise ValueError("event not found")
 
     # Multiple comments per user are allowed
 
-    # Validate message
+    validate_comment_content(message, rating)
+
+def validate_comment_content(message: str, rating: int) -> None:
+    """Validate comment message and rating (no database access)"""
+    validate_message(message)
+    validate_rating(rating)
+
+def validate_message(message: str) -> None:
     if not message or not message.strip():
         raise ValueError("message cannot be empty")
     if len(message) > 1000:  # Arbitrary limit
@@ -31,7 +43,7 @@ def validate_comment(
     if re.search(r"<[^>]*script|javascript:|onerror=|onclick=", message, re.I):
         raise ValueError("message contains invalid characters")
 
-    # Validate rating
+def validate_rating(rating: int) -> None:
     if not isinstance(rating, int) or rating < 0 or rating > 5:
         raise ValueError("rating must be an integer between 0 and 5")
 
@@ -45,30 +57,189 @@ def create_comment(
 ) -> EventComment:
     # Validate comment data
     validate_comment(db, event_id, user_id, message, rating)
-    
-    # Create comment
-    comment = EventComment(
-        event_id=event_id,
-        user_id=user_id,
-        message=message.strip(),  # Normalize whitespace
-        rating=rating,
-        author_email=author_email or user_id
-    )
+    author_email = author_email or user_id
     
     try:
-        db.add(comment)
+        # INSERT ... RETURNING hands back the stored row without a refresh
+        comment = insert_returning(
+            db, EventComment,
+            dict(
+                event_id=event_id,
+                message=message.strip(),  # Normalize whitespace
+                rating=rating
+            ),
+            author_email
+        )
+        set_committed_value(comment, "author_email", author_email)
         db.commit()
-        db.refresh(comment)
         return comment
-    except Exception as e:
+    except SQLAlchemyError as e:
         db.rollback()
         raise ValueError(f"Failed to create comment: {str(e)}")
 
-def get_event_comments(db: Session, event_id: int) -> List[EventComment]:
-    return db.query(EventComment).filter(EventComment.event_id == event_id).all()
+def create_comments(db: Session, comments: List[Dict]) -> List[Union[EventComment, ValueError]]:
+    """Create several comments in a single transaction (group commit).
+
+    Each item holds the keyword arguments of ``create_comment``. Returns one
+    entry per item: the created comment, or the ValueError it failed with.
+    If the shared commit fails, every valid item is retried on its own so a
+    single bad row cannot fail the rest of the batch.
+    """
+    event_ids = {data["event_id"] for data in comments}
+    existing = set(db.scalars(
+        select(Event.id).where(Event.id.in_(event_ids), Event.deleted_at.is_(None))
+    ))
+
+    results = []
+    rows = []
+    emails = []
+    for data in comments:
+        try:
+            if data["event_id"] not in existing:
+                raise ValueError("event not found")
+            validate_comment_content(data["message"], data.get("rating", 0))
+        except ValueError as e:
+            results.append(e)
+            continue
+        results.append(None)
+        rows.append(dict(
+            event_id=data["event_id"],
+            message=data["message"].strip(),
+            rating=data.get("rating", 0)
+        ))
+        emails.append(data.get("author_email") or data["user_id"])
+
+    if not rows:
+        return results
+    try:
+        user_ids = intern_users(db, emails)
+        for row, email in zip(rows, emails):
+            row["author_id"] = user_ids[email]
+        # One multi-row INSERT ... RETURNING, in the order the rows were given
+        created = db.scalars(
+            insert(EventComment).returning(EventComment, sort_by_parameter_order=True),
+            rows
+        ).all()
+        for comment, email in zip(created, emails):
+            set_committed_value(comment, "author_email", email)
+        created = iter(created)
+        db.commit()
+        return [result if result is not None else next(created) for result in results]
+    except SQLAlchemyError:
+        db.rollback()
+
+    fallback = []
+    for data, result in zip(comments, results):
+        if isinstance(result, ValueError):
+            fallback.append(result)
+            continue
+        try:
+            fallback.append(create_comment(db, **data))
+        except ValueError as e:
+            fallback.append(e)
+    return fallback
+
+def comment_is_live():
+    """Filter for comments that are not deleted and whose event is not deleted"""
+    return and_(
+        EventComment.deleted_at.is_(None),
+        exists().where(Event.id == EventComment.event_id, Event.deleted_at.is_(None))
+    )
+
+def _event_comments_query(db: Session, event_id: int, include_archived: bool = False):
+    """The entity and query for the live comments of one event, plus archived ones if asked"""
+    if not include_archived:
+        query = db.query(EventComment).filter(EventComment.event_id == event_id, comment_is_live())
+        return EventComment, query.options(undefer(EventComment.author_email))
+    source = aliased(EventComment, comments_of_events([event_id], include_archived))
+    return source, db.query(source).options(undefer(source.author_email))
+
+def get_event_comments(db: Session, event_id: int, include_archived: bool = False) -> List[EventComment]:
+    """Get every comment of an event, oldest first"""
+    source, query = _event_comments_query(db, event_id, include_archived)
+    return query.order_by(source.id).all()
+
+# Page orders: (key columns, descending). Ids grow with time, so they order by
+# age and break rating ties; each order walks an index on event_id in order.
+COMMENT_SORTS = {
+    "newest": (("id",), True),
+    "oldest": (("id",), False),
+    "rating": (("rating", "id"), True),
+}
+
+def encode_cursor(sort: str, values: list) -> str:
+    """Opaque cursor holding the sort key of the last comment on a page"""
+    return base64.urlsafe_b64encode(json.dumps([sort, *values]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("invalid cursor")
+    names, _ = COMMENT_SORTS[sort]
+    if (not isinstance(decoded, list) or decoded[:1] != [sort] or len(decoded) != len(names) + 1
+            or not all(isinstance(value, int) for value in decoded[1:])):
+        raise ValueError("invalid cursor for this sort order")
+    return decoded[1:]
+
+def get_event_comments_page(
+    db: Session,
+    event_id: int,
+    sort: str = "newest",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_archived: bool = False
+) -> Tuple[List[EventComment], Optional[str]]:
+    """Get one page of an event's comments by keyset pagination.
+
+    Rather than an OFFSET the page starts after the sort key held in
+    ``cursor``, so every page is an index range scan of ``limit`` rows.
+    Returns the comments and the cursor of the next page, None on the last.
+    """
+    if sort not in COMMENT_SORTS:
+        raise ValueError(f"invalid sort order: {sort}")
+    names, descending = COMMENT_SORTS[sort]
+    source, query = _event_comments_query(db, event_id, include_archived)
+    keys = [getattr(source, name) for name in names]
+    if cursor is not None:
+        after = tuple_(*decode_cursor(cursor, sort))
+        query = query.filter(tuple_(*keys) < after if descending else tuple_(*keys) > after)
+    comments = query.order_by(*[key.desc() if descending else key for key in keys]).limit(limit + 1).all()
+    if len(comments) <= limit:
+        return comments, None
+    comments = comments[:limit]
+    return comments, encode_cursor(sort, [getattr(comments[-1], name) for name in names])
+
+def count_event_comments(db: Session, event_id: int, include_archived: bool = False) -> int:
+    """Count an event's comments (an index range count, done once per listing)"""
+    source, query = _event_comments_query(db, event_id, include_archived)
+    return query.with_entities(func.count(source.id)).scalar()
 
 def get_comment(db: Session, comment_id: int) -> Optional[EventComment]:
-    return db.query(EventComment).filter(EventComment.id == comment_id).first()
+    return (
+        db.query(EventComment)
+        .options(undefer(EventComment.author_email))
+        .filter(EventComment.id == comment_id, comment_is_live())
+        .first()
+    )
+
+def get_comments_by_ids(db: Session, comment_ids: List[int]) -> List[EventComment]:
+    """Get the live comments among ``comment_ids``, in id order"""
+    comments = []
+    for chunk in chunked(list(dict.fromkeys(comment_ids))):
+        comments += (
+            db.query(EventComment)
+            .options(undefer(EventComment.author_email))
+            .filter(EventComment.id.in_(chunk), comment_is_live())
+            .all()
+        )
+    return sorted(comments, key=lambda comment: comment.id)
+
+def _raise_missing_comment(db: Session, comment_id: int, action: str) -> None:
+    """Explain why a write matching ``id AND author`` touched no row"""
+    if not db.scalar(select(exists().where(EventComment.id == comment_id, comment_is_live()))):
+        raise ValueError("comment not found")
+    raise ValueError(f"not authorized to {action} this comment")
 
 def update_comment(
     db: Session,
@@ -77,70 +248,122 @@ def update_comment(
     message: Optional[str] = None,
     rating: Optional[int] = None
 ) -> Optional[EventComment]:
-    comment = get_comment(db, comment_id)
-    if not comment:
-        raise ValueError("comment not found")
-    if comment.author_email != author_email:
-        raise ValueError("not authorized to update this comment")
-    
+    owned = (EventComment.id == comment_id, EventComment.author_id == user_id_of(author_email), comment_is_live())
+    values = {}
     try:
         if message is not None:
-            # Validate new message
-            validate_comment(
-                db, 
-                comment.event_id, 
-                comment.user_id, 
-                message, 
-                comment.rating,
-                check_existing=False
-            )
-            comment.message = message.strip()
-        
+            validate_message(message)
+            values["message"] = message.strip()
         if rating is not None:
-            # Validate new rating
-            validate_comment(
-                db,
-                comment.event_id,
-                comment.user_id,
-                comment.message,
-                rating,
-                check_existing=False
-            )
-            comment.rating = rating
-        
+            validate_rating(rating)
+            values["rating"] = rating
+    except ValueError as e:
+        raise ValueError(f"Failed to update comment: {str(e)}")
+
+    try:
+        # Authorization is part of the WHERE clause: one UPDATE ... RETURNING
+        if values:
+            statement = update(EventComment).where(*owned).values(**values).returning(EventComment)
+            comment = db.scalars(statement, execution_options={"synchronize_session": "fetch"}).one_or_none()
+        else:
+            comment = db.scalars(select(EventComment).where(*owned)).one_or_none()
+        if comment is None:
+            db.rollback()
+            _raise_missing_comment(db, comment_id, "update")
+        # The WHERE clause matched the author, so the email is known
+        set_committed_value(comment, "author_email", author_email)
         db.commit()
-        db.refresh(comment)
         return comment
-    except Exception as e:
+    except SQLAlchemyError as e:
         db.rollback()
         raise ValueError(f"Failed to update comment: {str(e)}")
 
-def get_event_rating_stats(db: Session, event_id: int) -> Dict:
-    """Get rating statistics for an event"""
-    # Get all ratings
-    ratings = (
-        db.query(EventComment.rating)
-        .filter(EventComment.event_id == event_id)
-        .all()
-    )
-    
-    if not ratings:
-        return {
-            "average_rating": 0,
-            "total_ratings": 0,
-            "rating_distribution": {i: 0 for i in range(1, 6)}
-        }
-    
-    # Calculate statistics
-    ratings = [r[0] for r in ratings]
-    distribution = {i: ratings.count(i) for i in range(1, 6)}
-    
+def comments_of_events(event_ids: List[int], include_archived: bool = False):
+    """Subquery of the live comment rows of ``event_ids``, plus archived ones if asked"""
+    rows = select(EventComment.__table__).where(EventComment.event_id.in_(event_ids), comment_is_live())
+    if include_archived:
+        # Archived comments are only ever copied from live ones
+        rows = union(rows, select(archived_event_comments).where(archived_event_comments.c.event_id.in_(event_ids)))
+    return rows.subquery("event_comments_in")
+
+def get_comments_for_events(
+    db: Session,
+    event_ids: List[int],
+    per_event: int,
+    include_archived: bool = False,
+    sort: str = "oldest"
+) -> Dict[int, List[EventComment]]:
+    """Get the top ``per_event`` comments of each event in ``sort`` order, in one query per id chunk.
+
+    ``ROW_NUMBER() OVER (PARTITION BY event_id ...)`` caps every event in the
+    same statement, so a page of events costs one query however many it holds.
+    Returns a list for every requested id, empty for events without comments.
+    """
+    if sort not in COMMENT_SORTS:
+        raise ValueError(f"invalid sort order: {sort}")
+    names, descending = COMMENT_SORTS[sort]
+    found = {event_id: [] for event_id in event_ids}
+    for chunk in chunked(list(found)):
+        rows = comments_of_events(chunk, include_archived)
+        keys = [rows.c[name].desc() if descending else rows.c[name] for name in names]
+        ranked = select(
+            rows,
+            func.row_number().over(partition_by=rows.c.event_id, order_by=keys).label("position")
+        ).subquery("ranked_comments")
+        source = aliased(EventComment, ranked)
+        comments = (
+            db.query(source)
+            .options(undefer(source.author_email))
+            .filter(ranked.c.position <= per_event)
+            .order_by(source.event_id, ranked.c.position)
+        )
+        for comment in comments:
+            found[comment.event_id].append(comment)
+    return found
+
+def get_comment_previews(
+    db: Session,
+    event_ids: List[int],
+    per_event: int = 3,
+    include_archived: bool = False
+) -> Dict[int, List[EventComment]]:
+    """Get the latest ``per_event`` comments of each event, newest first"""
+    return get_comments_for_events(db, event_ids, per_event, include_archived, sort="newest")
+
+def _empty_rating_stats() -> Dict:
     return {
-        "average_rating": sum(ratings) / len(ratings),
-        "total_ratings": len(ratings),
-        "rating_distribution": distribution
+        "average_rating": 0,
+        "total_ratings": 0,
+        "rating_distribution": {i: 0 for i in range(1, 6)}
     }
 
+def get_rating_stats_for_events(
+    db: Session,
+    event_ids: List[int],
+    include_archived: bool = False
+) -> Dict[int, Dict]:
+    """Get rating statistics for several events, aggregated in SQL"""
+    stats = {event_id: _empty_rating_stats() for event_id in event_ids}
+    totals = {}
+    for chunk in chunked(list(stats)):
+        rows = comments_of_events(chunk, include_archived)
+        counts = db.execute(
+            select(rows.c.event_id, rows.c.rating, func.count()).group_by(rows.c.event_id, rows.c.rating)
+        )
+        for event_id, rating, count in counts:
+            total, count_sum = totals.get(event_id, (0, 0))
+            totals[event_id] = (total + rating * count, count_sum + count)
+            if rating in stats[event_id]["rating_distribution"]:
+                stats[event_id]["rating_distribution"][rating] = count
+    for event_id, (total, count) in totals.items():
+        stats[event_id]["average_rating"] = total / count
+        stats[event_id]["total_ratings"] = count
+    return stats
+
+def get_event_rating_stats(db: Session, event_id: int) -> Dict:
+    """Get rating statistics for an event"""
+    return get_rating_stats_for_events(db, [event_id])[event_id]
+
 def get_comment_history(db: Session, comment_id: int) -> List[Dict]:
     """Get edit history of a comment"""
     # Note: This is a stub since we don't actually store history
@@ -156,16 +379,20 @@ def get_comment_history(db: Session, comment_id: int) -> List[Dict]:
     }]
 
 def delete_comment(db: Session, comment_id: int, author_email: str) -> bool:
-    comment = get_comment(db, comment_id)
-    if not comment:
-        raise ValueError("comment not found")
-    if comment.author_email != author_email:
-        raise ValueError("not authorized to delete this comment")
-    
+    """Mark a comment deleted; the purger removes it later"""
     try:
-        db.delete(comment)
+        deleted = db.scalar(
+            update(EventComment)
+            .where(EventComment.id == comment_id, EventComment.author_id == user_id_of(author_email), comment_is_live())
+            .values(deleted_at=datetime.now(UTC).replace(tzinfo=None))
+            .returning(EventComment.id),
+            execution_options={"synchronize_session": False}
+        )
+        if deleted is None:
+            db.rollback()
+            _raise_missing_comment(db, comment_id, "delete")
         db.commit()
         return True
-    except Exception as e:
+    except SQLAlchemyError as e:
         db.rollback()
-        raise ValueError(f"Failed to delete comment: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Failed to delete comment: {str(e)}")
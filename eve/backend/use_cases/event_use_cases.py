@@ -1,9 +1,19 @@
 from datetime import datetime, UTC
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from models import Event
+from sqlalchemy import exists, select, union, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from models import DETAIL_FIELDS, Event, EventDetails, archived_event_details, archived_events
+from use_cases.user_use_cases import insert_returning, user_id_of
 import re
 
+TEXT_FIELDS = ['title', 'description', 'place'] + DETAIL_FIELDS
+UPDATABLE_FIELDS = TEXT_FIELDS + ['start_time', 'end_time']
+# Bound parameters per IN list; well under SQLite's variable limit (999 before 3.32)
+MAX_IDS_PER_QUERY = 500
+
 def validate_email(email: str) -> None:
     """Validate email format"""
     # Basic email regex pattern
@@ -101,38 +111,109 @@ def create_event(
     # Validate dates if provided
     if start_time is not None or end_time is not None:
         validate_event_times(start_time, end_time)
-    event = Event(
-        title=title,
-        description=description,
-        place=place,
-        start_time=start_time,
-        end_time=end_time,
+    # INSERT ... RETURNING hands back the stored row without a second SELECT
+    event = insert_returning(
+        db, Event,
+        dict(
+            title=title,
+            description=description,
+            place=place,
+            start_time=start_time,
+            end_time=end_time
+        ),
+        author_email
+    )
+    set_committed_value(event, "author_email", author_email)
+    # Details share the transaction; events without any get no row at all
+    details = dict(
         food=food,
         drinks=drinks,
         program=program,
         parking_info=parking_info,
         music=music,
         theme=theme,
-        age_restrictions=age_restrictions,
-        author_email=author_email
+        age_restrictions=age_restrictions
     )
-    db.add(event)
+    if any(value is not None for value in details.values()):
+        details = db.scalars(insert(EventDetails).values(event_id=event.id, **details).returning(EventDetails)).one()
+    else:
+        details = None
+    set_committed_value(event, "details", details)
     db.commit()
-    db.refresh(event)
     return event
 
-def get_event(db: Session, event_id: int) -> Optional[Event]:
-    return db.query(Event).filter(Event.id == event_id).first()
+def event_source(include_archived: bool = False):
+    """The entity to query events through.
+
+    Normally the hot ``events`` table only. With ``include_archived`` it is
+    a UNION of hot and archived events, mapped back onto ``Event``.
+    """
+    if not include_archived:
+        return Event
+    return aliased(Event, union(select(Event.__table__), select(archived_events)).subquery("all_events"))
+
+def live_events(db: Session, source=Event):
+    """Query events that have not been deleted"""
+    return db.query(source).options(undefer(source.author_email)).filter(source.deleted_at.is_(None))
+
+def details_source(include_archived: bool = False):
+    """The entity to query event details through, like ``event_source``"""
+    if not include_archived:
+        return EventDetails
+    return aliased(
+        EventDetails,
+        union(select(EventDetails.__table__), select(archived_event_details)).subquery("all_event_details")
+    )
+
+def get_event(db: Session, event_id: int, include_archived: bool = False) -> Optional[Event]:
+    """Get one event with its details; list queries leave the details unloaded"""
+    source = event_source(include_archived)
+    event = live_events(db, source).filter(source.id == event_id).first()
+    if event is not None:
+        details = details_source(include_archived)
+        set_committed_value(event, "details", db.query(details).filter(details.event_id == event_id).first())
+    return event
+
+def chunked(values: list, size: int = None):
+    """Split ``values`` for ``IN`` lists of at most ``size`` parameters"""
+    size = size or MAX_IDS_PER_QUERY
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
 
-def get_events(db: Session) -> List[Event]:
+def get_events_by_ids(db: Session, event_ids: List[int], include_archived: bool = False) -> List[Optional[Event]]:
+    """Get several events with their details, in the order of ``event_ids``.
+
+    Each id yields its event, or None if there is no such live event. The
+    distinct ids are fetched with ``IN`` queries of at most
+    ``MAX_IDS_PER_QUERY`` parameters, one for events and one for details.
+    """
+    source = event_source(include_archived)
+    details = details_source(include_archived)
+    wanted = list(dict.fromkeys(event_ids))
+    found = {}
+    for chunk in chunked(wanted):
+        events = live_events(db, source).filter(source.id.in_(chunk)).all()
+        if not events:
+            continue
+        loaded = {
+            row.event_id: row
+            for row in db.query(details).filter(details.event_id.in_([event.id for event in events]))
+        }
+        for event in events:
+            set_committed_value(event, "details", loaded.get(event.id))
+            found[event.id] = event
+    return [found.get(event_id) for event_id in event_ids]
+
+def get_events(db: Session, include_archived: bool = False) -> List[Event]:
     """Get all events ordered by start time"""
-    return db.query(Event).order_by(Event.start_time).all()
+    source = event_source(include_archived)
+    return live_events(db, source).order_by(source.start_time).all()
 
 def get_upcoming_events(db: Session) -> List[Event]:
     """Get future events that haven't started yet"""
     now = datetime.now(UTC).replace(tzinfo=None)
     return (
-        db.query(Event)
+        live_events(db)
         .filter(Event.start_time > now)
         .order_by(Event.start_time)
         .all()
@@ -142,29 +223,31 @@ def get_current_events(db: Session) -> List[Event]:
     """Get currently running events (started but not ended)"""
     now = datetime.now(UTC).replace(tzinfo=None)
     return (
-        db.query(Event)
+        live_events(db)
         .filter(Event.start_time <= now)
         .filter(Event.end_time > now)
         .order_by(Event.end_time)
         .all()
     )
 
-def get_past_events(db: Session) -> List[Event]:
+def get_past_events(db: Session, include_archived: bool = False) -> List[Event]:
     """Get past events that have ended"""
     now = datetime.now(UTC).replace(tzinfo=None)
+    source = event_source(include_archived)
     return (
-        db.query(Event)
-        .filter(Event.end_time < now)
-        .order_by(Event.end_time.desc())  # Most recent first
+        live_events(db, source)
+        .filter(source.end_time < now)
+        .order_by(source.end_time.desc())  # Most recent first
         .all()
     )
 
-def get_user_events(db: Session, author_email: str) -> List[Event]:
+def get_user_events(db: Session, author_email: str, include_archived: bool = False) -> List[Event]:
     """Get all events by a specific user"""
+    source = event_source(include_archived)
     return (
-        db.query(Event)
-        .filter(Event.author_email == author_email)
-        .order_by(Event.start_time)
+        live_events(db, source)
+        .filter(source.author_id == user_id_of(author_email))
+        .order_by(source.start_time)
         .all()
     )
 
@@ -172,8 +255,8 @@ def get_user_upcoming_events(db: Session, author_email: str) -> List[Event]:
     """Get future events by a specific user"""
     now = datetime.now(UTC).replace(tzinfo=None)
     return (
-        db.query(Event)
-        .filter(Event.author_email == author_email)
+        live_events(db)
+        .filter(Event.author_id == user_id_of(author_email))
         .filter(Event.start_time > now)
         .order_by(Event.start_time)
         .all()
@@ -186,65 +269,103 @@ def get_events_in_range(
 ) -> List[Event]:
     """Get events that start within a specific date range"""
     return (
-        db.query(Event)
+        live_events(db)
         .filter(Event.start_time >= start_date)
         .filter(Event.start_time <= end_date)
         .order_by(Event.start_time)
         .all()
     )
 
+def _raise_missing_event(db: Session, event_id: int, action: str) -> None:
+    """Explain why a write matching ``id AND author`` touched no row"""
+    if not db.scalar(select(exists().where(Event.id == event_id, Event.deleted_at.is_(None)))):
+        raise ValueError("event not found")
+    raise ValueError(f"not authorized to {action} this event")
+
 def update_event(
     db: Session,
     event_id: int,
     author_email: str,
     **kwargs
 ) -> Optional[Event]:
-    event = get_event(db, event_id)
-    if not event:
-        raise ValueError("event not found")
-    if event.author_email != author_email:
-        raise ValueError("not authorized to update this event")
-    
+    owned = (Event.id == event_id, Event.author_id == user_id_of(author_email), Event.deleted_at.is_(None))
+    values = {key: value for key, value in kwargs.items() if key in UPDATABLE_FIELDS}
+
     try:
-        # If updating times, validate them
-        start_time = kwargs.get('start_time', event.start_time)
-        end_time = kwargs.get('end_time', event.end_time)
-        if 'start_time' in kwargs or 'end_time' in kwargs:
+        # If updating times, validate them; only a partial change needs the stored times
+        if 'start_time' in values or 'end_time' in values:
+            if 'start_time' in values and 'end_time' in values:
+                start_time, end_time = values['start_time'], values['end_time']
+            else:
+                row = db.execute(select(Event.start_time, Event.end_time).where(*owned)).first()
+                if row is None:
+                    _raise_missing_event(db, event_id, "update")
+                start_time = values.get('start_time', row.start_time)
+                end_time = values.get('end_time', row.end_time)
             validate_event_times(start_time, end_time)
-        
+
         # Validate and normalize text fields
-        for key, value in kwargs.items():
-            if key in ['title', 'description', 'place', 'food', 'drinks', 
-                      'program', 'parking_info', 'music', 'theme', 'age_restrictions']:
-                if value is not None:
-                    kwargs[key] = validate_text_field(key, value, required=key == 'title')
-        
-        # Update fields
-        for key, value in kwargs.items():
-            if hasattr(event, key):
-                setattr(event, key, value)
-        
-        # Try to commit
+        for key in TEXT_FIELDS:
+            if values.get(key) is not None:
+                values[key] = validate_text_field(key, values[key], required=key == 'title')
+        detail_values = {key: values.pop(key) for key in DETAIL_FIELDS if key in values}
+    except ValueError as e:
+        if "not found" in str(e) or "not authorized" in str(e):
+            raise
+        raise ValueError(f"Failed to update event: {str(e)}")
+
+    try:
+        # Authorization is part of the WHERE clause: one UPDATE ... RETURNING
+        if values:
+            statement = update(Event).where(*owned).values(**values).returning(Event)
+            event = db.scalars(statement, execution_options={"synchronize_session": "fetch"}).one_or_none()
+        else:
+            event = db.scalars(select(Event).where(*owned)).one_or_none()
+        if event is None:
+            db.rollback()
+            _raise_missing_event(db, event_id, "update")
+        # The WHERE clause matched the author, so the email is known
+        set_committed_value(event, "author_email", author_email)
+        if detail_values and all(value is None for value in detail_values.values()):
+            # Clearing fields never creates a row, and drops one left empty
+            statement = update(EventDetails).where(EventDetails.event_id == event_id).values(**detail_values)
+            details = db.scalars(statement.returning(EventDetails),
+                                 execution_options={"populate_existing": True}).one_or_none()
+            if details is not None and all(getattr(details, key) is None for key in DETAIL_FIELDS):
+                db.delete(details)
+                details = None
+        elif detail_values:
+            statement = (
+                insert(EventDetails)
+                .values(event_id=event_id, **detail_values)
+                .on_conflict_do_update(index_elements=[EventDetails.event_id], set_=detail_values)
+                .returning(EventDetails)
+            )
+            details = db.scalars(statement, execution_options={"populate_existing": True}).one()
+        else:
+            details = db.get(EventDetails, event_id, populate_existing=True)
+        set_committed_value(event, "details", details)
         db.commit()
-        db.refresh(event)
         return event
-        
-    except Exception as e:
+    except SQLAlchemyError as e:
         db.rollback()
         raise ValueError(f"Failed to update event: {str(e)}")
 
 def delete_event(db: Session, event_id: int, author_email: str) -> bool:
-    event = get_event(db, event_id)
-    if not event:
-        raise ValueError("event not found")
-    if event.author_email != author_email:
-        raise ValueError("not authorized to delete this event")
-    
+    """Mark an event deleted; the purger removes it and its comments later"""
     try:
-        db.delete(event)
+        deleted = db.scalar(
+            update(Event)
+            .where(Event.id == event_id, Event.author_id == user_id_of(author_email), Event.deleted_at.is_(None))
+            .values(deleted_at=datetime.now(UTC).replace(tzinfo=None))
+            .returning(Event.id),
+            execution_options={"synchronize_session": False}
+        )
+        if deleted is None:
+            db.rollback()
+            _raise_missing_event(db, event_id, "delete")
         db.commit()
-        db.flush()  # Ensure changes are flushed to the database
         return True
-    except Exception as e:
+    except SQLAlchemyError as e:
         db.rollback()
-        raise ValueError(f"Failed to delete event: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Failed to delete event: {str(e)}")
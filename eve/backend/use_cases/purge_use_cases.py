@@ -0,0 +1,59 @@
+from datetime import datetime
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import ChangeLog, Event, EventComment, SyncHorizon
+
+def purge_deleted(db: Session, batch_size: int = 500) -> int:
+    """Hard-delete up to ``batch_size`` tombstoned rows in one short transaction.
+
+    Comments go first (deleted ones and those of deleted events), so a
+    deleted event is only removed once its cascade has nothing left to do.
+    Returns the number of rows removed; less than ``batch_size`` means done.
+    """
+    deleted_events = select(Event.id).where(Event.deleted_at.is_not(None))
+    comment_ids = (
+        select(EventComment.id)
+        .where(or_(
+            EventComment.deleted_at.is_not(None),
+            EventComment.event_id.in_(deleted_events)
+        ))
+        .limit(batch_size)
+    )
+    removed = db.execute(
+        delete(EventComment).where(EventComment.id.in_(comment_ids)),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+
+    if removed < batch_size:
+        removed += db.execute(
+            delete(Event).where(Event.id.in_(deleted_events.limit(batch_size - removed))),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+
+    db.commit()
+    return removed
+
+def compact_change_log(db: Session, older_than: datetime, batch_size: int = 500) -> int:
+    """Drop up to ``batch_size`` change log tombstones recorded before ``older_than``.
+
+    Advances the sync horizon past them, so a client that synced before
+    it is told to start over rather than silently missing the deletions.
+    Returns the number of entries removed; less than ``batch_size`` means done.
+    """
+    seqs = db.scalars(
+        select(ChangeLog.seq)
+        .where(ChangeLog.deleted.is_(True), ChangeLog.changed_at < older_than)
+        .order_by(ChangeLog.seq)
+        .limit(batch_size)
+    ).all()
+    if seqs:
+        db.execute(delete(ChangeLog).where(ChangeLog.seq.in_(seqs)),
+                   execution_options={"synchronize_session": False})
+        horizon = insert(SyncHorizon).values(id=1, seq=seqs[-1])
+        db.execute(horizon.on_conflict_do_update(
+            index_elements=[SyncHorizon.id],
+            set_={"seq": func.max(SyncHorizon.seq, horizon.excluded.seq)}
+        ))
+    db.commit()
+    return len(seqs)
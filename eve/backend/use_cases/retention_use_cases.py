@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from models import Event, EventComment, archived_events, archived_event_comments
+from use_cases.archive_use_cases import archive_attached
+from use_cases.event_use_cases import validate_email
+from use_cases.user_use_cases import user_id_of
+
+# (events, comments) table pairs, hot first
+HOT_TABLES = (Event.__table__, EventComment.__table__)
+ARCHIVE_TABLES = (archived_events, archived_event_comments)
+
+def _tiers(db: Session) -> list:
+    return [HOT_TABLES, ARCHIVE_TABLES] if archive_attached(db) else [HOT_TABLES]
+
+def validate_criteria(ended_before: Optional[datetime], author_email: Optional[str]) -> None:
+    if ended_before is None and author_email is None:
+        raise ValueError("at least one of ended_before or author_email is required")
+    if ended_before is not None and ended_before.tzinfo is not None:
+        raise ValueError("ended_before must be a naive UTC datetime")
+    if author_email is not None:
+        validate_email(author_email)
+
+def matching_events(events=Event.__table__, ended_before: Optional[datetime] = None,
+                    author_email: Optional[str] = None):
+    """Select the ids of events matching every given criterion, deleted or not"""
+    validate_criteria(ended_before, author_email)
+    query = select(events.c.id)
+    if ended_before is not None:
+        query = query.where(events.c.end_time < ended_before)
+    if author_email is not None:
+        # Archived rows keep the ids of the main users table
+        query = query.where(events.c.author_id == user_id_of(author_email))
+    return query
+
+def count_matching_events(db: Session, ended_before: Optional[datetime] = None,
+                          author_email: Optional[str] = None) -> Dict[str, int]:
+    """Count the events and comments a bulk delete would remove, archive included"""
+    counts = {"events": 0, "comments": 0}
+    for events, comments in _tiers(db):
+        ids = matching_events(events, ended_before, author_email)
+        counts["events"] += db.scalar(select(func.count()).select_from(ids.subquery()))
+        counts["comments"] += db.scalar(
+            select(func.count(comments.c.id)).where(comments.c.event_id.in_(ids))
+        )
+    return counts
+
+def delete_matching_events(db: Session, batch_size: int = 500, ended_before: Optional[datetime] = None,
+                           author_email: Optional[str] = None) -> Dict[str, int]:
+    """Hard-delete up to ``batch_size`` rows belonging to matching events.
+
+    Hot rows go before archived ones and comments before their events, so an
+    event is only deleted once nothing is left for its cascade. Fewer than
+    ``batch_size`` rows removed means no match is left.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    validate_criteria(ended_before, author_email)
+    removed = {"events": 0, "comments": 0}
+    budget = batch_size
+    for events, comments in _tiers(db):
+        ids = matching_events(events, ended_before, author_email)
+        for key, table, rows in (
+            ("comments", comments, select(comments.c.id).where(comments.c.event_id.in_(ids))),
+            ("events", events, ids),
+        ):
+            count = db.execute(
+                delete(table).where(table.c.id.in_(rows.limit(budget))),
+                execution_options={"synchronize_session": False}
+            ).rowcount
+            removed[key] += count
+            budget -= count
+            if budget == 0:
+                db.commit()
+                return removed
+
+    db.commit()
+    return removed
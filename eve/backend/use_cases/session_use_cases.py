@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from models import Session as DbSession
+
+def extend_sessions(db: Session, expiries: Dict[bytes, datetime]) -> int:
+    """Push the expiry of each session key forward, in one executemany UPDATE.
+
+    An expiry is only ever moved later, so a stale batch cannot shorten a
+    session. Returns the number of sessions extended.
+    """
+    if not expiries:
+        return 0
+    sessions = DbSession.__table__
+    statement = (
+        update(sessions)
+        .where(sessions.c.id == bindparam("key"), sessions.c.expires_at < bindparam("new_expires_at"))
+        .values(expires_at=bindparam("new_expires_at"))
+    )
+    extended = db.execute(
+        statement, [{"key": key, "new_expires_at": expires_at} for key, expires_at in expiries.items()]
+    ).rowcount
+    db.commit()
+    return extended
@@ -0,0 +1,52 @@
+from typing import Dict, List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from models import ChangeLog, SyncHorizon
+from use_cases import comment_use_cases, event_use_cases
+
+def get_changes(db: Session, since: int, limit: int) -> List[ChangeLog]:
+    """The first ``limit`` change log entries after sequence number ``since``"""
+    return db.scalars(select(ChangeLog).where(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit)).all()
+
+def horizon_seq(db: Session) -> int:
+    """The newest tombstone compacted out of the log; 0 if none was yet"""
+    return db.scalar(select(SyncHorizon.seq)) or 0
+
+def latest_seq(db: Session) -> int:
+    # Compaction may have removed the newest entries, but their numbers stay taken
+    return max(db.scalar(select(func.max(ChangeLog.seq))) or 0, horizon_seq(db))
+
+def get_sync(db: Session, since: int = 0, limit: int = 500) -> Dict:
+    """What changed after ``since``: current events and comments plus tombstones.
+
+    Reads the log and the rows in one read transaction, so the rows are the
+    state as of the returned ``seq``. Entities that are gone by the time they
+    are read (deleted in the meantime, or comments of a deleted event) are
+    reported as deleted. ``more`` means the next page should be fetched
+    right away with ``since=seq``; ``reset`` that ``since`` is ahead of the
+    log (a restored database) or behind the sync horizon (deletions since
+    were compacted away), and the client must sync again from zero.
+    """
+    if 0 < since < horizon_seq(db):
+        return {"seq": 0, "more": False, "reset": True, "events": [], "comments": [],
+                "deleted": {"events": [], "comments": []}}
+    changes = get_changes(db, since, limit + 1)
+    more = len(changes) > limit
+    changes = changes[:limit]
+    changed = {"event": [], "comment": []}
+    deleted = {"event": [], "comment": []}
+    for change in changes:
+        (deleted if change.deleted else changed)[change.entity].append(change.entity_id)
+
+    events = [event for event in event_use_cases.get_events_by_ids(db, changed["event"]) if event is not None]
+    comments = comment_use_cases.get_comments_by_ids(db, changed["comment"])
+    deleted["event"] += sorted(set(changed["event"]) - {event.id for event in events})
+    deleted["comment"] += sorted(set(changed["comment"]) - {comment.id for comment in comments})
+    return {
+        "seq": changes[-1].seq if changes else max(since, 0),
+        "more": more,
+        "reset": not changes and since > latest_seq(db),
+        "events": events,
+        "comments": comments,
+        "deleted": {"events": deleted["event"], "comments": deleted["comment"]},
+    }
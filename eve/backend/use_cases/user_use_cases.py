@@ -0,0 +1,47 @@
+from typing import Dict, Iterable
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import User
+
+def user_id_of(email: str):
+    """Scalar subquery for the id of ``email``; NULL (matching nothing) if unknown"""
+    return select(User.id).where(User.email == email).scalar_subquery()
+
+def intern_user(db: Session, email: str) -> int:
+    """Return the id for ``email``, creating the user on first use (one statement)"""
+    # DO UPDATE instead of DO NOTHING so RETURNING also yields existing rows
+    statement = (
+        insert(User)
+        .values(email=email)
+        .on_conflict_do_update(index_elements=[User.email], set_={"email": email})
+        .returning(User.id)
+    )
+    return db.execute(statement).scalar_one()
+
+def intern_users(db: Session, emails: Iterable[str]) -> Dict[str, int]:
+    """Return ids for several emails, creating the missing users"""
+    # event_use_cases imports this module
+    from use_cases.event_use_cases import chunked
+    emails = list(set(emails))
+    if not emails:
+        return {}
+    db.execute(insert(User).on_conflict_do_nothing(), [{"email": email} for email in emails])
+    user_ids = {}
+    for chunk in chunked(emails):
+        user_ids.update(db.execute(select(User.email, User.id).where(User.email.in_(chunk))).all())
+    return user_ids
+
+def insert_returning(db: Session, entity, values: Dict, email: str, key: str = "author_id"):
+    """INSERT ... RETURNING ``entity`` with ``key`` set to the id of ``email``.
+
+    Users are interned at login, so the id is normally resolved by a
+    subquery inside the INSERT itself. Only the first write by an email
+    that never logged in fails the NOT NULL check and interns it first.
+    """
+    try:
+        return db.scalars(insert(entity).values(**values, **{key: user_id_of(email)}).returning(entity)).one()
+    except IntegrityError:
+        # SQLite rolls back just the failed statement; the transaction goes on
+        return db.scalars(insert(entity).values(**values, **{key: intern_user(db, email)}).returning(entity)).one()
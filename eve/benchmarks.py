@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""Backend benchmarks.
+
+Each benchmark runs against a throwaway SQLite file so the real database is
+never touched. Run from the project root:
+
+    PYTHONPATH=backend python benchmarks.py comments
+    PYTHONPATH=backend python benchmarks.py list-scan
+    PYTHONPATH=backend python benchmarks.py startup
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add backend directory to Python path
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.append(BACKEND_DIR)
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from database import Base, GroupCommit, WriteQueue, configure_connections
+from models import DETAIL_FIELDS, Event, EventDetails
+from use_cases import comment_use_cases, event_use_cases
+from use_cases.user_use_cases import intern_user
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def temp_database(directory):
+    """Create a schema in a fresh file and return (engine, write session factory)"""
+    url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    setup_engine = create_engine(url)
+    configure_connections(setup_engine)
+    Base.metadata.create_all(bind=setup_engine)
+    setup_engine.dispose()
+
+    write_engine = create_engine(url, pool_size=1, max_overflow=0,
+                                 connect_args={"check_same_thread": False})
+    configure_connections(write_engine)
+    return write_engine, sessionmaker(autocommit=False, autoflush=False,
+                                      bind=write_engine, expire_on_commit=False)
+
+def run_comment_mode(group_commit_enabled, args):
+    with tempfile.TemporaryDirectory() as directory:
+        write_engine, WriteSessionLocal = temp_database(directory)
+        queue = WriteQueue(WriteSessionLocal, name="bench.write_queue")
+        event = queue.submit(event_use_cases.create_event, title="Benchmark", author_email="bench@example.com")
+        group_commit = GroupCommit(
+            comment_use_cases.create_comments,
+            writer=queue,
+            window=args.window_ms / 1000,
+            max_batch=args.max_batch,
+            name="bench.group_commit"
+        )
+
+        def create(index):
+            data = {
+                "event_id": event.id,
+                "user_id": f"user{index % 50}@example.com",
+                "message": f"Comment {index}",
+                "rating": index % 6,
+            }
+            started = time.perf_counter()
+            if group_commit_enabled:
+                group_commit.submit(data)
+            else:
+                queue.submit(comment_use_cases.create_comment, **data)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.writers) as pool:
+            latencies = list(pool.map(create, range(args.comments)))
+        elapsed = time.perf_counter() - started
+
+        queue.stop()
+        write_engine.dispose()
+
+    return {
+        "mode": "group commit" if group_commit_enabled else "per-comment commit",
+        "comments_per_second": args.comments / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+def bench_comments(args):
+    """Comment inserts per second and latency, with EVE_COMMENT_GROUP_COMMIT off and on"""
+    print(f"{args.comments} comments from {args.writers} concurrent writers "
+          f"(window {args.window_ms} ms, max batch {args.max_batch})")
+    for enabled in (False, True):
+        result = run_comment_mode(enabled, args)
+        print(f"  {result['mode']:<20} {result['comments_per_second']:>9.0f} comments/s  "
+              f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms")
+
+def run_list_scan_mode(layout, args):
+    with tempfile.TemporaryDirectory() as directory:
+        engine, SessionLocal = temp_database(directory)
+        detail = "x" * (args.detail_bytes // len(DETAIL_FIELDS))
+        start = datetime(2030, 1, 1)
+        with SessionLocal() as db:
+            author_id = intern_user(db, "bench@example.com")
+            db.execute(insert(Event), [
+                {"title": f"Event {i}", "description": "Benchmark event", "place": "Hall",
+                 "start_time": start + timedelta(minutes=i), "end_time": start + timedelta(minutes=i + 60),
+                 "author_id": author_id}
+                for i in range(args.events)
+            ])
+            details = {field: detail for field in DETAIL_FIELDS}
+            if layout == "inline":
+                # The layout before event_details: the same text inside every events row
+                for field in DETAIL_FIELDS:
+                    db.connection().exec_driver_sql(f"ALTER TABLE events ADD COLUMN {field} VARCHAR")
+                db.connection().exec_driver_sql(
+                    "UPDATE events SET " + ", ".join(f"{field} = ?" for field in DETAIL_FIELDS),
+                    tuple(details.values())
+                )
+            else:
+                db.execute(insert(EventDetails), [{"event_id": i + 1, **details} for i in range(args.events)])
+            db.commit()
+            statement = event_use_cases.live_events(db).order_by(Event.start_time).statement
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+            pages = conn.exec_driver_sql("SELECT COUNT(*) FROM dbstat WHERE name = 'events'").scalar()
+
+        orm_samples, sql_samples = [], []
+        for _ in range(args.scans):
+            # Fresh connections start with a cold page cache
+            engine.dispose()
+            with SessionLocal() as db:
+                started = time.perf_counter()
+                rows = len(event_use_cases.get_events(db))
+                orm_samples.append(time.perf_counter() - started)
+            engine.dispose()
+            with engine.connect() as conn:
+                # The same statement without building ORM objects: the storage cost alone
+                started = time.perf_counter()
+                conn.execute(statement).all()
+                sql_samples.append(time.perf_counter() - started)
+        engine.dispose()
+
+    return {
+        "layout": layout,
+        "pages": pages,
+        "orm_rows_per_second": rows / percentile(orm_samples, 0.50),
+        "sql_rows_per_second": rows / percentile(sql_samples, 0.50),
+    }
+
+def bench_list_scan(args):
+    """Event list scan throughput with detail columns inline and in event_details"""
+    print(f"{args.events} events with {args.detail_bytes} bytes of details, median of {args.scans} scans")
+    for layout in ("inline", "split"):
+        result = run_list_scan_mode(layout, args)
+        print(f"  {result['layout']:<8} {result['pages']:>7} events pages  "
+              f"query {result['sql_rows_per_second']:>9.0f} rows/s  "
+              f"get_events {result['orm_rows_per_second']:>9.0f} rows/s")
+
+# Each run in a fresh interpreter, timed from before the first import of main
+STARTUP_STEPS = {
+    "import main": "import main",
+    "create_app": "import main; main.create_app()",
+    "startup + shutdown": (
+        "import asyncio, main\n"
+        "app = main.create_app()\n"
+        "async def boot():\n"
+        "    async with app.router.lifespan_context(app):\n"
+        "        pass\n"
+        "asyncio.run(boot())"
+    ),
+}
+
+def run_startup_step(code, env):
+    script = f"import time\nstarted = time.perf_counter()\n{code}\nprint(time.perf_counter() - started)"
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.split()[-1])
+
+def main_import_time(env):
+    """Cumulative microseconds of ``import main`` as reported by -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            env=env, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if fields[-1] == "main":
+            return int(fields[1])
+
+def bench_startup(args):
+    """Cold start of a worker: importing main, building the app and running its lifespan"""
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR,
+                   EVE_DATABASE=os.path.join(directory, "eve.db"),
+                   EVE_ARCHIVE_DB=os.path.join(directory, "archive.db"))
+        subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "main.py"), "migrate"], env=env, check=True)
+        print(f"median of {args.runs} fresh interpreters")
+        for name, code in STARTUP_STEPS.items():
+            samples = [run_startup_step(code, env) for _ in range(args.runs)]
+            print(f"  {name:<20} {percentile(samples, 0.50) * 1000:>7.1f} ms")
+        print(f"  -X importtime main  {main_import_time(env) / 1000:>7.1f} ms cumulative")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    comments = commands.add_parser("comments", help=bench_comments.__doc__)
+    comments.add_argument("--comments", type=int, default=2000)
+    comments.add_argument("--writers", type=int, default=32)
+    comments.add_argument("--window-ms", type=float, default=5)
+    comments.add_argument("--max-batch", type=int, default=64)
+    comments.set_defaults(func=bench_comments)
+
+    list_scan = commands.add_parser("list-scan", help=bench_list_scan.__doc__)
+    list_scan.add_argument("--events", type=int, default=20000)
+    list_scan.add_argument("--detail-bytes", type=int, default=700)
+    list_scan.add_argument("--scans", type=int, default=5)
+    list_scan.set_defaults(func=bench_list_scan)
+
+    startup = commands.add_parser("startup", help=bench_startup.__doc__)
+    startup.add_argument("--runs", type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
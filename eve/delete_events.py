@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Bulk-delete events and their comments.
+
+Deletes in small batches so the running server keeps serving writes, and
+reports progress and throughput. Run from the project root, for example:
+
+    python delete_events.py --ended-before 2024-01-01 --dry-run
+    python delete_events.py --author old@example.com --batch-size 1000
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, UTC
+
+# Add backend directory to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from database import init_db, write_queue
+from retention import BULK_DELETE_BATCH_SIZE, bulk_delete_events
+
+def parse_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    # Stored times are naive UTC
+    return parsed.astimezone(UTC).replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def print_progress(report):
+    print(f"  chunk {report['chunks']}: {report['events']} events, {report['comments']} comments deleted")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ended-before", type=parse_datetime, help="ISO date; events that ended before it (UTC)")
+    parser.add_argument("--author", help="events created by this email")
+    parser.add_argument("--batch-size", type=int, default=BULK_DELETE_BATCH_SIZE, help="rows per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be deleted")
+    args = parser.parse_args()
+    if args.ended_before is None and args.author is None:
+        parser.error("give --ended-before and/or --author")
+
+    # Ensure we're in the correct working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    init_db()
+
+    try:
+        report = bulk_delete_events(
+            ended_before=args.ended_before,
+            author_email=args.author,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+            progress=print_progress
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        write_queue.stop()
+
+    verb = "Would delete" if report["dry_run"] else "Deleted"
+    print(f"{verb} {report['events']} events and {report['comments']} comments "
+          f"({report['rows']} rows) in {report['seconds']:.2f}s, {report['rows_per_second']:.0f} rows/s")
+
+if __name__ == "__main__":
+    main()